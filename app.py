@@ -1,16 +1,11 @@
 import streamlit as st
-from langchain_google_genai import ChatGoogleGenerativeAI
-import google.generativeai as genai
-from langchain_core.prompts import PromptTemplate
-from langchain.chains import RetrievalQA
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from langchain_community.vectorstores import FAISS
 from datetime import datetime
 from fpdf import FPDF
 import io
 import textwrap
-from typing import Literal
+import logging
+from contextlib import closing
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from components.email_ui import show_email_ui
 
 # Import authentication modules
@@ -20,6 +15,15 @@ from auth.ui import auth_page, user_sidebar, chat_history_sidebar, sync_chat_mes
 
 # Import email service
 from services.email_service import EmailService
+from services.tracing import bind_trace, configure_tracing, get_tracer, new_turn_id, traced
+
+# Import shared RAG engine
+from rag import RAGConfig, get_rag_engine, get_turn_pipeline, detect_disaster_type, load_playbooks, match_emergency, ConversationMemory
+from rag.backends import DEFAULT_CASSETTE_PATH
+from rag.playbooks import DEFAULT_PLAYBOOK_PATH
+from rag.response_cache import DEFAULT_CACHE_PATH
+
+logger = logging.getLogger(__name__)
 
 # Emergency authority email mapping
 EMERGENCY_AUTHORITIES = {
@@ -30,16 +34,6 @@ EMERGENCY_AUTHORITIES = {
     "General": "general.emergency@example.com"
 }
 
-# Emergency phrases for detection
-EMERGENCY_PHRASES = [
-    "help me", "emergency", "danger", "trapped", "injured", "bleeding", 
-    "fire", "flood now", "earthquake", "urgent", "hurt", "dying",
-    "need help", "sos", "save", "critical", "life threatening",
-    "i need help", "help", "accident", "stuck", "disaster", "evacuate",
-    "rescue", "medical emergency", "ambulance", "police", "danger",
-    "in trouble", "stranded", "drowning", "collapsed", "explosion"
-]
-
 # Emergency contact information
 EMERGENCY_CONTACTS = {
     "English": {
@@ -67,14 +61,7 @@ if "input_language" not in st.session_state:
 if "output_language" not in st.session_state:
     st.session_state.output_language = "English"
 
-def get_language_prompt(output_lang: Literal["English", "Sindhi", "Urdu"]) -> str:
-    """Get the language-specific prompt instruction."""
-    if output_lang == "Sindhi":
-        return """سنڌي ۾ جواب ڏيو. مهرباني ڪري صاف ۽ سادي سنڌي استعمال ڪريو، اردو لفظن کان پاسو ڪريو. جواب تفصيلي ۽ سمجهه ۾ اچڻ جوڳو هجڻ گهرجي."""
-    elif output_lang == "Urdu":
-        return """اردو میں جواب دیں۔ براہ کرم واضح اور سادہ اردو استعمال کریں۔ جواب تفصیلی اور سمجھنے کے قابل ہونا چاہیے۔"""
-    return "Respond in English using clear and professional language."
-
+@traced("pdf_build")
 def create_chat_pdf():
     """Generate a PDF file of chat history with proper formatting."""
     try:
@@ -149,6 +136,10 @@ def create_chat_text():
         st.error(f"Error generating text file: {str(e)}")
         return None
 
+# Words get_general_response picks a specific reply for
+GENERAL_CHAT_KEYWORDS = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening',
+                         'how are you', 'thank', 'bye', 'who are you']
+
 def is_general_chat(query):
     """Check if the query is a general chat or greeting."""
     # Make patterns more specific to avoid false positives
@@ -164,11 +155,26 @@ def is_general_chat(query):
     # Only match if these are standalone phrases
     return any(query_lower == phrase.strip('^$') for phrase in general_phrases)
 
-def get_general_response(query):
-    """Generate appropriate responses for general chat."""
-    query_lower = query.lower()
+def get_general_response(query, response_type="greeting"):
+    """
+    Generate appropriate responses for general chat.
+    
+    Args:
+        query: User's message
+        response_type: "greeting", or "out_of_domain" for chatter outside
+            disaster management
+        
+    Returns:
+        str: Canned response in the output language
+    """
+    query_lower = query.lower() if response_type == "greeting" else ""
     output_lang = st.session_state.output_language
     
+    # Greetings recognised by the intent router ("salam", Urdu or Sindhi
+    # greetings) get the standard hello
+    if response_type == "greeting" and not any(word in query_lower for word in GENERAL_CHAT_KEYWORDS):
+        query_lower = "hello"
+    
     if output_lang == "Sindhi":
         if any(greeting in query_lower for greeting in ['hi', 'hello', 'hey']):
             return "السلام عليڪم! مان توهان جو آفتن جي انتظام جو مددگار آهيان. مان توهان جي ڪهڙي مدد ڪري سگهان ٿو؟"
@@ -216,46 +222,118 @@ def get_general_response(query):
         else:
             return "I'm specialized in disaster management topics. While I can't help with general topics, I'd be happy to answer any questions about disaster management, emergency procedures, or safety protocols."
 
-def get_rag_response(qa_chain, query):
+def get_rag_response(rag_engine, query):
     """
     Get a response from the RAG system for a domain-specific query.
     
     Args:
-        qa_chain: The initialized QA chain
+        rag_engine: The shared RAG engine
         query: User's question
         
     Returns:
         str: Generated response
     """
     try:
-        # Add language-specific instructions based on output language
-        lang_instruction = get_language_prompt(st.session_state.output_language)
-        
-        # Get response from RAG system
-        response = qa_chain({"query": f"{query}\n\n{lang_instruction}"})
-        return response['result']
+        # Only the question is embedded; the language is picked via the prompt
+        history = get_conversation_memory(rag_engine).context()
+        return rag_engine.answer(query, st.session_state.output_language, history)
     except Exception as e:
         st.error(f"Error generating RAG response: {str(e)}")
         return f"I'm sorry, I couldn't generate a response. Error: {str(e)}"
 
-def get_response_type(query):
+def get_conversation_memory(rag_engine):
+    """
+    Get this session's conversation memory, caught up with its messages.
+    
+    Turns that fall out of the recent window are summarized in the
+    background, so calling this never waits for Gemini.
+    
+    Args:
+        rag_engine: The shared RAG engine
+        
+    Returns:
+        ConversationMemory: Memory of the current chat
+    """
+    if "conversation_memory" not in st.session_state:
+        st.session_state.conversation_memory = ConversationMemory(
+            rag_engine.config.memory_recent_turns, rag_engine.config.memory_summary_tokens
+        )
+    memory = st.session_state.conversation_memory
+    memory.update(st.session_state.messages, rag_engine.summarize_history)
+    return memory
+
+def render_thinking(placeholder, status=None):
+    """
+    Show the thinking animation, with the queue position while the turn waits.
+    
+    Args:
+        placeholder: Streamlit placeholder to update
+        status: Queue status from ChatTurn.queue_status(), or None
+    """
+    text = "Thinking..."
+    if status:
+        text = f"In queue: position {status['position']}, about {max(1, round(status['eta_seconds']))}s"
+    placeholder.markdown(f"""
+    <div class="thinking-container">
+        <div class="thinking-spinner"></div>
+        <span class="thinking-text">{text}</span>
+    </div>
+    """, unsafe_allow_html=True)
+
+def stream_rag_response(turn, on_wait=None):
+    """
+    Stream a response from the RAG system as Gemini generates it.
+    
+    Args:
+        turn: Chat turn running in the turn pipeline
+        on_wait: Called with the queue status until the first chunk arrives
+        
+    Yields:
+        str: Response text chunks
+    """
+    try:
+        yield from turn.stream(on_wait)
+    except Exception as e:
+        st.error(f"Error generating RAG response: {str(e)}")
+        yield f"I'm sorry, I couldn't generate a response. Error: {str(e)}"
+
+def render_stream(placeholder, chunks):
+    """
+    Render streamed text into a placeholder as it arrives.
+    
+    If the script is stopped mid-stream (the user navigated away or sent a
+    new message) the stream is closed, which cancels the Gemini request.
+    
+    Args:
+        placeholder: Streamlit placeholder to update
+        chunks: Iterator of response text chunks
+        
+    Returns:
+        str: Full response text
+    """
+    response = ""
+    with closing(chunks):
+        for chunk in chunks:
+            response += chunk
+            placeholder.markdown(response + "▌")
+    placeholder.markdown(response)
+    return response
+
+def get_response_type(query, intent=None):
     """
     Determine the type of response needed based on the query content.
     
     Args:
         query: User's question or statement
+        intent: Intent routed from the query embedding, if available
         
     Returns:
-        str: Response type - "emergency", "greeting", or "information"
+        str: Response type - "emergency", "greeting", "out_of_domain" or "information"
     """
     query_lower = query.lower().strip()
     
-    # Simple emergency detection for very short messages like "help"
-    if query_lower in ["help", "sos", "emergency", "help me", "i need help"]:
-        return "emergency"
-    
-    # Check if it's an emergency situation with more complex phrases
-    if any(phrase in query_lower for phrase in EMERGENCY_PHRASES):
+    # Check for English, Urdu and Sindhi emergency phrases in one pass
+    if match_emergency(query).is_emergency:
         return "emergency"
     
     # Check for specific emergency keywords at the beginning of sentences
@@ -266,36 +344,30 @@ def get_response_type(query):
             return "emergency"
     
     # Check if it's a general greeting
-    elif is_general_chat(query):
+    if is_general_chat(query):
         return "greeting"
     
+    # Let the query embedding catch multilingual greetings, emergencies
+    # without keywords and out-of-domain chatter
+    if intent is not None and intent.intent != "information":
+        return intent.intent
+    
     # Default to information request
-    else:
-        return "information"
+    return "information"
 
-def get_emergency_response(query, qa_chain):
+def get_emergency_prefix(output_lang):
     """
-    Generate a response for emergency situations with prioritized action steps.
+    Build the language-specific emergency header with contact numbers.
     
     Args:
-        query: User's emergency question/statement
-        qa_chain: The initialized QA chain
+        output_lang: Output language selected by the user
         
     Returns:
-        str: Prioritized emergency response
+        str: Emergency prefix shown before the RAG guidance
     """
-    output_lang = st.session_state.output_language
-    
     # Get the appropriate contact information based on language
     contacts = EMERGENCY_CONTACTS.get(output_lang, EMERGENCY_CONTACTS["English"])
     
-    # First, get relevant information from the RAG system
-    try:
-        rag_response = get_rag_response(qa_chain, query)
-    except Exception as e:
-        rag_response = "I couldn't retrieve specific information for your emergency."
-    
-    # Create emergency-focused prefix based on language
     if output_lang == "Sindhi":
         prefix = f"""🚨 **ايمرجنسي جواب**
 
@@ -333,101 +405,170 @@ IMMEDIATE ACTIONS:
 
 """
     
+    return prefix
+
+def get_emergency_playbook(query, output_lang):
+    """
+    Look up the precomputed action playbook for an emergency message.
+    
+    Args:
+        query: User's emergency question/statement
+        output_lang: Output language selected by the user
+        
+    Returns:
+        str: Playbook text followed by a blank line, or an empty string
+    """
+    try:
+        playbooks = load_playbooks(st.secrets.get("PLAYBOOK_PATH", DEFAULT_PLAYBOOK_PATH))
+    except Exception as e:
+        logger.warning("Could not load emergency playbooks: %s", e)
+        return ""
+    playbook = playbooks.get(detect_disaster_type(query), output_lang)
+    return playbook + "\n\n" if playbook else ""
+
+def get_emergency_response(query, rag_engine):
+    """
+    Generate a response for emergency situations with prioritized action steps.
+    
+    Args:
+        query: User's emergency question/statement
+        rag_engine: The shared RAG engine
+        
+    Returns:
+        str: Prioritized emergency response
+    """
+    prefix = get_emergency_prefix(st.session_state.output_language)
+    prefix += get_emergency_playbook(query, st.session_state.output_language)
+    
+    # First, get relevant information from the RAG system
+    try:
+        rag_response = get_rag_response(rag_engine, query)
+    except Exception as e:
+        rag_response = "I couldn't retrieve specific information for your emergency."
+    
     # Extract the most actionable information from the RAG response
     # and create a concise, action-oriented response
     return prefix + rag_response
 
+def stream_emergency_response(turn):
+    """
+    Stream an emergency response.
+    
+    The prefix and the precomputed playbook are shown immediately; the
+    RAG-specific guidance streams in after them.
+    
+    Args:
+        turn: Chat turn running in the turn pipeline
+        
+    Yields:
+        str: Response text chunks
+    """
+    yield get_emergency_prefix(st.session_state.output_language)
+    yield get_emergency_playbook(turn.query, st.session_state.output_language)
+    yield from stream_rag_response(turn)
+
+def with_script_context(fn, *args, **kwargs):
+    """
+    Bind a callable to the current Streamlit script context.
+    
+    The returned callable can run on a pipeline worker thread and still use
+    st.session_state and st.error, like the Firestore writes do.
+    
+    Args:
+        fn: Function to call
+        *args: Positional arguments for fn
+        **kwargs: Keyword arguments for fn
+        
+    Returns:
+        Callable: Zero-argument callable that runs fn with the script context
+    """
+    ctx = get_script_run_ctx()
+    
+    def run():
+        add_script_run_ctx(ctx=ctx)
+        return fn(*args, **kwargs)
+    
+    return run
+
+def secret_flag(name, default=False):
+    """
+    Read a boolean setting from secrets.
+    
+    TOML booleans are used as they are. Strings count as true only when they
+    read "1", "true", "yes" or "on", so INTENT_ROUTING = "false" turns the
+    setting off rather than on.
+    
+    Args:
+        name: Secret name
+        default: Value when the secret is not set
+        
+    Returns:
+        bool: The flag's value
+    """
+    value = st.secrets.get(name, default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+def start_tracing():
+    """
+    Tag this rerun's spans with the session and a new turn ID, and apply
+    the tracing settings from secrets.
+    
+    TRACE_LOG_PATH appends every span to a JSON lines file; METRICS_PORT
+    serves Prometheus histograms on /metrics and recent spans on /traces,
+    on loopback unless METRICS_HOST names another interface.
+    """
+    ctx = get_script_run_ctx()
+    bind_trace(ctx.session_id if ctx else None, new_turn_id())
+    try:
+        configure_tracing(
+            jsonl_path=st.secrets.get("TRACE_LOG_PATH", ""),
+            metrics_port=int(st.secrets.get("METRICS_PORT", 0)),
+            metrics_host=st.secrets.get("METRICS_HOST", "127.0.0.1")
+        )
+    except Exception as e:
+        logger.warning("Tracing setup failed: %s", e)
+
+@traced("initialize_rag")
 def initialize_rag():
+    """
+    Get the process-wide RAG engine.
+
+    The engine is shared by all sessions and only rebuilt when its
+    configuration changes, so calling this on every rerun is cheap.
+    """
     try:
+        # Replayed and stubbed backends run without Gemini or Pinecone
+        backend_mode = st.secrets.get("RAG_BACKEND", "live")
+        
         # API Keys from secrets
-        PINECONE_API_KEY = st.secrets["PINECONE_API_KEY"]
-        GOOGLE_API_KEY = st.secrets["GOOGLE_API_KEY"]
+        PINECONE_API_KEY = st.secrets.get("PINECONE_API_KEY", "")
+        GOOGLE_API_KEY = st.secrets.get("GOOGLE_API_KEY", "")
         
-        if not GOOGLE_API_KEY or not PINECONE_API_KEY:
+        if backend_mode in ("live", "record") and (not GOOGLE_API_KEY or not PINECONE_API_KEY):
             st.error("Please set up API keys in Streamlit Cloud secrets")
             st.stop()
-            
-        genai.configure(api_key=GOOGLE_API_KEY)
-
-        # Initialize Pinecone
-        from pinecone import Pinecone
-        pc = Pinecone(api_key=PINECONE_API_KEY)
-
-        # Initialize embeddings
-        try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name='all-MiniLM-L6-v2',
-                model_kwargs={'device': 'cpu'},
-                encode_kwargs={
-                    'normalize_embeddings': True,
-                    'batch_size': 32
-                }
-            )
-        except Exception as e:
-            st.error(f"Error initializing embeddings: {str(e)}")
-            st.stop()
 
-        # Initialize vector store
-        index_name = "pdfinfo"
-        vectorstore = PineconeVectorStore(
-            index=pc.Index(index_name),
-            embedding=embeddings,
-            text_key="text"
+        config = RAGConfig(
+            semantic_cache_threshold=float(st.secrets.get("SEMANTIC_CACHE_THRESHOLD", 0.92)),
+            response_cache_path=st.secrets.get("RESPONSE_CACHE_PATH", DEFAULT_CACHE_PATH),
+            index_version=st.secrets.get("RAG_INDEX_VERSION", ""),
+            embedding_cache_dir=st.secrets.get("EMBEDDING_CACHE_DIR", ""),
+            retrieval_mode=st.secrets.get("RETRIEVAL_MODE", "auto"),
+            embedding_backend=st.secrets.get("EMBEDDING_BACKEND", "hash" if backend_mode == "stub" else "torch"),
+            intent_routing=secret_flag("INTENT_ROUTING"),
+            fallback_llm_model=st.secrets.get("FALLBACK_LLM_MODEL", "gemini-1.5-flash-8b"),
+            llm_concurrency=int(st.secrets.get("LLM_CONCURRENCY", 8)),
+            embedding_concurrency=int(st.secrets.get("EMBEDDING_CONCURRENCY", 16)),
+            admission_shed_after_seconds=float(st.secrets.get("ADMISSION_SHED_AFTER_SECONDS", 10.0)),
+            backend_mode=backend_mode,
+            cassette_path=st.secrets.get("RAG_CASSETTE_PATH", DEFAULT_CASSETTE_PATH),
+            replay_latency_scale=float(st.secrets.get("REPLAY_LATENCY_SCALE", 1.0)),
+            pinecone_api_key=PINECONE_API_KEY,
+            google_api_key=GOOGLE_API_KEY
         )
-
-        # Create Gemini LLM
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-exp",
-            temperature=0.1,
-            google_api_key=GOOGLE_API_KEY,
-            max_retries=3,
-            timeout=30,
-            max_output_tokens=2048
-        )
-
-        # Create the QA chain with improved prompt
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=vectorstore.as_retriever(search_kwargs={"k": 6}),
-            return_source_documents=False,
-            chain_type_kwargs={
-                "prompt": PromptTemplate(
-                    template=f"""You are a knowledgeable disaster management assistant focused on providing timely, actionable help. {get_language_prompt(st.session_state.output_language)}
-
-Use the following guidelines to answer questions:
-
-1. If the context contains relevant information:
-   - Start with the most urgent and actionable information first
-   - Provide clear, step-by-step instructions when applicable
-   - Use concise language and bullet points for critical information
-   - Prioritize life-saving actions over general information
-   - Include specific details and procedures from the source
-
-2. If the context does NOT contain sufficient information:
-   - Start with general safety advice relevant to the situation
-   - Be honest about not having specific details
-   - Provide actionable steps based on common disaster management principles
-   - Suggest contacting local emergency services when appropriate
-   - Never make up specific numbers or procedures
-
-3. For all responses:
-   - Keep information organized and easy to scan quickly
-   - Use clear headings and short paragraphs
-   - Emphasize the most critical information
-   - Be reassuring but realistic
-   - Focus on immediate needs first, then recovery information
-
-Context: {{context}}
-
-Question: {{question}}
-
-Response (remember to be concise, action-oriented, and helpful):""",
-                    input_variables=["context", "question"],
-                )
-            }
-        )
-        return qa_chain, llm
+        return get_rag_engine(config)
     except Exception as e:
         st.error(f"Error initializing RAG system: {str(e)}")
         st.stop()
@@ -728,7 +869,7 @@ def main():
         """, unsafe_allow_html=True)
 
     # Initialize RAG system
-    qa_chain, llm = initialize_rag()
+    rag_engine = initialize_rag()
 
     # Sidebar with clean layout
     with st.sidebar:
@@ -847,13 +988,13 @@ def main():
     if st.session_state.messages and len(st.session_state.messages) > 0:
         last_message = st.session_state.messages[-1]
         if last_message["role"] == "user":
-            is_emergency = any(phrase in last_message["content"].lower() for phrase in EMERGENCY_PHRASES)
+            is_emergency = match_emergency(last_message["content"]).is_emergency
         elif last_message["role"] == "assistant" and len(st.session_state.messages) > 1:
             # Check the user's last message too
             user_messages = [m for m in st.session_state.messages if m["role"] == "user"]
             if user_messages:
                 last_user_message = user_messages[-1]
-                is_emergency = any(phrase in last_user_message["content"].lower() for phrase in EMERGENCY_PHRASES)
+                is_emergency = match_emergency(last_user_message["content"]).is_emergency
 
     # Show email sharing UI in the dedicated container
     with email_ui_container:
@@ -865,14 +1006,27 @@ def main():
 
     # Chat input
     if prompt := st.chat_input("Ask Your Questions Here..."):
+        # Follow-up questions are answered with the conversation before them
+        history = get_conversation_memory(rag_engine).context()
         st.session_state.messages.append({"role": "user", "content": prompt})
         
+        # The user-message write, classification and retrieval run concurrently
+        persist_user = None
         if is_authenticated:
             metadata = {
                 'language': st.session_state.input_language,
                 'timestamp': datetime.now().isoformat()
             }
-            sync_chat_message(user_id, "user", prompt, metadata)
+            persist_user = with_script_context(sync_chat_message, user_id, "user", prompt, metadata)
+        pipeline = get_turn_pipeline()
+        # Emergencies jump the embedding and LLM queues; the keyword match
+        # sets the priority until the turn is classified
+        turn = pipeline.start_turn(
+            rag_engine, prompt, st.session_state.output_language,
+            classify=get_response_type, persist_user=persist_user,
+            priority="emergency" if match_emergency(prompt).is_emergency else "information",
+            history=history
+        )
         
         with st.chat_message("user"):
             st.markdown(prompt)
@@ -880,33 +1034,37 @@ def main():
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
             
-            # Show thinking animation
-            message_placeholder.markdown("""
-            <div class="thinking-container">
-                <div class="thinking-spinner"></div>
-                <span class="thinking-text">Thinking...</span>
-            </div>
-            """, unsafe_allow_html=True)
+            # Show thinking animation, with the queue position under load
+            render_thinking(message_placeholder)
+            show_queue = lambda status: render_thinking(message_placeholder, status)
             
             try:
-                response_type = get_response_type(prompt)
+                response_type = turn.response_type(on_wait=show_queue)
                 if response_type == "emergency":
-                    response = get_emergency_response(prompt, qa_chain)
-                elif response_type == "greeting":
-                    response = get_general_response(prompt)
+                    response = render_stream(message_placeholder, stream_emergency_response(turn))
+                elif response_type in ("greeting", "out_of_domain"):
+                    response = get_general_response(prompt, response_type)
+                    message_placeholder.markdown(response)
                 else:
-                    response = get_rag_response(qa_chain, prompt)
+                    response = render_stream(message_placeholder, stream_rag_response(turn, show_queue))
                 
-                message_placeholder.markdown(response)
                 st.session_state.messages.append({"role": "assistant", "content": response})
+                # Start summarizing evicted turns while the user reads the answer
+                get_conversation_memory(rag_engine)
                 
+                # Saving the answer does not hold up the rerun
                 if is_authenticated:
                     metadata = {
                         'language': st.session_state.output_language,
                         'timestamp': datetime.now().isoformat(),
                         'type': response_type
                     }
-                    sync_chat_message(user_id, "assistant", response, metadata)
+                    pipeline.persist_response(
+                        turn, with_script_context(sync_chat_message, user_id, "assistant", response, metadata)
+                    )
+                
+                st.session_state.turn_timings = turn.summary()
+                logger.info("Turn rendered (ms): %s", st.session_state.turn_timings)
                 
                 # Force Streamlit to rerun to refresh the UI and show the email sharing component
                 st.rerun()
@@ -920,4 +1078,6 @@ def main():
                 st.rerun()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    start_tracing()
+    with get_tracer().span("rerun"):
+        main()
\ No newline at end of file
@@ -7,6 +7,7 @@ from typing import List, Dict, Optional
 from datetime import datetime
 from firebase_admin import firestore
 from .firebase_config import get_firestore_db
+from services.tracing import traced
 
 class ChatHistoryManager:
     """
@@ -20,6 +21,7 @@ class ChatHistoryManager:
         """Initialize the chat history manager with Firestore database."""
         self.db = get_firestore_db()
     
+    @traced("firestore.save_message")
     def save_message(self, user_id: str, role: str, content: str, metadata: Optional[Dict] = None) -> bool:
         """
         Save a chat message to Firestore.
@@ -58,6 +60,7 @@ class ChatHistoryManager:
             st.error(f"Error saving message: {str(e)}")
             return False
     
+    @traced("firestore.get_session_history")
     def get_session_history(self, user_id: str, session_id: Optional[str] = None) -> List[Dict]:
         """
         Retrieve chat history for a specific session.
@@ -94,6 +97,7 @@ class ChatHistoryManager:
             st.error(f"Error retrieving chat history: {str(e)}")
             return []
     
+    @traced("firestore.get_all_sessions")
     def get_all_sessions(self, user_id: str) -> List[Dict]:
         """
         Get all chat sessions for a user.
@@ -124,6 +128,7 @@ class ChatHistoryManager:
             st.error(f"Error retrieving sessions: {str(e)}")
             return []
     
+    @traced("firestore.create_new_session")
     def create_new_session(self, user_id: str, title: str = "New Chat") -> str:
         """
         Create a new chat session.
@@ -160,6 +165,7 @@ class ChatHistoryManager:
             st.error(f"Error creating session: {str(e)}")
             return ""
     
+    @traced("firestore.delete_session")
     def delete_session(self, user_id: str, session_id: str) -> bool:
         """
         Delete a chat session and all its messages.
@@ -195,6 +201,7 @@ class ChatHistoryManager:
             st.error(f"Error deleting session: {str(e)}")
             return False
     
+    @traced("firestore.update_session_title")
     def update_session_title(self, user_id: str, session_id: str, title: str) -> bool:
         """
         Update a chat session's title.
@@ -224,6 +231,7 @@ class ChatHistoryManager:
             st.error(f"Error updating session title: {str(e)}")
             return False
     
+    @traced("firestore.get_current_session_id")
     def _get_current_session_id(self, user_id: str) -> str:
         """
         Get the current session ID or create a new one.
@@ -263,6 +271,7 @@ class ChatHistoryManager:
             # Create new session as fallback
             return self.create_new_session(user_id)
     
+    @traced("firestore.set_current_session_id")
     def _set_current_session_id(self, user_id: str, session_id: str) -> None:
         """
         Set the current session ID.
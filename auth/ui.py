@@ -7,9 +7,11 @@ from typing import Tuple, Optional, Dict, List, Callable
 from .authenticator import FirebaseAuthenticator
 from .chat_history import ChatHistoryManager
 from .firebase_config import get_firestore_db
+from services.tracing import traced
 from datetime import datetime
 import json
 
+@traced("auth")
 def auth_page() -> Tuple[bool, Optional[Dict]]:
     """
     Display authentication page with login and signup options.
@@ -424,6 +426,7 @@ def sync_chat_message(user_id: str, role: str, content: str, metadata: Optional[
     history_manager = ChatHistoryManager()
     history_manager.save_message(user_id, role, content, metadata)
 
+@traced("load_user_preferences")
 def load_user_preferences(user: Dict) -> Dict:
     """
     Load user preferences and apply them to the session state.
@@ -0,0 +1,244 @@
+"""
+Offline stand-ins for the chatbot's external services.
+An in-memory Firestore, an SMTP mailbox and a small disaster-management
+corpus for the local FAISS index. Gemini and the embedding model are
+replaced by the engine's stub and hash backends (`rag.backends`).
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from firebase_admin import firestore
+from langchain_core.documents import Document
+
+class _Snapshot:
+    """Document snapshot as returned by Firestore reads."""
+
+    def __init__(self, reference: "_DocumentRef", data: Optional[dict]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[dict]:
+        return dict(self._data) if self._data is not None else None
+
+
+class _Query:
+    """Ordered, limited read over one collection."""
+
+    def __init__(self, db: "InMemoryFirestore", path: Tuple[str, ...],
+                 order: Optional[Tuple[str, bool]] = None, limit: Optional[int] = None):
+        self._db = db
+        self._path = path
+        self._order = order
+        self._limit = limit
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "_Query":
+        return _Query(self._db, self._path, (field, str(direction).upper().startswith("DESC")), self._limit)
+
+    def limit(self, count: int) -> "_Query":
+        return _Query(self._db, self._path, self._order, count)
+
+    def stream(self) -> Iterator[_Snapshot]:
+        snapshots = self._db._list(self._path)
+        if self._order is not None:
+            field, descending = self._order
+            snapshots.sort(key=lambda s: (s._data.get(field) is None, s._data.get(field)), reverse=descending)
+        return iter(snapshots[:self._limit] if self._limit is not None else snapshots)
+
+
+class _CollectionRef(_Query):
+    def document(self, document_id: Optional[str] = None) -> "_DocumentRef":
+        return _DocumentRef(self._db, self._path + (document_id or self._db._new_id(),))
+
+    def add(self, data: dict) -> Tuple[datetime, "_DocumentRef"]:
+        reference = self.document()
+        reference.set(data)
+        return datetime.now(timezone.utc), reference
+
+
+class _DocumentRef:
+    def __init__(self, db: "InMemoryFirestore", path: Tuple[str, ...]):
+        self._db = db
+        self._path = path
+        self.id = path[-1]
+
+    def collection(self, name: str) -> _CollectionRef:
+        return _CollectionRef(self._db, self._path + (name,))
+
+    def get(self) -> _Snapshot:
+        return self._db._get(self)
+
+    def set(self, data: dict, merge: bool = False) -> None:
+        self._db._write(self._path, data, merge=merge, must_exist=False)
+
+    def update(self, data: dict) -> None:
+        self._db._write(self._path, data, merge=True, must_exist=True)
+
+    def delete(self) -> None:
+        self._db._delete(self._path)
+
+
+class InMemoryFirestore:
+    """
+    Thread-safe in-memory subset of the Firestore client.
+
+    Supports what `ChatHistoryManager` and the preference helpers use:
+    nested collections and documents, add/set/update/get/delete, and
+    ordered or limited streaming. `SERVER_TIMESTAMP` is stored as the
+    current time, and every operation can be given a fixed latency.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        """
+        Args:
+            latency_seconds: Delay added to every read and write
+        """
+        self.latency_seconds = latency_seconds
+        self.operations = 0
+        self._documents: Dict[Tuple[str, ...], dict] = {}
+        self._lock = threading.Lock()
+        self._ids = 0
+
+    def collection(self, name: str) -> _CollectionRef:
+        return _CollectionRef(self, (name,))
+
+    def _new_id(self) -> str:
+        with self._lock:
+            self._ids += 1
+            return f"doc{self._ids:08d}"
+
+    def _operation(self) -> None:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        with self._lock:
+            self.operations += 1
+
+    def _get(self, reference: _DocumentRef) -> _Snapshot:
+        self._operation()
+        with self._lock:
+            data = self._documents.get(reference._path)
+            return _Snapshot(reference, dict(data) if data is not None else None)
+
+    def _list(self, path: Tuple[str, ...]) -> List[_Snapshot]:
+        self._operation()
+        with self._lock:
+            return [_Snapshot(_DocumentRef(self, key), dict(data))
+                    for key, data in self._documents.items()
+                    if len(key) == len(path) + 1 and key[:-1] == path]
+
+    def _write(self, path: Tuple[str, ...], data: dict, merge: bool, must_exist: bool) -> None:
+        self._operation()
+        now = datetime.now(timezone.utc)
+        values = {key: now if value is firestore.SERVER_TIMESTAMP else value for key, value in data.items()}
+        with self._lock:
+            if must_exist and path not in self._documents:
+                raise KeyError(f"No document to update: {'/'.join(path)}")
+            if merge and path in self._documents:
+                self._documents[path].update(values)
+            else:
+                self._documents[path] = values
+
+    def _delete(self, path: Tuple[str, ...]) -> None:
+        self._operation()
+        with self._lock:
+            self._documents.pop(path, None)
+
+
+class _FakeSMTPConnection:
+    """One SMTP session; messages go to the owning mailbox."""
+
+    def __init__(self, mailbox: "FakeMailbox", host: str, port: int):
+        self.mailbox = mailbox
+        self.host = host
+        self.port = port
+
+    def __enter__(self) -> "_FakeSMTPConnection":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def starttls(self, context=None) -> None:
+        pass
+
+    def login(self, user: str, password: str) -> None:
+        pass
+
+    def sendmail(self, sender: str, recipient: str, message: str) -> Dict:
+        time.sleep(self.mailbox.latency_seconds)
+        with self.mailbox.lock:
+            self.mailbox.sent.append((sender, recipient, message))
+        return {}
+
+
+class FakeMailbox:
+    """
+    Stand-in for an SMTP server.
+
+    `connect` has the signature of `smtplib.SMTP`, so it can replace it;
+    sent messages are kept in `sent` instead of being delivered.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        """
+        Args:
+            latency_seconds: Delay of every sent message
+        """
+        self.latency_seconds = latency_seconds
+        self.sent: List[Tuple[str, str, str]] = []
+        self.lock = threading.Lock()
+
+    def connect(self, host: str = "", port: int = 0, *args, **kwargs) -> _FakeSMTPConnection:
+        return _FakeSMTPConnection(self, host, port)
+
+
+SAMPLE_CORPUS = [
+    ("Floods", "Before a flood, prepare an emergency kit with drinking water, dry food, a torch, "
+     "a first aid kit, medicines and copies of important documents in a waterproof bag. Know the "
+     "evacuation route to higher ground and the location of the nearest relief camp."),
+    ("Floods", "During a flood, move to higher ground immediately and do not walk or drive through "
+     "moving water. Six inches of moving water can knock a person down. Switch off electricity at "
+     "the main switch and stay away from power lines."),
+    ("Floods", "After a flood, boil or purify water before drinking, throw away food that touched "
+     "flood water, and return home only when authorities say it is safe. Watch for snakes and "
+     "damaged foundations."),
+    ("Earthquakes", "During an earthquake, drop to the ground, take cover under a sturdy table and "
+     "hold on until the shaking stops. Stay away from windows, glass and heavy furniture. If you are "
+     "outside, move to an open area away from buildings and electric poles."),
+    ("Earthquakes", "After an earthquake, expect aftershocks. Check yourself and others for injuries, "
+     "leave damaged buildings, use stairs instead of lifts and do not light matches in case of gas leaks."),
+    ("Fire", "If there is a fire, leave the building at once, crawl low under smoke and close doors "
+     "behind you. Never use lifts. Call 16 or 1122 from a safe place. Stop, drop and roll if your "
+     "clothes catch fire."),
+    ("Heatwave", "During a heatwave, stay indoors between 11am and 4pm, drink water often even if you "
+     "are not thirsty, wear light loose clothing and check on elderly people and children. Signs of "
+     "heat stroke include confusion, hot dry skin and fainting."),
+    ("Cyclone", "When a cyclone warning is issued, secure loose objects, store drinking water, charge "
+     "phones and follow evacuation orders. Stay indoors away from windows until the all clear is given."),
+    ("Preparedness", "A household emergency plan lists meeting points, emergency contacts and "
+     "responsibilities for each family member, including people with disabilities and pets. Practise "
+     "the plan twice a year."),
+    ("Governance", "The National Disaster Management Authority (NDMA) coordinates disaster risk "
+     "reduction, preparedness and response at the federal level, while the Provincial Disaster "
+     "Management Authorities (PDMA) lead response in the provinces."),
+    ("Risk assessment", "Disaster risk assessment identifies hazards, analyses the exposure and "
+     "vulnerability of people and assets, estimates likely losses and ranks risks so that mitigation "
+     "measures can be prioritised."),
+    ("First aid", "For bleeding, apply firm pressure with a clean cloth and raise the injured part. "
+     "For burns, cool the area under running water for twenty minutes. Do not move a person with a "
+     "suspected spinal injury unless they are in danger."),
+]
+
+
+def sample_documents() -> List[Document]:
+    """
+    Build the benchmark corpus.
+
+    Returns:
+        List[Document]: One document per passage with its topic as metadata
+    """
+    return [Document(page_content=text, metadata={'topic': topic, 'source': 'benchmark'})
+            for topic, text in SAMPLE_CORPUS]
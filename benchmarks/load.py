@@ -0,0 +1,384 @@
+"""
+Multi-session load generator.
+Runs app.py headless through Streamlit's AppTest with N simulated,
+already-authenticated users in parallel, each following a scripted
+conversation, with Firebase, Pinecone, Gemini and SMTP replaced by the
+stand-ins in `benchmarks.fakes`. Reports reruns per turn, wall time per
+turn and memory growth per session at each concurrency level.
+
+Usage:
+    python -m benchmarks.load --users 1 5 10 20
+    python -m benchmarks.load --users 40 --processes 4 --out benchmarks/results/load.json
+"""
+import argparse
+import gc
+import json
+import os
+import smtplib
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass
+from multiprocessing import get_context
+from typing import Dict, Iterator, List, Optional, Sequence
+from unittest import mock
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import auth.authenticator
+import auth.chat_history
+import auth.firebase_config
+import auth.ui
+import rag
+from rag.playbooks import build_playbooks
+from services.tracing import Span, get_tracer
+
+from .fakes import FakeMailbox, InMemoryFirestore
+from .run import RSSSampler, _percentile, build_engine
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+# Conversation steps that are not chat messages
+SHARE_STEP = "/share"
+PDF_STEP = "/pdf"
+
+DEFAULT_CONVERSATION = (
+    "hello",
+    "What should I do to prepare for a flood?",
+    "How do I make an emergency kit?",
+    "Help, the water is rising and we are trapped",
+    SHARE_STEP,
+    "thank you",
+)
+
+# Session state key holding the simulated user's number
+_USER_KEY = "load_test_user"
+
+
+@dataclass(frozen=True)
+class LoadOptions:
+    """Latencies of the stand-ins and the per-run timeout."""
+    llm_latency: float = 0.3
+    token_delay: float = 0.01
+    firestore_latency: float = 0.02
+    smtp_latency: float = 0.2
+    timeout_seconds: float = 120.0
+
+
+@dataclass
+class StepResult:
+    user: int
+    step: str
+    kind: str
+    seconds: float
+    reruns: int
+    error: Optional[str] = None
+
+
+class RerunCounter:
+    """Counts script runs per simulated user from the app's `rerun` spans."""
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        if span.name != "rerun":
+            return
+        # Rerun spans finish on the script thread, so session state is the user's
+        user = st.session_state.get(_USER_KEY)
+        if user is not None:
+            with self._lock:
+                self._counts[user] = self._counts.get(user, 0) + 1
+
+    def count(self, user: int) -> int:
+        with self._lock:
+            return self._counts.get(user, 0)
+
+
+@dataclass
+class OfflineApp:
+    """Stand-ins wired into the app for one process."""
+    db: InMemoryFirestore
+    mailbox: FakeMailbox
+    reruns: RerunCounter
+
+
+@contextmanager
+def offline_app(workdir: str, options: LoadOptions) -> Iterator[OfflineApp]:
+    """
+    Replace Firebase, Pinecone, Gemini and SMTP for every AppTest in this process.
+
+    Args:
+        workdir: Directory for the FAISS index, caches and playbooks
+        options: Stand-in latencies
+
+    Yields:
+        OfflineApp: The in-memory Firestore, the mailbox and the rerun counter
+    """
+    playbook_path = os.path.join(workdir, 'playbooks.json')
+    build_playbooks(build_engine(workdir, "hash", {'latency_seconds': 0.0, 'token_delay_seconds': 0.0}),
+                    playbook_path)
+    engine = build_engine(workdir, "hash", {'latency_seconds': options.llm_latency,
+                                                'token_delay_seconds': options.token_delay})
+    offline = OfflineApp(InMemoryFirestore(options.firestore_latency), FakeMailbox(options.smtp_latency),
+                         RerunCounter())
+    # Shared by every session; AppTest's own secrets would be swapped
+    # globally per run, which races between parallel users
+    secrets = {
+        "PINECONE_API_KEY": "offline",
+        "GOOGLE_API_KEY": "offline",
+        "RETRIEVAL_MODE": "local",
+        "PLAYBOOK_PATH": playbook_path,
+        "GMAIL_ADDRESS": "assistant@example.com",
+        "GMAIL_APP_PASSWORD": "offline",
+    }
+
+    with ExitStack() as stack:
+        for module in (auth.firebase_config, auth.authenticator):
+            stack.enter_context(mock.patch.object(module, 'initialize_firebase', lambda: None))
+            stack.enter_context(mock.patch.object(module, 'get_firebase_api_key', lambda: "offline"))
+        for module in (auth.firebase_config, auth.authenticator, auth.chat_history, auth.ui):
+            stack.enter_context(mock.patch.object(module, 'get_firestore_db', lambda: offline.db))
+        stack.enter_context(mock.patch.object(rag, 'get_rag_engine', lambda config: engine))
+        stack.enter_context(mock.patch.object(smtplib, 'SMTP', offline.mailbox.connect))
+        stack.enter_context(mock.patch.object(st, 'secrets', secrets))
+        get_tracer().add_listener(offline.reruns)
+        stack.callback(get_tracer().remove_listener, offline.reruns)
+        yield offline
+
+
+def _button(app_test: AppTest, label: str):
+    for button in app_test.button:
+        if button.label == label:
+            return button
+    raise LookupError(f"No '{label}' button on the page")
+
+
+def simulate_user(user: int, conversation: Sequence[str], offline: OfflineApp,
+                  options: LoadOptions, sessions: List[AppTest]) -> List[StepResult]:
+    """
+    Log a user in and play their conversation.
+
+    Args:
+        user: User number
+        conversation: Chat messages and `SHARE_STEP` / `PDF_STEP` actions
+        offline: Stand-ins of this process
+        options: Timeouts
+        sessions: Receives the AppTest, kept alive so its memory can be measured
+
+    Returns:
+        List[StepResult]: The initial page load, then one result per step
+    """
+    uid = f"load-user-{user}"
+    offline.db.collection('users').document(uid).set({
+        'email': f"{uid}@example.com",
+        'preferences': {'input_language': 'English', 'output_language': 'English'}
+    })
+    app_test = AppTest.from_file(APP_PATH, default_timeout=options.timeout_seconds)
+    app_test.session_state["user"] = {'uid': uid, 'email': f"{uid}@example.com"}
+    app_test.session_state[_USER_KEY] = user
+    sessions.append(app_test)
+
+    def step(name: str, kind: str, action) -> StepResult:
+        before = offline.reruns.count(user)
+        started = time.perf_counter()
+        error = None
+        try:
+            action()
+            if app_test.exception:
+                error = app_test.exception[0].message
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return StepResult(user, name, kind, time.perf_counter() - started,
+                          offline.reruns.count(user) - before, error)
+
+    results = [step("load", "load", app_test.run)]
+    for message in conversation:
+        if message == SHARE_STEP:
+            # The Share button is only enabled once an address is confirmed
+            app_test.session_state["confirmed_address"] = "Saddar, Karachi"
+            app_test.run()
+            results.append(step(message, "share", lambda: _button(app_test, "📤 Share").click().run()))
+        elif message == PDF_STEP:
+            results.append(step(message, "pdf", lambda: _button(app_test, "📄 PDF").click().run()))
+        else:
+            results.append(step(message, "turn", lambda: app_test.chat_input[0].set_value(message).run()))
+    return results
+
+
+def run_users(offline: OfflineApp, users: Sequence[int], conversation: Sequence[str],
+              options: LoadOptions) -> Dict[str, object]:
+    """
+    Run users in parallel threads of this process.
+
+    Args:
+        offline: Stand-ins of this process
+        users: User numbers to simulate
+        conversation: Script every user follows
+        options: Timeouts
+
+    Returns:
+        Dict[str, object]: Step results and the process's memory before,
+        at the peak of and after the run
+    """
+    gc.collect()
+    baseline = RSSSampler.current_bytes()
+    emails_before = len(offline.mailbox.sent)
+    sessions: List[AppTest] = []
+    results: Dict[int, List[StepResult]] = {}
+
+    def play(user: int) -> None:
+        results[user] = simulate_user(user, conversation, offline, options, sessions)
+
+    with RSSSampler() as rss:
+        started = time.perf_counter()
+        threads = [threading.Thread(target=play, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started
+    end = RSSSampler.current_bytes()
+    sessions.clear()
+
+    return {
+        'steps': [asdict(result) for user in users for result in results.get(user, [])],
+        'users': len(users),
+        'wall_seconds': wall_seconds,
+        'baseline_bytes': baseline,
+        'peak_bytes': rss.peak_bytes,
+        'end_bytes': end,
+        'emails_sent': len(offline.mailbox.sent) - emails_before,
+    }
+
+
+def _run_in_process(users: Sequence[int], conversation: Sequence[str], options: LoadOptions) -> Dict[str, object]:
+    """Process pool entry point: set up the stand-ins and run a share of the users."""
+    with tempfile.TemporaryDirectory(prefix="rag-load-") as workdir, offline_app(workdir, options) as offline:
+        return run_users(offline, users, conversation, options)
+
+
+def summarize(users: int, processes: int, runs: List[Dict[str, object]]) -> Dict[str, object]:
+    """
+    Combine the per-process results of one concurrency level.
+
+    Args:
+        users: Simulated users
+        processes: Processes they were spread over
+        runs: Results of `run_users`, one per process
+
+    Returns:
+        Dict[str, object]: Per-turn reruns and wall time, throughput and
+        memory growth per session
+    """
+    steps = [step for run in runs for step in run['steps']]
+    turns = [step for step in steps if step['kind'] == "turn"]
+    turn_ms = [step['seconds'] * 1000 for step in turns if step['error'] is None]
+    wall_seconds = max(run['wall_seconds'] for run in runs)
+    growth = sum(run['end_bytes'] - run['baseline_bytes'] for run in runs)
+
+    def mean_ms(kind: str) -> float:
+        values = [step['seconds'] * 1000 for step in steps if step['kind'] == kind and step['error'] is None]
+        return round(sum(values) / len(values), 1) if values else 0.0
+
+    return {
+        'users': users,
+        'processes': processes,
+        'turns': len(turns),
+        'errors': sum(step['error'] is not None for step in steps),
+        'reruns_per_turn': round(sum(step['reruns'] for step in turns) / len(turns), 2) if turns else 0.0,
+        'turn_p50_ms': round(_percentile(turn_ms, 0.50), 1),
+        'turn_p95_ms': round(_percentile(turn_ms, 0.95), 1),
+        'turn_p99_ms': round(_percentile(turn_ms, 0.99), 1),
+        'page_load_ms': mean_ms("load"),
+        'share_ms': mean_ms("share"),
+        'throughput_tps': round(len(turn_ms) / wall_seconds, 2) if wall_seconds else 0.0,
+        'peak_rss_mb': round(max(run['peak_bytes'] for run in runs) / 2 ** 20, 1),
+        'rss_growth_per_session_mb': round(growth / users / 2 ** 20, 2),
+        'emails_sent': sum(run['emails_sent'] for run in runs),
+        'first_errors': [step['error'] for step in steps if step['error']][:5],
+    }
+
+
+def run_load(levels: Sequence[int], processes: int = 1,
+             conversation: Sequence[str] = DEFAULT_CONVERSATION,
+             options: LoadOptions = LoadOptions()) -> List[Dict[str, object]]:
+    """
+    Run the conversation at each concurrency level.
+
+    With one process, all levels share the process and its stand-ins, so
+    memory freed by a level may be reused by the next and growth is a lower
+    bound. With several processes, each level starts fresh worker processes.
+
+    Args:
+        levels: Numbers of concurrent users
+        processes: Processes the users of a level are spread over
+        conversation: Script every user follows
+        options: Stand-in latencies and timeouts
+
+    Returns:
+        List[Dict[str, object]]: One summary per level
+    """
+    summaries = []
+    if processes <= 1:
+        with tempfile.TemporaryDirectory(prefix="rag-load-") as workdir, offline_app(workdir, options) as offline:
+            for users in levels:
+                summaries.append(summarize(users, 1, [run_users(offline, range(users), conversation, options)]))
+                _print_summary(summaries[-1])
+        return summaries
+
+    for users in levels:
+        shares = [list(range(users))[i::processes] for i in range(processes)]
+        shares = [share for share in shares if share]
+        with ProcessPoolExecutor(max_workers=len(shares), mp_context=get_context("spawn")) as pool:
+            runs = list(pool.map(_run_in_process, shares, [conversation] * len(shares),
+                                 [options] * len(shares)))
+        summaries.append(summarize(users, len(shares), runs))
+        _print_summary(summaries[-1])
+    return summaries
+
+
+def _print_summary(summary: Dict[str, object]) -> None:
+    print(f"{summary['users']:>4} users: {summary['reruns_per_turn']} reruns/turn, "
+          f"turn p50={summary['turn_p50_ms']}ms p95={summary['turn_p95_ms']}ms "
+          f"p99={summary['turn_p99_ms']}ms, {summary['throughput_tps']} turns/s, "
+          f"+{summary['rss_growth_per_session_mb']} MB/session, errors={summary['errors']}")
+
+
+def main():
+    """Command-line entry point for the load generator."""
+    parser = argparse.ArgumentParser(description="Concurrent multi-session load test of app.py.")
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 5, 10],
+                        help="Concurrency levels to run")
+    parser.add_argument('--processes', type=int, default=1, help="Spread each level's users over processes")
+    parser.add_argument('--conversation', help="JSON file with the list of steps every user sends")
+    parser.add_argument('--llm-latency', type=float, default=0.3)
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    parser.add_argument('--firestore-latency', type=float, default=0.02)
+    parser.add_argument('--smtp-latency', type=float, default=0.2)
+    parser.add_argument('--out', help="Write the summaries as JSON")
+    args = parser.parse_args()
+
+    conversation = DEFAULT_CONVERSATION
+    if args.conversation:
+        with open(args.conversation, encoding='utf-8') as f:
+            conversation = tuple(json.load(f))
+    options = LoadOptions(args.llm_latency, args.token_delay, args.firestore_latency, args.smtp_latency)
+    summaries = run_load(args.users, args.processes, conversation, options)
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'options': asdict(options), 'conversation': list(conversation), 'levels': summaries},
+                      f, indent=2, ensure_ascii=False)
+        print(f"Wrote {args.out}")
+    return 1 if any(summary['errors'] for summary in summaries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
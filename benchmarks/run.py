@@ -0,0 +1,478 @@
+"""
+End-to-end chat turn benchmark.
+Drives turns the way `app.main` does (`get_turn_pipeline().start_turn`,
+then the app's stream renderers and background `sync_chat_message`
+writes) inside Streamlit's AppTest runtime, against a fake
+Gemini, a local FAISS index and an in-memory Firestore. Reports latency
+percentiles, throughput and peak RSS per scenario and writes them as JSON,
+so results from two commits can be compared.
+
+Usage:
+    python -m benchmarks.run run --out benchmarks/results/head.json
+    python -m benchmarks.run run --scenario information --llm-latency 0.8
+    python -m benchmarks.run compare benchmarks/results/base.json benchmarks/results/head.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+from unittest import mock
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import auth.chat_history
+from rag.engine import RAGConfig, RAGEngine
+from rag.ingest import split_documents
+from rag.emergency import match_emergency
+from rag.local_index import build_local_index_from_documents
+from rag.pipeline import get_turn_pipeline
+from rag.playbooks import build_playbooks
+from services.tracing import bind_trace, get_tracer, new_turn_id
+
+from .fakes import InMemoryFirestore, sample_documents
+
+DEFAULT_RESULTS_DIR = os.path.join('benchmarks', 'results')
+
+# Regression threshold for `compare`, as a fraction of the base value
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """A workload: concurrent sessions each sending the queries in turn."""
+    name: str
+    queries: Sequence[str]
+    sessions: int
+    turns: int
+    language: str = "English"
+
+
+SCENARIOS = {
+    scenario.name: scenario for scenario in (
+        Scenario("greeting", ["hi", "hello", "thank you", "how are you", "bye", "salam"],
+                 sessions=4, turns=25),
+        Scenario("information", [
+            "What should I do to prepare for a flood?",
+            "How do I make an emergency kit?",
+            "What is the role of NDMA in disaster management?",
+            "Safety measures during an earthquake",
+            "How to purify water after a flood",
+            "What are the stages of disaster risk assessment?",
+            "How can I protect my family during a heatwave?",
+            "What should be in a household emergency plan?",
+        ], sessions=4, turns=25),
+        Scenario("emergency", [
+            "Help, the water is rising and we are trapped",
+            "There is a fire in my building",
+            "Earthquake! The walls are cracking",
+            "Someone is badly injured and bleeding",
+        ], sessions=4, turns=10),
+        Scenario("long_session", [
+            "hello",
+            "What should I do to prepare for a flood?",
+            "How do I make an emergency kit?",
+            "Safety measures during an earthquake",
+            "thank you",
+            "What is the role of NDMA in disaster management?",
+            "Help, the water is rising and we are trapped",
+            "How to purify water after a flood",
+        ], sessions=1, turns=120),
+    )
+}
+
+
+@dataclass
+class TurnRecord:
+    response_type: str
+    seconds: float
+    error: Optional[str] = None
+
+
+@dataclass
+class _Session:
+    """What an AppTest session script needs; looked up by ID from inside the script."""
+    engine: RAGEngine
+    user_id: str
+    queries: List[str]
+    language: str
+    records: List[TurnRecord] = field(default_factory=list)
+    # Failed background writes of assistant messages
+    write_errors: List[str] = field(default_factory=list)
+
+
+_sessions: Dict[str, _Session] = {}
+
+
+def run_session(session_id: str) -> None:
+    """
+    Run one benchmark session's turns; called from the AppTest script.
+
+    Mirrors the turn in `app.main`: start the turn in the shared turn
+    pipeline (which stores the user message, embeds, routes and classifies
+    the query, and retrieves and generates RAG answers), render the answer
+    stream, and store the answer in the background. The session waits for
+    its last writes before it ends.
+
+    Args:
+        session_id: Key of the registered session
+    """
+    import app
+    from auth.ui import sync_chat_message
+
+    session = _sessions[session_id]
+    engine = session.engine
+    pipeline = get_turn_pipeline()
+    st.session_state.input_language = session.language
+    st.session_state.output_language = session.language
+    st.session_state.messages = []
+
+    writes = []
+    for query in session.queries:
+        bind_trace(session_id, new_turn_id())
+        started = time.perf_counter()
+        response_type = "unknown"
+        try:
+            history = app.get_conversation_memory(engine).context()
+            st.session_state.messages.append({"role": "user", "content": query})
+            persist_user = app.with_script_context(sync_chat_message, session.user_id, "user", query,
+                                                   {'language': session.language})
+            turn = pipeline.start_turn(
+                engine, query, session.language,
+                classify=app.get_response_type, persist_user=persist_user,
+                priority="emergency" if match_emergency(query).is_emergency else "information",
+                history=history
+            )
+            placeholder = st.empty()
+            response_type = turn.response_type()
+            if response_type == "emergency":
+                response = app.render_stream(placeholder, app.stream_emergency_response(turn))
+            elif response_type in ("greeting", "out_of_domain"):
+                response = app.get_general_response(query, response_type)
+                placeholder.markdown(response)
+            else:
+                response = app.render_stream(placeholder, app.stream_rag_response(turn))
+            st.session_state.messages.append({"role": "assistant", "content": response})
+            app.get_conversation_memory(engine)
+            writes.append(pipeline.persist_response(turn, app.with_script_context(
+                sync_chat_message, session.user_id, "assistant", response,
+                {'language': session.language, 'type': response_type}
+            )))
+            session.records.append(TurnRecord(response_type, time.perf_counter() - started))
+        except Exception as e:
+            session.records.append(TurnRecord(response_type, time.perf_counter() - started, type(e).__name__))
+
+    for write in writes:
+        try:
+            write.result()
+        except Exception as e:
+            session.write_errors.append(f"sync_chat_message: {type(e).__name__}")
+
+
+def _session_script():
+    """AppTest script: runs the session named in session state."""
+    import streamlit as st
+
+    from benchmarks.run import run_session
+
+    run_session(st.session_state["benchmark_session"])
+
+
+class RSSSampler:
+    """Samples the process's resident set size in the background and keeps the peak."""
+
+    def __init__(self, interval_seconds: float = 0.02):
+        self.interval_seconds = interval_seconds
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    @staticmethod
+    def current_bytes() -> int:
+        """Current RSS; falls back to the lifetime peak where /proc is unavailable."""
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == 'darwin' else peak * 1024
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_bytes = max(self.peak_bytes, self.current_bytes())
+            self._stop.wait(self.interval_seconds)
+
+    def __enter__(self) -> "RSSSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self.current_bytes())
+
+
+def _percentile(values: List[float], quantile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(quantile * len(values)))] if values else 0.0
+
+
+def build_engine(workdir: str, embedding_backend: str, llm_options: Dict[str, float]) -> RAGEngine:
+    """
+    Build an offline engine over the sample corpus in a working directory.
+
+    Args:
+        workdir: Directory for the FAISS index and the response cache
+        embedding_backend: Embedding backend for the index and queries
+        llm_options: Stub LLM `latency_seconds` and `token_delay_seconds`
+
+    Returns:
+        RAGEngine: Engine in local retrieval mode with the stub LLM
+    """
+    index_dir = os.path.join(workdir, 'faiss')
+    config = RAGConfig(
+        llm_model="fake-primary",
+        fallback_llm_model="fake-fallback",
+        retrieval_mode="local",
+        local_index_dir=index_dir,
+        response_cache_path=os.path.join(workdir, f"responses-{time.time_ns()}.sqlite3"),
+        index_version="benchmark",
+        backend_mode="stub",
+        stub_llm_latency_seconds=llm_options['latency_seconds'],
+        stub_token_delay_seconds=llm_options['token_delay_seconds'],
+        embedding_backend=embedding_backend,
+        google_api_key="offline"
+    )
+    if not os.path.exists(os.path.join(index_dir, 'index.faiss')):
+        build_local_index_from_documents(split_documents(sample_documents()),
+                                         RAGEngine._create_embeddings(config), index_dir)
+    return RAGEngine(config)
+
+
+def run_scenario(scenario: Scenario, workdir: str, embedding_backend: str,
+                 llm_options: Dict[str, float], firestore_latency: float,
+                 playbook_path: str, sessions: Optional[int] = None,
+                 turns: Optional[int] = None) -> Dict[str, object]:
+    """
+    Run one scenario on a fresh engine and Firestore.
+
+    Args:
+        scenario: Workload to run
+        workdir: Working directory shared by the run
+        embedding_backend: Embedding backend of the engine
+        llm_options: Stub LLM latency settings
+        firestore_latency: Delay of every fake Firestore operation
+        playbook_path: Playbook file for emergency answers
+        sessions: Overrides the scenario's concurrent sessions
+        turns: Overrides the scenario's turns per session
+
+    Returns:
+        Dict[str, object]: Latency percentiles, throughput, peak RSS and
+        per-stage span percentiles
+    """
+    sessions = sessions or scenario.sessions
+    turns = turns or scenario.turns
+    engine = build_engine(workdir, embedding_backend, llm_options)
+    db = InMemoryFirestore(latency_seconds=firestore_latency)
+    queries = list(itertools.islice(itertools.cycle(scenario.queries), turns))
+    timeout = 60 + turns * (llm_options['latency_seconds'] + 2)
+
+    ids = []
+    for number in range(sessions):
+        session_id = f"{scenario.name}-{number}"
+        user_id = f"user-{number}"
+        db.collection('users').document(user_id).set({'email': f"{user_id}@example.com"})
+        _sessions[session_id] = _Session(engine, user_id, queries, scenario.language)
+        ids.append(session_id)
+
+    failures: List[str] = []
+
+    def drive(session_id: str) -> None:
+        app_test = AppTest.from_function(_session_script, default_timeout=timeout)
+        app_test.session_state["benchmark_session"] = session_id
+        app_test.run()
+        if app_test.exception:
+            failures.append(str(app_test.exception[0].message))
+        # Stream errors are rendered with st.error rather than raised
+        failures.extend(str(error.value) for error in app_test.error)
+
+    get_tracer().clear()
+    # Secrets are patched once for all sessions: AppTest swaps st.secrets
+    # globally for the duration of each run, which races between sessions
+    with mock.patch.object(auth.chat_history, 'get_firestore_db', return_value=db), \
+            mock.patch.object(st, 'secrets', {"PLAYBOOK_PATH": playbook_path}), RSSSampler() as rss:
+        started = time.perf_counter()
+        threads = [threading.Thread(target=drive, args=(session_id,)) for session_id in ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - started
+
+    finished = [_sessions.pop(session_id) for session_id in ids]
+    records = [record for session in finished for record in session.records]
+    failures.extend(error for session in finished for error in session.write_errors)
+    latencies = [record.seconds * 1000 for record in records if record.error is None]
+    response_types: Dict[str, int] = {}
+    for record in records:
+        response_types[record.response_type] = response_types.get(record.response_type, 0) + 1
+    stages = get_tracer().percentiles()
+    return {
+        'sessions': sessions,
+        'turns': len(records),
+        'errors': sum(record.error is not None for record in records) + len(failures),
+        'response_types': response_types,
+        'p50_ms': round(_percentile(latencies, 0.50), 2),
+        'p95_ms': round(_percentile(latencies, 0.95), 2),
+        'p99_ms': round(_percentile(latencies, 0.99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        'throughput_tps': round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        'wall_seconds': round(wall_seconds, 3),
+        'peak_rss_mb': round(rss.peak_bytes / 2 ** 20, 1),
+        'firestore_operations': db.operations,
+        'stages': {name: summary for name, summary in stages.items() if name != 'rerun'},
+        'failures': failures[:5],
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(scenarios: Sequence[str], llm_latency: float = 0.3, token_delay: float = 0.01,
+                   firestore_latency: float = 0.02, sessions: Optional[int] = None,
+                   turns: Optional[int] = None, embedding_backend: str = "hash") -> Dict[str, object]:
+    """
+    Run scenarios and collect their results.
+
+    Args:
+        scenarios: Names from `SCENARIOS`
+        llm_latency: Stub LLM time to first token
+        token_delay: Stub LLM time between tokens
+        firestore_latency: Delay of every fake Firestore operation
+        sessions: Overrides every scenario's concurrent sessions
+        turns: Overrides every scenario's turns per session
+        embedding_backend: "hash" for model-free embeddings, or "torch"/"onnx"
+            to include the real embedding model
+
+    Returns:
+        Dict[str, object]: Run metadata and results by scenario
+    """
+    llm_options = {'latency_seconds': llm_latency, 'token_delay_seconds': token_delay}
+
+    results: Dict[str, object] = {}
+    with tempfile.TemporaryDirectory(prefix="rag-benchmark-") as workdir:
+        playbook_path = os.path.join(workdir, 'playbooks.json')
+        build_playbooks(build_engine(workdir, embedding_backend, {'latency_seconds': 0.0, 'token_delay_seconds': 0.0}),
+                        playbook_path)
+        for name in scenarios:
+            results[name] = run_scenario(SCENARIOS[name], workdir, embedding_backend, llm_options,
+                                         firestore_latency, playbook_path, sessions, turns)
+            print(f"{name}: p50={results[name]['p50_ms']}ms p95={results[name]['p95_ms']}ms "
+                  f"p99={results[name]['p99_ms']}ms {results[name]['throughput_tps']} turns/s "
+                  f"peak RSS {results[name]['peak_rss_mb']} MB")
+
+    return {
+        'commit': _git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'settings': {
+            'llm_latency': llm_latency,
+            'token_delay': token_delay,
+            'firestore_latency': firestore_latency,
+            'embedding_backend': embedding_backend,
+            'scenarios': {name: asdict(SCENARIOS[name]) for name in scenarios},
+        },
+        'scenarios': results,
+    }
+
+
+def compare_results(base: Dict[str, object], head: Dict[str, object],
+                    threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Print how two result files differ and list the regressions.
+
+    Args:
+        base: Results of the reference commit
+        head: Results of the commit under test
+        threshold: Relative slowdown counted as a regression
+
+    Returns:
+        List[str]: One line per regressed metric
+    """
+    higher_is_worse = ('p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mb', 'errors')
+    regressions = []
+    print(f"{base.get('commit')} -> {head.get('commit')}")
+    for name, head_result in head['scenarios'].items():
+        base_result = base['scenarios'].get(name)
+        if base_result is None:
+            print(f"{name}: not in base")
+            continue
+        for metric in higher_is_worse + ('throughput_tps',):
+            old, new = base_result[metric], head_result[metric]
+            change = (new - old) / old if old else 0.0
+            print(f"{name:>14} {metric:<15} {old:>10} -> {new:<10} {change:+.1%}")
+            worse = change < -threshold if metric == 'throughput_tps' else change > threshold
+            if worse or (metric == 'errors' and new > old):
+                regressions.append(f"{name} {metric}: {old} -> {new}")
+    return regressions
+
+
+def main():
+    """Command-line entry point for running and comparing benchmarks."""
+    parser = argparse.ArgumentParser(description="Offline end-to-end chat turn benchmark.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help="Run scenarios and write the results")
+    run_parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                            help="Scenario to run (repeatable); all by default")
+    run_parser.add_argument('--llm-latency', type=float, default=0.3, help="Seconds to the first token")
+    run_parser.add_argument('--token-delay', type=float, default=0.01)
+    run_parser.add_argument('--firestore-latency', type=float, default=0.02)
+    run_parser.add_argument('--sessions', type=int, help="Concurrent sessions per scenario")
+    run_parser.add_argument('--turns', type=int, help="Turns per session")
+    run_parser.add_argument('--embeddings', default='hash', choices=['hash', 'torch', 'onnx'])
+    run_parser.add_argument('--out', help="Results file; benchmarks/results/<commit>.json by default")
+    compare_parser = subparsers.add_parser('compare', help="Compare two results files")
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('head')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.head, encoding='utf-8') as f:
+            head = json.load(f)
+        regressions = compare_results(base, head, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+
+    results = run_benchmarks(
+        args.scenario or list(SCENARIOS), args.llm_latency, args.token_delay,
+        args.firestore_latency, args.sessions, args.turns, args.embeddings
+    )
+    out = args.out or os.path.join(DEFAULT_RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Wrote {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
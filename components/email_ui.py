@@ -3,6 +3,7 @@ import streamlit as st
 import time
 from services.email_service import EmailService
 from components.location_picker import show_location_picker
+from rag.emergency import match_emergency
 
 def show_email_ui(messages, user_email="Anonymous", is_emergency=False):
     """
@@ -283,15 +284,10 @@ def show_email_ui(messages, user_email="Anonymous", is_emergency=False):
             # Auto-select emergency type if we can detect it from the messages
             default_index = 0
             if is_emergency:
-                last_message = messages[-1]["content"].lower() if messages else ""
-                if "flood" in last_message or "water" in last_message:
-                    default_index = display_options.index(emergency_labels["Flood"])
-                elif "earthquake" in last_message:
-                    default_index = display_options.index(emergency_labels["Earthquake"])
-                elif "fire" in last_message:
-                    default_index = display_options.index(emergency_labels["Fire"])
-                elif "medical" in last_message or "hurt" in last_message or "injured" in last_message:
-                    default_index = display_options.index(emergency_labels["Medical"])
+                last_message = messages[-1]["content"] if messages else ""
+                category = match_emergency(last_message).category
+                if category and category.capitalize() in emergency_labels:
+                    default_index = display_options.index(emergency_labels[category.capitalize()])
             
             selected_index = st.selectbox(
                 select_label,
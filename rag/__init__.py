@@ -0,0 +1,73 @@
+"""
+Retrieval-augmented generation package.
+
+The names below are imported from their submodules on first access, so the
+pure modules (admission, singleflight, memory, ...) and their tests import
+without the Gemini and Pinecone SDKs that `rag.engine` needs.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+_EXPORTS = {
+    'RAGConfig': '.engine',
+    'RAGEngine': '.engine',
+    'get_rag_engine': '.engine',
+    'PROMPT_VERSION': '.prompts',
+    'get_language_prompt': '.prompts',
+    'get_rag_prompt': '.prompts',
+    'SemanticCache': '.semantic_cache',
+    'ResponseCache': '.response_cache',
+    'normalize_query': '.normalize',
+    'CachedEmbeddings': '.embedding_cache',
+    'MicroBatchingEmbeddings': '.batcher',
+    'SingleFlight': '.singleflight',
+    'AdmissionController': '.admission',
+    'AdmissionRejected': '.admission',
+    'ConversationContext': '.memory',
+    'ConversationMemory': '.memory',
+    'ChatTurn': '.pipeline',
+    'TurnPipeline': '.pipeline',
+    'get_turn_pipeline': '.pipeline',
+    'CircuitBreaker': '.resilience',
+    'LLMUnavailableError': '.resilience',
+    'ResilientLLM': '.resilience',
+    'IntentResult': '.intent',
+    'IntentRouter': '.intent',
+    'EmergencyMatch': '.emergency',
+    'match_emergency': '.emergency',
+    'Playbooks': '.playbooks',
+    'detect_disaster_type': '.playbooks',
+    'load_playbooks': '.playbooks',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .admission import AdmissionController, AdmissionRejected
+    from .batcher import MicroBatchingEmbeddings
+    from .embedding_cache import CachedEmbeddings
+    from .emergency import EmergencyMatch, match_emergency
+    from .engine import RAGConfig, RAGEngine, get_rag_engine
+    from .intent import IntentResult, IntentRouter
+    from .memory import ConversationContext, ConversationMemory
+    from .normalize import normalize_query
+    from .pipeline import ChatTurn, TurnPipeline, get_turn_pipeline
+    from .playbooks import Playbooks, detect_disaster_type, load_playbooks
+    from .prompts import PROMPT_VERSION, get_language_prompt, get_rag_prompt
+    from .resilience import CircuitBreaker, LLMUnavailableError, ResilientLLM
+    from .response_cache import ResponseCache
+    from .semantic_cache import SemanticCache
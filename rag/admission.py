@@ -0,0 +1,229 @@
+"""
+Priority-aware admission control.
+Bounded, priority-ordered queues in front of the LLM and the embedder, so
+under a surge an emergency is served before information requests, and
+background work is shed instead of making everyone wait.
+"""
+import bisect
+import itertools
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Lower value is served first; conversation summaries are background work
+PRIORITIES = {"emergency": 0, "information": 1, "greeting": 2, "out_of_domain": 2, "summary": 3}
+DEFAULT_PRIORITY = "information"
+
+# Classes at or below this priority are shed once they have waited too long;
+# user-facing classes only when the queue is over its hard limit
+SHED_PRIORITY = PRIORITIES["summary"]
+
+
+class AdmissionRejected(RuntimeError):
+    """A request was shed or the queue was full."""
+
+
+class Ticket:
+    """A request's place in an admission queue; release it when done."""
+
+    def __init__(self, controller: "AdmissionController", response_type: str, sequence: int):
+        self.controller = controller
+        self.response_type = response_type
+        self.priority = PRIORITIES.get(response_type, PRIORITIES[DEFAULT_PRIORITY])
+        self.sequence = sequence
+        self.enqueued = time.perf_counter()
+        self.admitted: Optional[float] = None
+        self.shed = False
+        self._released = False
+
+    def __lt__(self, other: "Ticket") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+    def __enter__(self) -> "Ticket":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    @property
+    def waiting(self) -> bool:
+        return self.admitted is None and not self.shed
+
+    def position(self) -> int:
+        """1-based place in the queue, or 0 once admitted."""
+        return self.controller.position(self)
+
+    def eta_seconds(self) -> float:
+        """Estimated wait until admission."""
+        return self.controller.eta_seconds(self)
+
+    def release(self) -> None:
+        """Give the slot back; safe to call more than once."""
+        if self.admitted is not None and not self._released:
+            self._released = True
+            self.controller.release(self)
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded priority queue.
+
+    Up to `concurrency` tickets are admitted at a time; the others wait in
+    (priority, arrival) order. When the queue is full a newcomer displaces
+    the most recent request of a lower class, or is rejected. A summary
+    that has waited longer than `shed_after_seconds` is shed. Information
+    requests and greetings are only shed that way while more than
+    `shed_queue_limit` requests wait, and then only from the lowest class in
+    the queue. Emergencies are never shed.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_queue: int = 200,
+                 shed_after_seconds: Optional[float] = None, shed_queue_limit: Optional[int] = None):
+        """
+        Args:
+            name: Resource name used in stats
+            concurrency: Requests served at once
+            max_queue: Requests allowed to wait
+            shed_after_seconds: Wait after which background work is shed; never when None
+            shed_queue_limit: Queue length above which user-facing requests are
+                shed too; half of `max_queue` when None
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.shed_after_seconds = shed_after_seconds
+        self.shed_queue_limit = max_queue // 2 if shed_queue_limit is None else shed_queue_limit
+        self._condition = threading.Condition()
+        self._waiting: List[Ticket] = []
+        self._active = 0
+        self._sequence = itertools.count()
+        # Moving average of how long a slot is held
+        self._service_seconds = 1.0
+        self._stats: Dict[str, Dict[str, float]] = {
+            response_type: {'admitted': 0, 'shed': 0, 'rejected': 0, 'wait_seconds': 0.0}
+            for response_type in PRIORITIES
+        }
+
+    def acquire(self, response_type: str = DEFAULT_PRIORITY,
+                on_queued: Optional[Callable[[Ticket], None]] = None) -> Ticket:
+        """
+        Wait for a slot.
+
+        Args:
+            response_type: Priority class of the request
+            on_queued: Called with the ticket if the request has to wait
+
+        Returns:
+            Ticket: Admitted ticket; release it (or use it as a context manager)
+
+        Raises:
+            AdmissionRejected: The request was shed or the queue was full
+        """
+        with self._condition:
+            ticket = Ticket(self, response_type, next(self._sequence))
+            if self._active < self.concurrency and not self._waiting:
+                self._admit(ticket)
+                return ticket
+            if len(self._waiting) >= self.max_queue:
+                worst = self._waiting[-1]
+                if worst.priority > ticket.priority:
+                    self._shed(worst)
+                else:
+                    self._count(ticket, 'rejected')
+                    raise AdmissionRejected(f"{self.name} queue is full")
+            bisect.insort(self._waiting, ticket)
+
+        if on_queued is not None:
+            on_queued(ticket)
+
+        with self._condition:
+            while True:
+                if ticket.shed:
+                    raise AdmissionRejected(f"Shed from the {self.name} queue")
+                if self._waiting[0] is ticket and self._active < self.concurrency:
+                    self._waiting.pop(0)
+                    self._admit(ticket)
+                    self._condition.notify_all()
+                    return ticket
+
+                timeout = None
+                if self.shed_after_seconds is not None and ticket.priority > 0:
+                    remaining = ticket.enqueued + self.shed_after_seconds - time.perf_counter()
+                    if remaining <= 0:
+                        if self._sheddable(ticket):
+                            self._shed(ticket)
+                            continue
+                        remaining = 0.5
+                    timeout = remaining
+                self._condition.wait(timeout)
+
+    def release(self, ticket: Ticket) -> None:
+        """Return a ticket's slot and wake the queue."""
+        with self._condition:
+            self._active -= 1
+            held = time.perf_counter() - ticket.admitted
+            self._service_seconds = 0.9 * self._service_seconds + 0.1 * held
+            self._condition.notify_all()
+
+    def position(self, ticket: Ticket) -> int:
+        with self._condition:
+            if not ticket.waiting:
+                return 0
+            return bisect.bisect_left(self._waiting, ticket) + 1
+
+    def eta_seconds(self, ticket: Ticket) -> float:
+        position = self.position(ticket)
+        if position == 0:
+            return 0.0
+        return math.ceil(position / self.concurrency) * self._service_seconds
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get admission metrics.
+
+        Returns:
+            Dict[str, object]: Active and queued requests, mean slot time and
+            admitted/shed/rejected counts and mean wait per class
+        """
+        with self._condition:
+            per_class = {
+                response_type: {
+                    'admitted': int(counts['admitted']),
+                    'shed': int(counts['shed']),
+                    'rejected': int(counts['rejected']),
+                    'avg_wait_ms': counts['wait_seconds'] / counts['admitted'] * 1000
+                    if counts['admitted'] else 0.0
+                }
+                for response_type, counts in self._stats.items()
+            }
+            return {
+                'active': self._active,
+                'queued': len(self._waiting),
+                'concurrency': self.concurrency,
+                'avg_service_ms': self._service_seconds * 1000,
+                'classes': per_class
+            }
+
+    def _admit(self, ticket: Ticket) -> None:
+        self._active += 1
+        ticket.admitted = time.perf_counter()
+        self._count(ticket, 'admitted')
+        self._stats[ticket.response_type]['wait_seconds'] += ticket.admitted - ticket.enqueued
+
+    def _sheddable(self, ticket: Ticket) -> bool:
+        """Whether a waiting ticket past `shed_after_seconds` may be shed now."""
+        if ticket.priority >= SHED_PRIORITY:
+            return True
+        return len(self._waiting) > self.shed_queue_limit and ticket.priority == self._waiting[-1].priority
+
+    def _shed(self, ticket: Ticket) -> None:
+        self._waiting.remove(ticket)
+        ticket.shed = True
+        self._count(ticket, 'shed')
+        self._condition.notify_all()
+
+    def _count(self, ticket: Ticket, outcome: str) -> None:
+        self._stats.setdefault(
+            ticket.response_type, {'admitted': 0, 'shed': 0, 'rejected': 0, 'wait_seconds': 0.0}
+        )[outcome] += 1
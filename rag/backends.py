@@ -0,0 +1,433 @@
+"""
+Pluggable LLM and vector search backends.
+Besides the live Gemini and Pinecone clients, the engine can run on:
+
+- record: the live clients, with every completed request appended to a
+  cassette file together with its timing
+- replay: responses served from a cassette with the recorded latency,
+  optionally scaled, without any network access or embedding model
+- stub: deterministic synthetic answers and chunks with a fixed latency
+
+Cassettes are JSON lines, gzip-compressed when the path ends in `.gz`.
+LLM requests are keyed by prompt, searches by the rounded query vector and
+filter, and embeddings by text. The index version and tagging state read
+at startup are recorded too, so a replay filters exactly like the recorded
+session. `HashEmbeddings` stands in for the embedding model where no
+recording is needed.
+
+Usage:
+    python -m rag.backends info rag_cassette.jsonl.gz
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+BACKEND_MODES = ("live", "record", "replay", "stub")
+
+DEFAULT_CASSETTE_PATH = "rag_cassette.jsonl.gz"
+
+# Cassette key of the recorded index version and tagging state
+INDEX_INFO_KEY = "index"
+
+# Vector components are rounded before hashing so replays survive float noise
+SEARCH_KEY_DECIMALS = 3
+
+_VOCABULARY = (
+    "move to higher ground, keep an emergency kit ready, boil water before drinking, "
+    "follow the instructions of local authorities, stay away from damaged buildings, "
+    "check on elderly neighbours, keep a battery radio, store important documents safely, "
+    "call 1122 for rescue, do not walk through moving water, drop cover and hold on, "
+    "turn off gas and electricity, use stairs instead of lifts, drink plenty of water"
+).split(", ")
+
+
+class CassetteMiss(LookupError):
+    """A replayed request is not in the cassette."""
+
+
+def llm_key(prompt: str) -> str:
+    """Cassette key of an LLM request."""
+    return hashlib.sha1(f"llm\0{prompt}".encode('utf-8')).hexdigest()
+
+
+def embedding_key(text: str) -> str:
+    """Cassette key of an embedded text."""
+    return hashlib.sha1(f"embed\0{text}".encode('utf-8')).hexdigest()
+
+
+def search_key(vector: Sequence[float], k: int, search_filter: Optional[dict] = None) -> str:
+    """Cassette key of a vector search."""
+    rounded = ",".join(f"{value:.{SEARCH_KEY_DECIMALS}f}" for value in vector)
+    scope = json.dumps(search_filter, sort_keys=True) if search_filter else ""
+    return hashlib.sha1(f"search\0{k}\0{scope}\0{rounded}".encode('utf-8')).hexdigest()
+
+
+def synthetic_words(seed: str, count: int) -> List[str]:
+    """
+    Deterministic disaster-advice text.
+
+    Args:
+        seed: Same seed, same text
+        count: Words to produce
+
+    Returns:
+        List[str]: Words, each followed by a space
+    """
+    rng = random.Random(int.from_bytes(hashlib.sha1(seed.encode('utf-8')).digest()[:8], 'big'))
+    words: List[str] = []
+    while len(words) < count:
+        words += (rng.choice(_VOCABULARY).capitalize() + ".").split(" ")
+    return [word + " " for word in words[:count]]
+
+
+class Cassette:
+    """
+    Recorded LLM responses and search results.
+
+    In record mode entries are appended to the file as they complete; in
+    replay mode the whole file is loaded up front. A request recorded more
+    than once is replayed in recording order, then from the start again.
+    """
+
+    def __init__(self, path: str, mode: str):
+        """
+        Args:
+            path: Cassette file
+            mode: "record" or "replay"
+
+        Raises:
+            FileNotFoundError: Replaying a cassette that does not exist
+        """
+        self.path = path
+        self.mode = mode
+        self._entries: Dict[str, List[dict]] = {}
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if mode == "replay":
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No cassette at '{path}'. Record one with RAG_BACKEND=record.")
+            with self._open('r') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry['key'], []).append(entry)
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _open(self, mode: str):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, mode + 't', encoding='utf-8')
+        return open(self.path, mode, encoding='utf-8')
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def append(self, entry: dict) -> None:
+        """Store an entry and write it to the file."""
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with self._lock:
+            self._entries.setdefault(entry['key'], []).append(entry)
+            with self._open('a') as f:
+                f.write(line)
+
+    def lookup(self, key: str) -> dict:
+        """
+        Get the next recording of a request.
+
+        Raises:
+            CassetteMiss: The request was never recorded
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"Request {key[:12]} is not in the cassette '{self.path}'")
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            return entries[served % len(entries)]
+
+    def summary(self) -> Dict[str, object]:
+        """Entry counts and recorded latencies by kind."""
+        with self._lock:
+            entries = [entry for recorded in self._entries.values() for entry in recorded]
+        summary: Dict[str, object] = {'path': self.path, 'entries': len(entries)}
+        for kind in ("llm", "search", "embed"):
+            seconds = sorted(entry['seconds'] for entry in entries if entry['kind'] == kind)
+            summary[kind] = {
+                'count': len(seconds),
+                'p50_ms': round(seconds[len(seconds) // 2] * 1000, 1) if seconds else 0.0,
+                'max_ms': round(seconds[-1] * 1000, 1) if seconds else 0.0,
+            }
+        return summary
+
+
+def _message(content: str, model: str) -> AIMessage:
+    """Chat model response tagged with the model that produced it."""
+    return AIMessage(content=content, response_metadata={'model_name': model})
+
+
+def _chunk(content: str, model: str) -> AIMessageChunk:
+    """Streamed chat model chunk tagged with the model that produced it."""
+    return AIMessageChunk(content=content, response_metadata={'model_name': model})
+
+
+def _sleep_until(started: float, offset: float) -> None:
+    remaining = started + offset - time.perf_counter()
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+class RecordingChatModel:
+    """Chat model wrapper that records completed responses with chunk timings."""
+
+    def __init__(self, inner, cassette: Cassette, model: str):
+        self.inner = inner
+        self.cassette = cassette
+        self.model = model
+
+    def _record(self, prompt: str, chunks: List[List[object]], seconds: float) -> None:
+        self.cassette.append({'kind': 'llm', 'key': llm_key(str(prompt)), 'model': self.model,
+                              'seconds': round(seconds, 4), 'chunks': chunks})
+
+    def invoke(self, prompt: str):
+        started = time.perf_counter()
+        message = self.inner.invoke(prompt)
+        seconds = time.perf_counter() - started
+        self._record(prompt, [[round(seconds, 4), message.content]], seconds)
+        return message
+
+    def stream(self, prompt: str) -> Iterator[object]:
+        started = time.perf_counter()
+        chunks = []
+        stream = self.inner.stream(prompt)
+        try:
+            for chunk in stream:
+                chunks.append([round(time.perf_counter() - started, 4), chunk.content])
+                yield chunk
+        finally:
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+        # Only streams read to the end are recorded
+        self._record(prompt, chunks, time.perf_counter() - started)
+
+
+class ReplayChatModel:
+    """Chat model that serves recorded responses with their recorded timing."""
+
+    def __init__(self, cassette: Cassette, model: str, latency_scale: float = 1.0):
+        """
+        Args:
+            cassette: Cassette to replay
+            model: Model name reported on every message
+            latency_scale: Multiplier of the recorded delays; 0 replays instantly
+        """
+        self.cassette = cassette
+        self.model = model
+        self.latency_scale = latency_scale
+
+    def invoke(self, prompt: str) -> AIMessage:
+        entry = self.cassette.lookup(llm_key(str(prompt)))
+        time.sleep(entry['seconds'] * self.latency_scale)
+        return _message("".join(text for _, text in entry['chunks']), self.model)
+
+    def stream(self, prompt: str) -> Iterator[AIMessageChunk]:
+        entry = self.cassette.lookup(llm_key(str(prompt)))
+        started = time.perf_counter()
+        for offset, text in entry['chunks']:
+            _sleep_until(started, offset * self.latency_scale)
+            yield _chunk(text, self.model)
+
+
+class StubChatModel:
+    """
+    Deterministic synthetic chat model.
+
+    The same prompt always produces the same answer. A call waits
+    `latency_seconds` before the first token and `token_delay_seconds`
+    between tokens, like a streamed Gemini response.
+    """
+
+    def __init__(self, model: str, latency_seconds: float = 0.3,
+                 token_delay_seconds: float = 0.01, tokens: int = 60):
+        """
+        Args:
+            model: Model name reported on every message
+            latency_seconds: Time to the first token
+            token_delay_seconds: Time between tokens
+            tokens: Tokens per answer
+        """
+        self.model = model
+        self.latency_seconds = latency_seconds
+        self.token_delay_seconds = token_delay_seconds
+        self.tokens = tokens
+
+    def invoke(self, prompt: str) -> AIMessage:
+        tokens = synthetic_words(str(prompt), self.tokens)
+        time.sleep(self.latency_seconds + self.token_delay_seconds * len(tokens))
+        return _message("".join(tokens), self.model)
+
+    def stream(self, prompt: str) -> Iterator[AIMessageChunk]:
+        tokens = synthetic_words(str(prompt), self.tokens)
+        time.sleep(self.latency_seconds)
+        for token in tokens:
+            time.sleep(self.token_delay_seconds)
+            yield _chunk(token, self.model)
+
+
+def _to_entry_docs(scored: Sequence[Tuple[Document, float]]) -> List[dict]:
+    return [{'text': doc.page_content, 'metadata': doc.metadata, 'score': score} for doc, score in scored]
+
+
+def _from_entry_docs(docs: Sequence[dict]) -> List[Tuple[Document, float]]:
+    return [(Document(page_content=doc['text'], metadata=doc.get('metadata') or {}), doc.get('score', 0.0))
+            for doc in docs]
+
+
+class RecordingVectorStore:
+    """Vector store wrapper that records search results with their latency."""
+
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               **kwargs) -> List[Tuple[Document, float]]:
+        started = time.perf_counter()
+        scored = self.inner.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)
+        self.cassette.append({'kind': 'search', 'key': search_key(embedding, k, kwargs.get('filter')),
+                              'seconds': round(time.perf_counter() - started, 4),
+                              'docs': _to_entry_docs(scored)})
+        return scored
+
+
+class ReplayVectorStore:
+    """Vector store that serves recorded search results with their recorded latency."""
+
+    def __init__(self, cassette: Cassette, latency_scale: float = 1.0):
+        self.cassette = cassette
+        self.latency_scale = latency_scale
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               **kwargs) -> List[Tuple[Document, float]]:
+        entry = self.cassette.lookup(search_key(embedding, k, kwargs.get('filter')))
+        time.sleep(entry['seconds'] * self.latency_scale)
+        return _from_entry_docs(entry['docs'])
+
+
+class StubVectorStore:
+    """Vector store that returns deterministic synthetic chunks."""
+
+    def __init__(self, latency_seconds: float = 0.05, words_per_chunk: int = 80):
+        self.latency_seconds = latency_seconds
+        self.words_per_chunk = words_per_chunk
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               **kwargs) -> List[Tuple[Document, float]]:
+        time.sleep(self.latency_seconds)
+        seed = search_key(embedding, k, kwargs.get('filter'))
+        return [(Document(page_content="".join(synthetic_words(f"{seed}:{i}", self.words_per_chunk)).strip(),
+                          metadata={'source': 'stub', 'chunk': i}), 1.0 - i / k)
+                for i in range(k)]
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Normalized feature-hashing embeddings over words and word pairs.
+
+    Texts sharing words get similar vectors, which is enough to exercise
+    retrieval, caching and routing without loading a model.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        words = re.findall(r"\w+", text.casefold())
+        for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            code = zlib.crc32(feature.encode('utf-8'))
+            vector[code % self.dimension] += 1.0 if code & 0x80000000 else -1.0
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            vector[0], norm = 1.0, 1.0
+        return (vector / norm).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class RecordingEmbeddings(Embeddings):
+    """Embeddings wrapper that records every vector with its share of the encode time."""
+
+    def __init__(self, inner: Embeddings, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def _record(self, texts: List[str], vectors: List[List[float]], seconds: float) -> None:
+        for text, vector in zip(texts, vectors):
+            self.cassette.append({'kind': 'embed', 'key': embedding_key(text),
+                                  'seconds': round(seconds / len(texts), 4),
+                                  'vector': [float(value) for value in vector]})
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        vectors = self.inner.embed_documents(texts)
+        self._record(texts, vectors, time.perf_counter() - started)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        started = time.perf_counter()
+        vector = self.inner.embed_query(text)
+        self._record([text], [vector], time.perf_counter() - started)
+        return vector
+
+
+class ReplayEmbeddings(Embeddings):
+    """Embeddings that serve recorded vectors, so replays need no embedding model."""
+
+    def __init__(self, cassette: Cassette, latency_scale: float = 1.0):
+        self.cassette = cassette
+        self.latency_scale = latency_scale
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        entries = [self.cassette.lookup(embedding_key(text)) for text in texts]
+        time.sleep(sum(entry['seconds'] for entry in entries) * self.latency_scale)
+        return [entry['vector'] for entry in entries]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def main():
+    """Command-line entry point for inspecting cassettes."""
+    parser = argparse.ArgumentParser(description="Inspect a RAG backend cassette.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    info = subparsers.add_parser('info', help="Show entry counts and recorded latencies")
+    info.add_argument('path', nargs='?', default=DEFAULT_CASSETTE_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(json.dumps(Cassette(args.path, "replay").summary(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Cross-session embedding micro-batcher.
+Collects query encodes arriving from concurrent sessions for a few
+milliseconds and runs them through the model as one batch.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that batches `embed_query` calls across threads.
+
+    Each caller enqueues its text and blocks on a future. A single worker
+    thread takes the first waiting request, keeps collecting until the batch
+    is full or `max_wait_ms` has passed, encodes the batch with one
+    `embed_documents` call and resolves every future. `embed_documents`
+    calls are already batched and go straight to the wrapped embeddings.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Start the batching worker.
+
+        Args:
+            embeddings: Underlying embeddings implementation
+            max_batch_size: Maximum queries per encode
+            max_wait_ms: Longest a query waits for others to join its batch
+        """
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._queries = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._histogram: Dict[int, int] = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self._histogram[-1] = 0  # Larger than the last bucket
+
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query as part of the next batch."""
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future.result()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents directly."""
+        return self.embeddings.embed_documents(texts)
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get batching metrics.
+
+        Returns:
+            Dict[str, object]: Queue depth, batch counts, batch-size
+            histogram and the wait added to queries
+        """
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'queries': self._queries,
+                'avg_batch_size': self._queries / self._batches if self._batches else 0.0,
+                'batch_size_histogram': {
+                    (f"<={bucket}" if bucket > 0 else f">{BATCH_SIZE_BUCKETS[-1]}"): count
+                    for bucket, count in self._histogram.items()
+                },
+                'avg_added_wait_ms': self._wait_seconds / self._queries * 1000 if self._queries else 0.0,
+                'max_added_wait_ms': self._max_wait_seconds * 1000
+            }
+
+    def _run(self) -> None:
+        """Worker loop: gather a batch, encode it, hand back the results."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            started = time.perf_counter()
+            self._record(batch, started)
+            # Identical questions sent by several sessions are encoded once
+            unique = list(dict.fromkeys(text for text, _, _ in batch))
+            try:
+                vectors = dict(zip(unique, self.embeddings.embed_documents(unique)))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for text, future, _ in batch:
+                future.set_result(vectors[text])
+
+    def _record(self, batch: List[Tuple[str, Future, float]], started: float) -> None:
+        """Update metrics for a batch about to be encoded."""
+        with self._lock:
+            self._batches += 1
+            self._queries += len(batch)
+            for _, _, enqueued in batch:
+                waited = started - enqueued
+                self._wait_seconds += waited
+                self._max_wait_seconds = max(self._max_wait_seconds, waited)
+            bucket = next((b for b in BATCH_SIZE_BUCKETS if len(batch) <= b), -1)
+            self._histogram[bucket] += 1
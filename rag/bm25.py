@@ -0,0 +1,148 @@
+"""
+Sparse BM25 retrieval and rank fusion.
+Keyword search over the same chunks as the dense index catches exact matches
+on helpline numbers, place names and acronyms that embeddings miss. Results
+from both retrievers are combined with reciprocal rank fusion.
+"""
+import hashlib
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .normalize import normalize_query
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized terms."""
+    return normalize_query(text).split()
+
+
+def document_key(doc: Document) -> str:
+    """Stable identity of a chunk, shared by dense and sparse results."""
+    return hashlib.sha1(doc.page_content.encode('utf-8')).hexdigest()
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index.
+
+    Postings are stored per term as two compact arrays: document numbers
+    (uint32) and term frequencies (uint16). Scoring a query touches only the
+    postings of its terms and accumulates into one float32 score vector.
+    """
+
+    def __init__(self, documents: Sequence[Document], k1: float = 1.5, b: float = 0.75):
+        """
+        Index a set of chunks.
+
+        Args:
+            documents: Chunks to index
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.documents = list(documents)
+        self.k1 = k1
+
+        doc_ids: Dict[str, array] = {}
+        term_freqs: Dict[str, array] = {}
+        lengths = np.zeros(len(self.documents), dtype=np.float32)
+
+        for number, doc in enumerate(self.documents):
+            counts: Dict[str, int] = {}
+            for term in tokenize(doc.page_content):
+                counts[term] = counts.get(term, 0) + 1
+            lengths[number] = sum(counts.values())
+            for term, count in counts.items():
+                doc_ids.setdefault(term, array('I')).append(number)
+                term_freqs.setdefault(term, array('H')).append(min(count, 0xFFFF))
+
+        count = max(len(self.documents), 1)
+        avg_length = float(lengths.mean()) if len(self.documents) else 1.0
+        # Per-document part of the BM25 denominator
+        self._length_norm = k1 * (1 - b + b * lengths / max(avg_length, 1e-9))
+
+        self._postings = {
+            term: (np.frombuffer(doc_ids[term], dtype=np.uint32),
+                   np.frombuffer(term_freqs[term], dtype=np.uint16).astype(np.float32))
+            for term in doc_ids
+        }
+        self._idf = {
+            term: float(np.log(1 + (count - len(ids) + 0.5) / (len(ids) + 0.5)))
+            for term, (ids, _) in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def mask(self, predicate: Callable[[Document], bool]) -> np.ndarray:
+        """
+        Mark the indexed chunks that satisfy a condition, for `search`.
+
+        Args:
+            predicate: Condition on a chunk
+
+        Returns:
+            np.ndarray: Boolean array over the indexed chunks
+        """
+        return np.fromiter((predicate(doc) for doc in self.documents), dtype=bool, count=len(self.documents))
+
+    def search(self, query: str, k: int = 6, mask: Optional[np.ndarray] = None) -> List[Document]:
+        """
+        Find the chunks that best match the query terms.
+
+        Args:
+            query: User's question
+            k: Number of results
+            mask: Chunks eligible for the results, from `mask`; all when None
+
+        Returns:
+            List[Document]: Best matching chunks, highest score first
+        """
+        if not self.documents:
+            return []
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            ids, tfs = postings
+            scores[ids] += self._idf[term] * tfs * (self.k1 + 1) / (tfs + self._length_norm[ids])
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        ranked = matched[np.argsort(-scores[matched], kind='stable')]
+        return [self.documents[i] for i in ranked]
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[Sequence[Document]], k: int = 6,
+                           rrf_k: int = 60) -> List[Document]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Each document scores the sum of 1 / (rrf_k + rank) over the lists it
+    appears in; duplicates are recognised by content.
+
+    Args:
+        result_lists: Ranked results from each retriever
+        k: Number of fused results
+        rrf_k: Rank offset damping the influence of top positions
+
+    Returns:
+        List[Document]: Fused results, best first
+    """
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = document_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:k]]
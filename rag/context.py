@@ -0,0 +1,107 @@
+"""
+Context packing for the stuff prompt.
+Between retrieval and generation, drops near-duplicate chunks, picks a
+diverse subset with maximal marginal relevance, and trims the result to a
+token budget so Gemini is not billed for repeated text.
+"""
+import logging
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for Gemini on mixed English/Urdu text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without calling the tokenizer."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class PackingStats:
+    """What context packing did for one request."""
+    candidates: int
+    kept: int
+    duplicates: int
+    tokens_in: int
+    tokens_out: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+
+def pack_context(query_vector: Sequence[float], docs: Sequence[Document],
+                 doc_vectors: Sequence[Sequence[float]], max_docs: int = 6,
+                 token_budget: int = 1500, mmr_lambda: float = 0.7,
+                 duplicate_threshold: float = 0.95) -> Tuple[List[Document], PackingStats]:
+    """
+    Select the chunks to stuff into the prompt.
+
+    Args:
+        query_vector: Normalized query embedding
+        docs: Retrieved chunks, best first
+        doc_vectors: Normalized embeddings of `docs`
+        max_docs: Maximum chunks to keep
+        token_budget: Maximum estimated tokens of context
+        mmr_lambda: Trade-off between relevance (1.0) and diversity (0.0)
+        duplicate_threshold: Cosine similarity above which chunks count as duplicates
+
+    Returns:
+        Tuple[List[Document], PackingStats]: Chosen chunks in prompt order and stats
+    """
+    tokens_in = sum(estimate_tokens(doc.page_content) for doc in docs)
+    if not docs:
+        return [], PackingStats(0, 0, 0, 0, 0)
+
+    vectors = np.asarray(doc_vectors, dtype=np.float32)
+    relevance = vectors @ np.asarray(query_vector, dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    # Greedy MMR; near-duplicates of an already chosen chunk are ruled out
+    candidates = np.ones(len(docs), dtype=bool)
+    max_similarity = np.full(len(docs), -np.inf, dtype=np.float32)
+    selected: List[int] = []
+    duplicates = 0
+    while candidates.any() and len(selected) < max_docs:
+        if selected:
+            scores = mmr_lambda * relevance - (1 - mmr_lambda) * max_similarity
+        else:
+            scores = relevance.copy()
+        scores[~candidates] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        candidates[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+
+        duplicate = candidates & (similarity[best] >= duplicate_threshold)
+        duplicates += int(duplicate.sum())
+        candidates &= ~duplicate
+
+    # Fill the budget in MMR order
+    packed: List[Document] = []
+    tokens_out = 0
+    for index in selected:
+        doc = docs[index]
+        tokens = estimate_tokens(doc.page_content)
+        if tokens_out + tokens > token_budget:
+            if packed:
+                continue
+            # Always keep at least the most relevant chunk, trimmed to fit
+            doc = Document(page_content=doc.page_content[:token_budget * CHARS_PER_TOKEN],
+                           metadata=doc.metadata)
+            tokens = estimate_tokens(doc.page_content)
+        packed.append(doc)
+        tokens_out += tokens
+
+    stats = PackingStats(len(docs), len(packed), duplicates, tokens_in, tokens_out)
+    logger.info(
+        "Context packing kept %d/%d chunks (%d duplicates), %d tokens, saved %d",
+        stats.kept, stats.candidates, stats.duplicates, stats.tokens_out, stats.tokens_saved
+    )
+    return packed, stats
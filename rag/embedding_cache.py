@@ -0,0 +1,252 @@
+"""
+Query and document embedding cache.
+Wraps an embeddings object so repeated texts are encoded once: vectors are
+kept in bounded in-memory LRUs, one for queries and one for documents, and
+optionally spilled to memory-mapped files on disk that survive restarts.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .normalize import normalize_query
+
+
+class DiskVectorStore:
+    """
+    Append-only on-disk store of float32 vectors.
+
+    Vectors are written to a flat file read back through `np.memmap`, and a
+    small SQLite table maps text keys to row numbers. The vector dimension is
+    recorded on the first write.
+    """
+
+    def __init__(self, directory: str, namespace: str, max_rows: int = 200_000):
+        """
+        Open (or create) the store.
+
+        Args:
+            directory: Directory holding the store files
+            namespace: Backend and model identifier, so different models never share rows
+            max_rows: Rows after which new vectors are no longer spilled
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.max_rows = max_rows
+        self._vectors_path = os.path.join(directory, f"{namespace}.f32")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(directory, f"{namespace}.sqlite3"), check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, row INTEGER NOT NULL)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self._conn.commit()
+        found = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim: Optional[int] = found[0] if found else None
+        self._rows = self._conn.execute('SELECT COUNT(*) FROM rows').fetchone()[0]
+        self._mmap: Optional[np.memmap] = None
+        self._mapped_rows = 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Read a vector by key, or None if absent."""
+        with self._lock:
+            found = self._conn.execute('SELECT row FROM rows WHERE key = ?', (key,)).fetchone()
+            if found is None:
+                return None
+            row = found[0]
+            if self._mmap is None or row >= self._mapped_rows:
+                self._remap()
+            return np.array(self._mmap[row])
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        """Append a vector unless the key is already stored or the store is full."""
+        with self._lock:
+            if self._rows >= self.max_rows:
+                return
+            if self._conn.execute('SELECT 1 FROM rows WHERE key = ?', (key,)).fetchone():
+                return
+            if self.dim is None:
+                self.dim = int(vector.shape[0])
+                self._conn.execute("INSERT INTO meta (name, value) VALUES ('dim', ?)", (self.dim,))
+            with open(self._vectors_path, 'ab') as f:
+                f.write(np.asarray(vector, dtype=np.float32).tobytes())
+            self._conn.execute('INSERT INTO rows (key, row) VALUES (?, ?)', (key, self._rows))
+            self._conn.commit()
+            self._rows += 1
+
+    def _remap(self) -> None:
+        """Map the vector file again after it has grown. Caller must hold the lock."""
+        self._mapped_rows = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode='r',
+                               shape=(self._mapped_rows, self.dim))
+
+
+class _VectorCache:
+    """In-memory LRU of vectors with an optional disk tier and hit counters."""
+
+    def __init__(self, max_entries: int, disk: Optional[DiskVectorStore] = None):
+        self.max_entries = max_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._disk = disk
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Look up a vector in memory, then on disk."""
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+        vector = self._disk.get(key) if self._disk is not None else None
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, vector)
+            return vector
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        """Store a freshly encoded vector in memory and on disk."""
+        with self._lock:
+            self._remember(key, vector)
+        if self._disk is not None:
+            self._disk.put(key, vector)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self._lru)
+            }
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Insert into the LRU, evicting the oldest entry. Caller must hold the lock."""
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with in-memory LRUs and optional disk spill.
+
+    Queries and documents are cached separately, so packing a turn's chunks
+    never evicts the query vectors repeat questions depend on. Query keys
+    are normalized texts, so queries that differ only in case, spacing or
+    punctuation share a vector; document keys are the exact text. Tracks hit
+    rates and the encode time saved by hits, estimated from the average
+    measured encode time.
+    """
+
+    def __init__(self, embeddings: Embeddings, namespace: str, max_entries: int = 10_000,
+                 disk_dir: Optional[str] = None, max_document_entries: Optional[int] = None):
+        """
+        Wrap an embeddings object.
+
+        Args:
+            embeddings: Underlying embeddings implementation
+            namespace: Backend and model identifier used to key the disk stores
+            max_entries: Maximum number of query vectors kept in memory
+            disk_dir: Directory for the memory-mapped stores, or None for memory only
+            max_document_entries: Maximum number of document vectors kept in
+                memory; `max_entries` when None
+        """
+        self.embeddings = embeddings
+        self.namespace = namespace
+        self.disk_dir = disk_dir
+
+        self.encode_seconds = 0.0
+        self.encoded = 0
+
+        self._queries = _VectorCache(
+            max_entries, DiskVectorStore(disk_dir, f"{namespace}.query") if disk_dir else None
+        )
+        self._documents = _VectorCache(
+            max_entries if max_document_entries is None else max_document_entries,
+            DiskVectorStore(disk_dir, f"{namespace}.document") if disk_dir else None
+        )
+        self._lock = threading.Lock()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, serving repeated texts from the cache."""
+        key = self._key(normalize_query(text))
+        vector = self._queries.get(key)
+        if vector is None:
+            start = time.perf_counter()
+            vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+            self._record_encode(time.perf_counter() - start, 1)
+            self._queries.put(key, vector)
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str],
+                        admit: Optional[Callable[[], ContextManager]] = None) -> List[List[float]]:
+        """
+        Embed documents, encoding only the texts not already cached.
+
+        Args:
+            texts: Texts to embed
+            admit: Context manager factory entered around encoding the
+                misses, e.g. an admission slot; fully cached calls skip it
+        """
+        keys = [self._key(text) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [self._documents.get(key) for key in keys]
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            with admit() if admit is not None else nullcontext():
+                start = time.perf_counter()
+                encoded = self.embeddings.embed_documents([texts[i] for i in missing])
+                self._record_encode(time.perf_counter() - start, len(missing))
+            for i, vector in zip(missing, encoded):
+                vectors[i] = np.asarray(vector, dtype=np.float32)
+                self._documents.put(keys[i], vectors[i])
+
+        return [vector.tolist() for vector in vectors]
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict[str, object]: Hits by tier, misses, hit rate and entries for
+            `queries` and `documents`, and the encode time saved
+        """
+        queries, documents = self._queries.stats(), self._documents.stats()
+        with self._lock:
+            avg_encode = self.encode_seconds / self.encoded if self.encoded else 0.0
+        hits = sum(tier['memory_hits'] + tier['disk_hits'] for tier in (queries, documents))
+        return {
+            'queries': queries,
+            'documents': documents,
+            'avg_encode_ms': avg_encode * 1000,
+            'encode_seconds_saved': hits * avg_encode
+        }
+
+    @staticmethod
+    def _key(text: str) -> str:
+        """Cache key for a text."""
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _record_encode(self, seconds: float, count: int) -> None:
+        """Track time spent encoding cache misses."""
+        with self._lock:
+            self.encode_seconds += seconds
+            self.encoded += count
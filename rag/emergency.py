@@ -0,0 +1,309 @@
+"""
+Multilingual emergency phrase matching.
+All English, Urdu and Sindhi emergency phrases are compiled into one
+word-boundary aware regular expression at import time. One pass over a
+message finds every phrase and infers the disaster category.
+
+The matcher replaces a substring scan of the English phrases for
+correctness, not speed: it covers Urdu and Sindhi, respects word
+boundaries ("save" in "unsaved") and infers the category. It costs a few
+microseconds per message, about three times the old scan, which is
+negligible next to a chat turn. `bench` shows both the verdicts and the
+cost.
+
+Usage:
+    python -m rag.emergency bench
+"""
+import argparse
+import re
+import sys
+import timeit
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .normalize import fold_text, normalize_query
+
+CATEGORIES = ("flood", "earthquake", "fire", "medical", "general")
+
+# Phrases that mark a message as an emergency, by category
+EMERGENCY_PHRASES: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "English": {
+        "general": (
+            "help me", "emergency", "danger", "trapped", "urgent", "need help", "sos", "save",
+            "critical", "life threatening", "i need help", "help", "accident", "stuck",
+            "disaster", "evacuate", "rescue", "police", "in trouble", "stranded"
+        ),
+        "flood": ("flood now", "drowning", "water is rising", "rising water"),
+        "earthquake": ("earthquake", "collapsed"),
+        "fire": ("fire", "explosion"),
+        "medical": ("injured", "bleeding", "hurt", "dying", "medical emergency", "ambulance"),
+    },
+    "Urdu": {
+        "general": (
+            "مدد", "بچاؤ", "بچائیں", "ایمرجنسی", "خطرہ", "پھنس گیا", "پھنس گئی", "پھنس گئے",
+            "حادثہ", "ریسکیو", "پولیس"
+        ),
+        "flood": ("سیلاب آ گیا", "ڈوب رہا", "ڈوب رہی", "پانی بڑھ رہا"),
+        "earthquake": ("زلزلہ", "عمارت گر گئی"),
+        "fire": ("آگ لگ گئی", "دھماکہ"),
+        "medical": ("زخمی", "خون بہہ رہا", "ایمبولینس"),
+    },
+    "Sindhi": {
+        "general": (
+            "مدد", "بچايو", "ايمرجنسي", "خطرو", "ڦاسي پيو", "ڦاسي پئي", "ڦاٿل",
+            "حادثو", "ريسڪيو", "پوليس"
+        ),
+        "flood": ("ٻوڏ اچي وئي", "ٻڏي رهيو", "ٻڏي رهي", "پاڻي وڌي رهيو"),
+        "earthquake": ("زلزلو", "عمارت ڪري پئي"),
+        "fire": ("باهه لڳي", "ڌماڪو"),
+        "medical": ("زخمي", "رت وهي رهيو", "ايمبولينس"),
+    },
+}
+
+# Names of a disaster; they pick the category as surely as an emergency
+# phrase, but on their own they are not an emergency
+DISASTER_NAMES: Dict[str, Tuple[str, ...]] = {
+    "flood": ("flood", "flooding", "floods", "سیلاب", "ٻوڏ"),
+    "earthquake": ("tremor", "aftershock", "زلزلے", "زلزلي"),
+    "fire": ("آگ", "باهه"),
+    "medical": ("injury", "unconscious", "medical", "طبی", "طبي"),
+}
+
+# Words that only hint at a category ("water", "smoke"); one alone picks nothing
+CATEGORY_HINTS: Dict[str, Tuple[str, ...]] = {
+    "flood": ("water", "پانی", "پاڻي"),
+    "fire": ("smoke", "burning", "burn", "دھواں", "دونهون"),
+}
+
+# Score of an emergency phrase or disaster name; a hint scores 1. A specific
+# category needs at least this score, so two hints can pick one but one cannot
+PHRASE_WEIGHT = 2
+
+
+@dataclass(frozen=True)
+class EmergencyMatch:
+    """Result of scanning one message."""
+    phrases: Tuple[str, ...]
+    category: Optional[str]
+
+    @property
+    def is_emergency(self) -> bool:
+        return bool(self.phrases)
+
+
+class EmergencyMatcher:
+    """
+    Compiled matcher for emergency phrases and category hints.
+
+    Phrases are normalized like queries (case, Arabic-script variants) and
+    compiled into one prefix-factored alternation bounded by non-word
+    characters, so "save" does not match inside "unsaved" and "help me"
+    wins over "help". Words within a phrase may be separated by any run of
+    whitespace.
+    """
+
+    def __init__(self, phrases: Dict[str, Dict[str, Tuple[str, ...]]] = EMERGENCY_PHRASES,
+                 names: Dict[str, Tuple[str, ...]] = DISASTER_NAMES,
+                 hints: Dict[str, Tuple[str, ...]] = CATEGORY_HINTS):
+        """
+        Compile the matcher.
+
+        Args:
+            phrases: Emergency phrases by language and category
+            names: Disaster names by category
+            hints: Weak category-only words by category
+        """
+        # Normalized phrase -> (category, marks an emergency, category score)
+        self._entries: Dict[str, Tuple[str, bool, int]] = {}
+        for category, words in hints.items():
+            for word in words:
+                self._entries[normalize_query(word)] = (category, False, 1)
+        for category, words in names.items():
+            for word in words:
+                self._entries[normalize_query(word)] = (category, False, PHRASE_WEIGHT)
+        for by_category in phrases.values():
+            for category, words in by_category.items():
+                for word in words:
+                    self._entries[normalize_query(word)] = (category, True, PHRASE_WEIGHT)
+
+        self._pattern = re.compile(rf"(?<!\w)(?:{_trie_pattern(self._entries)})(?!\w)")
+
+    def match(self, text: str) -> EmergencyMatch:
+        """
+        Find the emergency phrases in a message and infer its category.
+
+        Emergency phrases and disaster names score `PHRASE_WEIGHT` for their
+        category and hint words 1. A specific category (flood, earthquake,
+        fire, medical) needs a score of at least `PHRASE_WEIGHT`, so "water"
+        or "burn" alone picks none; among those that qualify the highest
+        score wins, then the first seen. Otherwise an emergency is "general".
+
+        Args:
+            text: User's message
+
+        Returns:
+            EmergencyMatch: Matched emergency phrases and category
+        """
+        phrases, counts = self._scan(text)
+        counts = {category: score for category, score in counts.items() if score >= PHRASE_WEIGHT}
+        if counts:
+            category = max(counts, key=counts.get)
+        elif phrases:
+            category = "general"
+        else:
+            category = None
+        return EmergencyMatch(tuple(phrases), category)
+
+    def category_counts(self, text: str) -> Dict[str, int]:
+        """
+        Score each specific category in a text.
+
+        Args:
+            text: Any text, such as a document chunk
+
+        Returns:
+            Dict[str, int]: `PHRASE_WEIGHT` per phrase or disaster name and 1
+            per hint, by category, without "general"
+        """
+        return self._scan(text)[1]
+
+    def _scan(self, text: str) -> Tuple[List[str], Dict[str, int]]:
+        """Emergency phrases found, and the score of each specific category."""
+        phrases: List[str] = []
+        counts: Dict[str, int] = {}
+        for found in self._pattern.finditer(fold_text(text)):
+            phrase = " ".join(found.group(0).split())
+            category, triggers, score = self._entries[phrase]
+            if triggers:
+                phrases.append(phrase)
+            if category != "general":
+                counts[category] = counts.get(category, 0) + score
+        return phrases, counts
+
+
+def _trie_pattern(phrases) -> str:
+    """
+    Build a regular expression matching any of the phrases.
+
+    Phrases sharing a prefix share one branch, so the regex engine rejects
+    most positions after a single character instead of trying every
+    phrase. Longer continuations are tried before a phrase ends.
+    """
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + emit(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+_matcher = EmergencyMatcher()
+
+
+def match_emergency(text: str) -> EmergencyMatch:
+    """
+    Scan a message with the shared matcher.
+
+    Args:
+        text: User's message
+
+    Returns:
+        EmergencyMatch: Matched emergency phrases and category
+    """
+    return _matcher.match(text)
+
+
+def category_counts(text: str) -> Dict[str, int]:
+    """
+    Score disaster categories in a text with the shared matcher.
+
+    Args:
+        text: Any text, such as a document chunk
+
+    Returns:
+        Dict[str, int]: Category scores, without "general"
+    """
+    return _matcher.category_counts(text)
+
+
+def is_emergency(text: str) -> bool:
+    """Whether a message contains an emergency phrase."""
+    return _matcher.match(text).is_emergency
+
+
+BENCH_MESSAGES = [
+    "What are the steps of disaster risk assessment in Pakistan?",
+    "Help me, the water is rising and we are trapped on the roof",
+    "How do I prepare an emergency kit?",
+    "I have unsaved changes in my flood map, how do I export it?",
+    "There is a fire in our building and my brother is injured",
+    "سیلاب آ گیا ہے، مدد کریں",
+    "زلزلي دوران ڇا ڪجي؟",
+    "Thanks for the information about heatwaves",
+]
+
+# English phrases as the original list-scan implementation used them
+_LEGACY_PHRASES = [phrase for words in EMERGENCY_PHRASES["English"].values() for phrase in words]
+
+
+def _legacy_match(text: str) -> bool:
+    """The substring scan the matcher replaces."""
+    text_lower = text.lower()
+    return any(phrase in text_lower for phrase in _LEGACY_PHRASES)
+
+
+def benchmark(rounds: int = 20000) -> Dict[str, float]:
+    """
+    Time the compiled matcher and the legacy substring scan.
+
+    The matcher is expected to be slower; this tracks its cost, which
+    should stay in the microseconds.
+
+    Args:
+        rounds: Passes over the sample messages
+
+    Returns:
+        Dict[str, float]: Microseconds per message for each implementation
+    """
+    results = {}
+    for name, fn in (("legacy_substring_scan", _legacy_match), ("compiled_matcher", match_emergency)):
+        seconds = min(timeit.repeat(
+            lambda: [fn(message) for message in BENCH_MESSAGES], number=rounds // 10, repeat=5
+        ))
+        results[name] = seconds / (rounds // 10 * len(BENCH_MESSAGES)) * 1e6
+    return results
+
+
+def main():
+    """Command-line entry point for the matcher microbenchmark."""
+    parser = argparse.ArgumentParser(description="Emergency phrase matcher tools.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    bench_parser = subparsers.add_parser('bench', help="Show verdicts and cost next to the substring scan")
+    bench_parser.add_argument('--rounds', type=int, default=20000)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        for message in BENCH_MESSAGES:
+            result = match_emergency(message)
+            print(f"{_legacy_match(message)!s:>5} {result.is_emergency!s:>5} "
+                  f"{result.category or '-':>10}  {message}")
+        print()
+        for name, micros in benchmark(args.rounds).items():
+            print(f"{name:>22}: {micros:.2f} us/message")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1003 @@
+"""
+Process-wide RAG engine.
+Builds the Pinecone client, embeddings, Gemini LLM and vector store once per
+process and shares them across every Streamlit session and rerun.
+"""
+import hashlib
+import json
+import re
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import google.generativeai as genai
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_pinecone import PineconeVectorStore
+
+from services.tracing import get_tracer
+
+from .admission import DEFAULT_PRIORITY, AdmissionController, AdmissionRejected, Ticket
+from .backends import (BACKEND_MODES, DEFAULT_CASSETTE_PATH, INDEX_INFO_KEY, Cassette, CassetteMiss,
+                       HashEmbeddings, RecordingChatModel, RecordingEmbeddings, RecordingVectorStore,
+                       ReplayChatModel, ReplayEmbeddings, ReplayVectorStore, StubChatModel, StubVectorStore)
+from .batcher import MicroBatchingEmbeddings
+from .bm25 import BM25Index, reciprocal_rank_fusion
+from .context import pack_context
+from .embedding_cache import CachedEmbeddings
+from .ingest import INDEX_VERSION_ID, META_NAMESPACE
+from .intent import IntentResult, IntentRouter
+from .local_index import DEFAULT_LOCAL_INDEX_DIR, load_local_documents, load_local_index
+from .memory import ConversationContext, Message, format_transcript
+from .metadata import METADATA_SCHEMA, disaster_filter, is_tagged, matches_disaster
+from .playbooks import detect_disaster_type
+from .onnx_embeddings import DEFAULT_ONNX_DIR
+from .prompts import PROMPT_VERSION, SUMMARY_PROMPT, get_degraded_notice, get_rag_prompt
+from .resilience import LLMUnavailableError, ResilientLLM
+from .response_cache import DEFAULT_CACHE_PATH, ResponseCache
+from .semantic_cache import SemanticCache
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# How often the index version is re-read from Pinecone
+INDEX_VERSION_REFRESH_SECONDS = 300
+
+# Threads for Pinecone queries, kept apart from the BM25 pool so that its
+# timeout measures Pinecone and not time spent queued behind keyword search
+PINECONE_WORKERS = 16
+
+# Where retrieval goes: Pinecone only, the local FAISS mirror only, or
+# Pinecone with the local mirror as fallback
+RETRIEVAL_MODES = ("pinecone", "local", "auto")
+
+
+@dataclass(frozen=True)
+class RAGConfig:
+    """
+    Settings that determine the shape of the RAG engine.
+
+    Two configs that compare equal share one engine. API keys are carried
+    along for construction but are not part of the identity of the engine.
+    """
+    index_name: str = "pdfinfo"
+    embedding_model: str = "all-MiniLM-L6-v2"
+    llm_model: str = "gemini-2.0-flash-exp"
+    k: int = 6
+    # Candidates retrieved before context packing narrows them down to k
+    fetch_k: int = 12
+    context_token_budget: int = 1500
+    mmr_lambda: float = 0.7
+    temperature: float = 0.1
+    max_output_tokens: int = 2048
+    # Smaller, faster model for hedged requests; hedges go to the primary when empty
+    fallback_llm_model: str = "gemini-1.5-flash-8b"
+    # Deadline for a full answer, or for the first token when streaming
+    llm_timeout_seconds: float = 20.0
+    llm_hedge_min_delay_seconds: float = 0.5
+    llm_hedge_max_delay_seconds: float = 8.0
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30.0
+    # Admission control: concurrent Gemini calls and query embeddings, queue
+    # bound, and how long background work may queue before it is shed
+    llm_concurrency: int = 8
+    embedding_concurrency: int = 16
+    admission_max_queue: int = 200
+    admission_shed_after_seconds: float = 10.0
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_ttl_seconds: float = 6 * 3600
+    semantic_cache_max_entries: int = 4096
+    semantic_cache_max_mb: int = 64
+    response_cache_path: str = DEFAULT_CACHE_PATH
+    # "torch" (sentence-transformers), "onnx" (see rag.onnx_embeddings) or
+    # "hash" (model-free, for the stub backend); replays use recorded vectors
+    embedding_backend: str = "torch"
+    onnx_model_dir: str = DEFAULT_ONNX_DIR
+    # Batch query encodes from concurrent sessions; 0 disables batching
+    embedding_batch_wait_ms: float = 5.0
+    embedding_max_batch_size: int = 32
+    # Query and chunk vectors are cached apart so packing never evicts queries
+    embedding_cache_entries: int = 10_000
+    embedding_document_cache_entries: int = 10_000
+    # Directory for the memory-mapped embedding stores; memory only when empty
+    embedding_cache_dir: str = ""
+    # Fixed index version; derived from the Pinecone index stats when empty
+    index_version: str = ""
+    retrieval_mode: str = "auto"
+    local_index_dir: str = DEFAULT_LOCAL_INDEX_DIR
+    pinecone_timeout_seconds: float = 3.0
+    # Fuse BM25 keyword results with dense results when a corpus is available
+    hybrid_search: bool = True
+    # Route greetings and out-of-domain chatter by query vector, skipping the
+    # LLM; off until `python -m rag.intent_eval` passes for the deployed model
+    intent_routing: bool = False
+    intent_min_score: float = 0.45
+    intent_margin: float = 0.05
+    # Narrow retrieval to chunks about the disaster named in the question
+    metadata_filtering: bool = True
+    # Conversation memory: exchanges kept verbatim, token caps of the running
+    # summary and of the whole history in the prompt, and the longest question
+    # retrieved together with the previous one as a follow-up
+    memory_recent_turns: int = 3
+    memory_summary_tokens: int = 300
+    memory_history_tokens: int = 600
+    follow_up_max_words: int = 8
+    # Gemini and Pinecone backends: "live", "record", "replay" or "stub" (see rag.backends)
+    backend_mode: str = "live"
+    cassette_path: str = DEFAULT_CASSETTE_PATH
+    # Multiplier of the recorded latencies when replaying; 0 replays instantly
+    replay_latency_scale: float = 1.0
+    stub_llm_latency_seconds: float = 0.3
+    stub_token_delay_seconds: float = 0.01
+    stub_search_latency_seconds: float = 0.05
+    pinecone_api_key: str = field(default="", compare=False, repr=False)
+    google_api_key: str = field(default="", compare=False, repr=False)
+
+
+@dataclass
+class PreparedAnswer:
+    """
+    A question that has been through every stage before generation.
+
+    Exactly one of `cached` and `prompt` is set.
+    """
+    query: str
+    output_language: str
+    vector: Optional[List[float]] = None
+    cached: Optional[str] = None
+    prompt: Optional[str] = None
+    # Context chunks in the prompt, kept for the degraded answer
+    docs: List[Document] = field(default_factory=list)
+    # The prompt carried the session's history, so the answer is not shared
+    private: bool = False
+
+
+class RAGEngine:
+    """
+    Holds the heavyweight RAG components for one configuration.
+
+    The Pinecone client, embedding model, vector store and LLM are created
+    once in the constructor. Nothing in the engine depends on a session, so
+    the output language is chosen per call.
+    """
+
+    def __init__(self, config: RAGConfig):
+        """
+        Build all RAG components for the given configuration.
+
+        Args:
+            config: Engine configuration including API keys
+        """
+        self.config = config
+
+        genai.configure(api_key=config.google_api_key)
+        if config.retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{config.retrieval_mode}'")
+        if config.backend_mode not in BACKEND_MODES:
+            raise ValueError(f"Unknown backend mode '{config.backend_mode}'")
+        self.cassette = None
+        if config.backend_mode in ("record", "replay"):
+            self.cassette = Cassette(config.cassette_path, config.backend_mode)
+
+        # Initialize embeddings: cache hits return immediately, misses from
+        # concurrent sessions are encoded together in micro-batches
+        if config.backend_mode == "replay":
+            base_embeddings = ReplayEmbeddings(self.cassette, config.replay_latency_scale)
+        else:
+            base_embeddings = self._create_embeddings(config)
+            if config.backend_mode == "record":
+                base_embeddings = RecordingEmbeddings(base_embeddings, self.cassette)
+        if config.embedding_batch_wait_ms > 0:
+            base_embeddings = MicroBatchingEmbeddings(
+                base_embeddings,
+                max_batch_size=config.embedding_max_batch_size,
+                max_wait_ms=config.embedding_batch_wait_ms
+            )
+        # Vectors from different backends differ, e.g. hashed or quantized
+        backend = "replay" if config.backend_mode == "replay" else config.embedding_backend
+        self.embeddings = CachedEmbeddings(
+            base_embeddings,
+            namespace=re.sub(r'[^A-Za-z0-9_.-]', '_', f"{backend}-{config.embedding_model}"),
+            max_entries=config.embedding_cache_entries,
+            disk_dir=config.embedding_cache_dir or None,
+            max_document_entries=config.embedding_document_cache_entries
+        )
+
+        # Initialize Pinecone; the local-only mode runs without it, and the
+        # replay and stub backends stand in for it
+        self.pinecone = self.index = self.vectorstore = None
+        if config.retrieval_mode != "local":
+            if config.backend_mode == "replay":
+                self.vectorstore = ReplayVectorStore(self.cassette, config.replay_latency_scale)
+            elif config.backend_mode == "stub":
+                self.vectorstore = StubVectorStore(config.stub_search_latency_seconds)
+            else:
+                from pinecone import Pinecone
+                self.pinecone = Pinecone(api_key=config.pinecone_api_key)
+                self.index = self.pinecone.Index(config.index_name)
+                self.vectorstore = PineconeVectorStore(
+                    index=self.index,
+                    embedding=self.embeddings,
+                    text_key="text"
+                )
+                if config.backend_mode == "record":
+                    self.vectorstore = RecordingVectorStore(self.vectorstore, self.cassette)
+
+        # Local FAISS mirror, loaded from disk
+        self.local_vectorstore = None
+        if config.retrieval_mode != "pinecone":
+            self.local_vectorstore = load_local_index(self.embeddings, config.local_index_dir)
+            if self.local_vectorstore is None and config.retrieval_mode == "local":
+                raise ValueError(
+                    f"No local index found in '{config.local_index_dir}'. "
+                    "Run 'python -m rag.local_index' to build it."
+                )
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag")
+        self._pinecone_executor = ThreadPoolExecutor(max_workers=PINECONE_WORKERS,
+                                                     thread_name_prefix="pinecone")
+
+        # Sparse keyword index over the same chunks as the mirror
+        documents = []
+        if self.local_vectorstore is not None:
+            documents = list(self.local_vectorstore.docstore._dict.values())
+        elif config.hybrid_search:
+            documents = load_local_documents(config.local_index_dir)
+        self.bm25 = BM25Index(documents) if config.hybrid_search and documents else None
+        # Local chunks are only filtered by disaster type once all of them are tagged
+        self._local_tagged = bool(documents) and all(is_tagged(doc.metadata) for doc in documents)
+
+        # Per-intent centroids for routing by query vector
+        self.intent_router = None
+        if config.intent_routing:
+            self.intent_router = IntentRouter(
+                self.embeddings,
+                min_score=config.intent_min_score,
+                margin=config.intent_margin
+            )
+
+        # Create Gemini LLMs; retries are replaced by hedging and fallback
+        self.llm = ResilientLLM(
+            self._create_llm_backend(config, config.llm_model),
+            self._create_llm_backend(config, config.fallback_llm_model) if config.fallback_llm_model else None,
+            timeout_seconds=config.llm_timeout_seconds,
+            hedge_min_delay=config.llm_hedge_min_delay_seconds,
+            hedge_max_delay=config.llm_hedge_max_delay_seconds,
+            failure_threshold=config.llm_circuit_failure_threshold,
+            reset_seconds=config.llm_circuit_reset_seconds,
+            concurrency=config.llm_concurrency,
+            # A replay missing a prompt is a stale cassette, not an outage
+            fatal_errors=(CassetteMiss,)
+        )
+
+        # Priority queues in front of Gemini and the embedder
+        self.llm_admission = AdmissionController(
+            "llm", config.llm_concurrency, max_queue=config.admission_max_queue,
+            shed_after_seconds=config.admission_shed_after_seconds
+        )
+        self.embedding_admission = AdmissionController(
+            "embedding", config.embedding_concurrency, max_queue=config.admission_max_queue
+        )
+
+        # Answers to semantically similar questions, shared by all sessions
+        self.semantic_cache = SemanticCache(
+            threshold=config.semantic_cache_threshold,
+            ttl_seconds=config.semantic_cache_ttl_seconds,
+            max_entries=config.semantic_cache_max_entries,
+            max_bytes=config.semantic_cache_max_mb * 1024 * 1024
+        )
+
+        # Identical questions being answered right now, shared across sessions
+        self.inflight = SingleFlight()
+
+        # Exact-match answers persisted across restarts; Pinecone is only
+        # filtered by disaster type once a tagging ingest has marked it
+        index_version, self._index_tagged = self._fetch_index_info()
+        self.response_cache = ResponseCache(
+            config.response_cache_path,
+            index_version=index_version or "",
+            prompt_version=PROMPT_VERSION
+        )
+        self._index_version_checked_at = time.monotonic()
+        self._index_version_lock = threading.Lock()
+        # BM25 eligibility per disaster type, built on first use
+        self._bm25_masks: Dict[str, object] = {}
+
+    def _create_llm_backend(self, config: RAGConfig, model: str):
+        """
+        Create the chat model for a model name in the configured backend mode.
+
+        Args:
+            config: Engine configuration
+            model: Model name
+
+        Returns:
+            Chat model with `invoke` and `stream`
+        """
+        if config.backend_mode == "replay":
+            return ReplayChatModel(self.cassette, model, config.replay_latency_scale)
+        if config.backend_mode == "stub":
+            return StubChatModel(model, config.stub_llm_latency_seconds, config.stub_token_delay_seconds)
+        llm = self._create_llm(config, model)
+        if config.backend_mode == "record":
+            return RecordingChatModel(llm, self.cassette, model)
+        return llm
+
+    @staticmethod
+    def _create_llm(config: RAGConfig, model: str) -> ChatGoogleGenerativeAI:
+        """Create a Gemini chat model with the engine's generation settings."""
+        return ChatGoogleGenerativeAI(
+            model=model,
+            temperature=config.temperature,
+            google_api_key=config.google_api_key,
+            max_retries=0,
+            timeout=config.llm_timeout_seconds,
+            max_output_tokens=config.max_output_tokens
+        )
+
+    @staticmethod
+    def _create_embeddings(config: RAGConfig) -> Embeddings:
+        """
+        Create the embedding backend selected in the config.
+
+        The backends are imported lazily so the ONNX backend never loads
+        PyTorch, and the hash backend loads no model at all.
+
+        Args:
+            config: Engine configuration
+
+        Returns:
+            Embeddings: Query and document embedder
+        """
+        if config.embedding_backend == "hash":
+            return HashEmbeddings()
+        if config.embedding_backend == "onnx":
+            from .onnx_embeddings import ONNXEmbeddings
+            return ONNXEmbeddings(config.onnx_model_dir)
+        if config.embedding_backend != "torch":
+            raise ValueError(f"Unknown embedding backend '{config.embedding_backend}'")
+
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(
+            model_name=config.embedding_model,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={
+                'normalize_embeddings': True,
+                'batch_size': 32
+            }
+        )
+
+    def _fetch_index_info(self) -> Tuple[Optional[str], bool]:
+        """
+        Determine the current version of the vector index and whether its chunks are tagged.
+
+        The version is the configured one if set, then the marker written by
+        `rag.ingest`, and finally a fingerprint of the index's per-namespace
+        vector counts. The chunks count as tagged only if the marker carries
+        the current metadata schema, i.e. the ingest that wrote it had tagged
+        every chunk. Replays use what the recorded session read.
+
+        Returns:
+            Tuple[Optional[str], bool]: Index version (None if Pinecone is
+            unreachable), and whether Pinecone can be filtered by disaster type
+        """
+        if self.cassette is not None and self.cassette.mode == "replay":
+            try:
+                entry = self.cassette.lookup(INDEX_INFO_KEY)
+            except CassetteMiss:
+                return self.config.index_version or None, False
+            return self.config.index_version or entry['version'], entry['tagged']
+        if self.index is None:
+            return self.config.index_version or None, False
+        try:
+            marker = self.index.fetch(ids=[INDEX_VERSION_ID], namespace=META_NAMESPACE)
+            vector = marker.vectors.get(INDEX_VERSION_ID)
+            if vector is not None and vector.metadata:
+                version = vector.metadata['version']
+                tagged = vector.metadata.get('metadata_schema', 0) >= METADATA_SCHEMA
+            else:
+                stats = self.index.describe_index_stats()
+                namespaces = {
+                    name: summary.vector_count
+                    for name, summary in (stats.namespaces or {}).items()
+                }
+                fingerprint = json.dumps(
+                    {'dimension': stats.dimension, 'namespaces': namespaces}, sort_keys=True
+                )
+                version = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+                tagged = False
+        except Exception:
+            return self.config.index_version or None, False
+        if self.cassette is not None:
+            self.cassette.append({'kind': 'index', 'key': INDEX_INFO_KEY, 'seconds': 0.0,
+                                  'version': version, 'tagged': tagged})
+        return self.config.index_version or version, tagged
+
+    def refresh_index_version(self, force: bool = False) -> None:
+        """
+        Re-read the index version and flush caches if it changed.
+
+        Args:
+            force: Check even if the refresh interval has not elapsed
+        """
+        now = time.monotonic()
+        if not force and now - self._index_version_checked_at < INDEX_VERSION_REFRESH_SECONDS:
+            return
+        if not self._index_version_lock.acquire(blocking=False):
+            return
+        try:
+            self._index_version_checked_at = now
+            index_version, tagged = self._fetch_index_info()
+            if index_version:
+                self._index_tagged = tagged
+            if index_version and index_version != self.response_cache.index_version:
+                self.response_cache.set_index_version(index_version)
+                self.semantic_cache.clear()
+        finally:
+            self._index_version_lock.release()
+
+    def lookup_cached(self, query: str, output_language: str,
+                      vector: Optional[List[float]] = None) -> Optional[str]:
+        """
+        Look up a cached answer, exact match first, then semantic.
+
+        Args:
+            query: User's question
+            output_language: Output language selected by the user
+            vector: Query embedding; the semantic cache is skipped without it
+
+        Returns:
+            Optional[str]: Cached answer, or None on a miss
+        """
+        if vector is None:
+            return self.response_cache.get(query, output_language)
+        cached = self.semantic_cache.lookup(vector, output_language)
+        if cached is not None:
+            self.response_cache.put(query, output_language, cached)
+        return cached
+
+    def remember(self, query: str, vector: List[float], output_language: str, answer: str) -> None:
+        """
+        Store a generated answer in both caches.
+
+        Args:
+            query: User's question
+            vector: Query embedding
+            output_language: Output language of the answer
+            answer: Generated answer text
+        """
+        if not answer:
+            return
+        self.semantic_cache.store(vector, output_language, answer)
+        self.response_cache.put(query, output_language, answer)
+
+    def embed_query(self, query: str, priority: str = DEFAULT_PRIORITY,
+                    on_queued: Optional[Callable[[Ticket], None]] = None) -> List[float]:
+        """
+        Embed a query with the engine's embedding model.
+
+        Args:
+            query: User's question
+            priority: Response type whose queue priority the request gets
+            on_queued: Called with the admission ticket if the request has to wait
+
+        Returns:
+            List[float]: Normalized query embedding
+        """
+        with self._embedding_slot(priority, on_queued):
+            return self.embeddings.embed_query(query)
+
+    @contextmanager
+    def _embedding_slot(self, priority: str, on_queued: Optional[Callable[[Ticket], None]] = None,
+                        **attributes) -> Iterator[None]:
+        """Hold an embedding admission slot, timed as an `embed` span."""
+        with self.embedding_admission.acquire(priority, on_queued), get_tracer().span("embed", **attributes):
+            yield
+
+    def route_intent(self, vector: List[float]) -> Optional[IntentResult]:
+        """
+        Classify a query by its embedding.
+
+        Args:
+            vector: Normalized query embedding
+
+        Returns:
+            Optional[IntentResult]: Routing decision, or None if routing is disabled
+        """
+        if self.intent_router is None:
+            return None
+        return self.intent_router.classify(vector)
+
+    def disaster_type(self, query: str) -> Optional[str]:
+        """
+        Disaster type retrieval is narrowed to for a question.
+
+        A question gets a type only when it names the disaster or carries an
+        emergency phrase for it; a lone hint word ("water") is not enough,
+        the same rule chunks are tagged by. Nothing is filtered until the
+        searched chunks are tagged, so untagged indexes cost no extra search.
+
+        Args:
+            query: User's question
+
+        Returns:
+            Optional[str]: Type named in the question, or None to search everything
+        """
+        if not self.config.metadata_filtering or not (self._index_tagged or self._local_tagged):
+            return None
+        return detect_disaster_type(query)
+
+    def retrieve(self, query: str, vector: Optional[List[float]] = None,
+                 disaster_type: Optional[str] = None) -> List[Document]:
+        """
+        Retrieve the chunks most relevant to a query.
+
+        With hybrid search enabled, BM25 scores the query in the background
+        while the dense search runs, and the two rankings are fused. With a
+        disaster type, only tagged chunks about that disaster or about none
+        are searched; if that leaves fewer than `k` chunks, the search is
+        repeated unfiltered. Backends whose chunks are not tagged are
+        searched unfiltered straight away.
+
+        Args:
+            query: User's question, without any prompt instructions
+            vector: Precomputed query embedding, if available
+            disaster_type: Disaster type to narrow the search to
+
+        Returns:
+            List[Document]: Top `fetch_k` candidate chunks
+        """
+        if vector is None:
+            vector = self.embed_query(query)
+        if not (self._index_tagged or self._local_tagged):
+            disaster_type = None
+        with get_tracer().span("vector_search", hybrid=self.bm25 is not None,
+                               disaster_type=disaster_type) as span:
+            docs = self._search(query, vector, disaster_type)
+            if disaster_type is not None and len(docs) < self.config.k:
+                span['unfiltered'] = True
+                docs = self._search(query, vector, None)
+            return docs
+
+    def _search(self, query: str, vector: List[float], disaster_type: Optional[str]) -> List[Document]:
+        """Run the dense search, fused with BM25 when hybrid search is on."""
+        if self.bm25 is None:
+            return self._dense_search(vector, disaster_type)
+
+        mask = None
+        if disaster_type is not None and self._local_tagged:
+            mask = self._bm25_masks.get(disaster_type)
+            if mask is None:
+                mask = self._bm25_masks[disaster_type] = self.bm25.mask(
+                    lambda doc: matches_disaster(doc.metadata, disaster_type)
+                )
+        sparse = self._executor.submit(self.bm25.search, query, self.config.fetch_k, mask)
+        dense = self._dense_search(vector, disaster_type)
+        return reciprocal_rank_fusion([dense, sparse.result()], k=self.config.fetch_k)
+
+    def _local_search(self, vector: List[float], disaster_type: Optional[str]) -> List[Document]:
+        """Search the local FAISS mirror."""
+        if disaster_type is None or not self._local_tagged:
+            return self.local_vectorstore.similarity_search_by_vector(vector, k=self.config.fetch_k)
+        return self.local_vectorstore.similarity_search_by_vector(
+            vector, k=self.config.fetch_k, fetch_k=self.config.fetch_k * 4,
+            filter=lambda metadata: matches_disaster(metadata, disaster_type)
+        )
+
+    def _dense_search(self, vector: List[float], disaster_type: Optional[str] = None) -> List[Document]:
+        """
+        Search the vector index, falling back to the local mirror.
+
+        Args:
+            vector: Query embedding
+            disaster_type: Disaster type to narrow the search to
+
+        Returns:
+            List[Document]: Top `fetch_k` chunks by similarity
+        """
+        if self.config.retrieval_mode == "local":
+            return self._local_search(vector, disaster_type)
+
+        search_filter = disaster_filter(disaster_type) if self._index_tagged else None
+        kwargs = {'filter': search_filter} if search_filter else {}
+        future = self._pinecone_executor.submit(self._pinecone_search, vector, **kwargs)
+        if self.local_vectorstore is None:
+            return future.result()
+        try:
+            return future.result(timeout=self.config.pinecone_timeout_seconds)
+        except CassetteMiss:
+            raise
+        except Exception as e:
+            logger.warning("Pinecone search failed (%s), using local index", e or type(e).__name__)
+            return self._local_search(vector, disaster_type)
+
+    def _pinecone_search(self, vector: List[float], **kwargs) -> List[Document]:
+        # The scored variant is available in every langchain-pinecone release;
+        # similarity_search_by_vector only from 0.2.11
+        scored = self.vectorstore.similarity_search_by_vector_with_score(vector, k=self.config.fetch_k, **kwargs)
+        return [doc for doc, _ in scored]
+
+    def pack(self, docs: List[Document], vector: List[float],
+             priority: str = DEFAULT_PRIORITY) -> List[Document]:
+        """
+        Narrow retrieved candidates to a diverse, deduplicated set within the token budget.
+
+        Chunk vectors come from the embedding cache, so chunks seen before are
+        not re-encoded. Chunks that are not cached are encoded in an
+        embedding admission slot, like queries.
+
+        Args:
+            docs: Candidate chunks from `retrieve`
+            vector: Query embedding
+            priority: Response type whose queue priority encoding gets
+
+        Returns:
+            List[Document]: Chunks to stuff into the prompt
+        """
+        if not docs:
+            return []
+        doc_vectors = self.embeddings.embed_documents(
+            [doc.page_content for doc in docs],
+            admit=lambda: self._embedding_slot(priority, documents=len(docs))
+        )
+        packed, _ = pack_context(
+            vector, docs, doc_vectors,
+            max_docs=self.config.k,
+            token_budget=self.config.context_token_budget,
+            mmr_lambda=self.config.mmr_lambda
+        )
+        return packed
+
+    def build_prompt(self, query: str, docs: List[Document], output_language: str,
+                     history: str = "") -> str:
+        """
+        Stuff retrieved chunks into the prompt for the given language.
+
+        Args:
+            query: User's question
+            docs: Retrieved chunks
+            output_language: Output language selected by the user
+            history: Rendered conversation history; empty for a new conversation
+
+        Returns:
+            str: Fully formatted prompt
+        """
+        context = "\n\n".join(doc.page_content for doc in docs)
+        return get_rag_prompt(output_language).format(
+            history=history or "None", context=context, question=query
+        )
+
+    def search_query(self, query: str, history: Optional[ConversationContext] = None) -> str:
+        """
+        Text a question is retrieved and cached under.
+
+        Args:
+            query: User's question
+            history: Conversation before the question
+
+        Returns:
+            str: The question, with the previous one prepended for follow-ups that refer back to it
+        """
+        if not history:
+            return query
+        return history.retrieval_query(query, self.config.follow_up_max_words)
+
+    def prepare(self, query: str, output_language: str,
+                vector: Optional[List[float]] = None,
+                priority: str = DEFAULT_PRIORITY,
+                history: Optional[ConversationContext] = None) -> PreparedAnswer:
+        """
+        Run everything up to generation: cache lookups, retrieval and prompt building.
+
+        Follow-up questions are retrieved and cached together with the
+        previous question, and the prompt carries the bounded conversation
+        history.
+
+        Args:
+            query: User's question
+            output_language: Output language selected by the user
+            vector: Embedding of `query`, if the caller already computed it
+            priority: Response type whose queue priority embedding and packing get
+            history: Conversation before the question
+
+        Returns:
+            PreparedAnswer: Either a cached answer or a prompt ready for the LLM
+        """
+        self.refresh_index_version()
+        search_query = self.search_query(query, history)
+        if search_query != query:
+            # The caller's vector is of the bare follow-up
+            vector = None
+        cached = self.lookup_cached(search_query, output_language)
+        if cached is not None:
+            return PreparedAnswer(search_query, output_language, vector=vector, cached=cached)
+
+        if vector is None:
+            vector = self.embed_query(search_query, priority)
+        cached = self.lookup_cached(search_query, output_language, vector)
+        if cached is not None:
+            return PreparedAnswer(search_query, output_language, vector=vector, cached=cached)
+
+        docs = self.pack(self.retrieve(search_query, vector, self.disaster_type(search_query)), vector, priority)
+        rendered = history.render(self.config.memory_history_tokens) if history else ""
+        prompt = self.build_prompt(query, docs, output_language, rendered)
+        return PreparedAnswer(search_query, output_language, vector=vector, prompt=prompt, docs=docs,
+                              private=bool(rendered))
+
+    def generate(self, prepared: PreparedAnswer, priority: str = DEFAULT_PRIORITY) -> str:
+        """
+        Generate the answer for a prepared question.
+
+        Args:
+            prepared: Result of `prepare`
+            priority: Response type whose queue priority the LLM call gets
+
+        Returns:
+            str: Cached or generated answer
+        """
+        if prepared.cached is not None:
+            return prepared.cached
+        try:
+            with self.llm_admission.acquire(priority), get_tracer().span("llm", stream=False):
+                answer = self.llm.invoke(prepared.prompt).content
+        except (LLMUnavailableError, AdmissionRejected) as e:
+            logger.warning("LLM unavailable, answering in degraded mode: %s", e)
+            return self.degraded_answer(prepared)
+        if not prepared.private:
+            self.remember(prepared.query, prepared.vector, prepared.output_language, answer)
+        return answer
+
+    def stream_generate(self, prepared: PreparedAnswer, priority: str = DEFAULT_PRIORITY,
+                        on_queued: Optional[Callable[[Ticket], None]] = None) -> Iterator[str]:
+        """
+        Generate the answer for a prepared question, yielding text as it arrives.
+
+        Closing the returned generator closes the underlying Gemini stream,
+        so abandoning a half-read answer stops generation. Only answers that
+        were streamed to the end, from a prompt without the session's
+        history, are cached. If no model can start answering,
+        or the request is shed from the LLM queue, the degraded answer is
+        yielded instead.
+
+        Args:
+            prepared: Result of `prepare`
+            priority: Response type whose queue priority the LLM call gets
+            on_queued: Called with the admission ticket if the request has to wait
+
+        Yields:
+            str: Text chunks in generation order
+        """
+        if prepared.cached is not None:
+            yield prepared.cached
+            return
+
+        parts = []
+        try:
+            with self.llm_admission.acquire(priority, on_queued), \
+                    get_tracer().span("llm", stream=True), \
+                    closing(self.llm.stream(prepared.prompt)) as chunks:
+                for chunk in chunks:
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        yield chunk.content
+        except (LLMUnavailableError, AdmissionRejected) as e:
+            if parts:
+                raise
+            logger.warning("LLM unavailable, answering in degraded mode: %s", e)
+            yield self.degraded_answer(prepared)
+            return
+        if not prepared.private:
+            self.remember(prepared.query, prepared.vector, prepared.output_language, "".join(parts))
+
+    def degraded_answer(self, prepared: PreparedAnswer, max_chunks: int = 3,
+                        max_chars: int = 400) -> str:
+        """
+        Answer without the LLM: a notice and excerpts of the retrieved context.
+
+        Args:
+            prepared: Result of `prepare`
+            max_chunks: Most relevant chunks to quote
+            max_chars: Characters quoted per chunk
+
+        Returns:
+            str: Degraded answer in the output language
+        """
+        excerpts = []
+        for doc in prepared.docs[:max_chunks]:
+            text = " ".join(doc.page_content.split())
+            if len(text) > max_chars:
+                text = text[:max_chars].rsplit(" ", 1)[0] + " …"
+            excerpts.append(f"- {text}")
+        return "\n\n".join([get_degraded_notice(prepared.output_language), *excerpts])
+
+    def stream_shared(self, query: str, output_language: str, vector: Optional[List[float]] = None,
+                      priority: str = DEFAULT_PRIORITY,
+                      on_prepared: Optional[Callable[[PreparedAnswer], None]] = None,
+                      on_queued: Optional[Callable[[Ticket], None]] = None,
+                      history: Optional[ConversationContext] = None
+                      ) -> Tuple[Iterator[str], bool]:
+        """
+        Answer a question as a stream shared with identical in-flight questions.
+
+        Requests with the same normalized question and output language that
+        arrive while an answer is being produced attach to it and receive
+        the same chunks, so only the first one retrieves and calls Gemini.
+
+        Args:
+            query: User's question
+            output_language: Output language selected by the user
+            vector: Query embedding, if the caller already computed it
+            priority: Response type whose queue priority the computation gets
+            on_prepared: Called with the prepared answer if this request
+                starts the computation
+            on_queued: Called with the LLM admission ticket if this request
+                starts the computation and has to wait for a slot
+            history: Conversation before the question
+
+        Returns:
+            Tuple[Iterator[str], bool]: Text chunks, and whether this request
+            joined another one
+        """
+        key, start = self._shared_flight(query, output_language, vector, priority,
+                                         on_prepared, on_queued, history)
+        return self.inflight.stream(key, start)
+
+    def push_shared(self, query: str, output_language: str,
+                    deliver: Callable[[str], bool], finish: Callable[[Optional[BaseException]], None],
+                    vector: Optional[List[float]] = None, priority: str = DEFAULT_PRIORITY,
+                    on_prepared: Optional[Callable[[PreparedAnswer], None]] = None,
+                    on_queued: Optional[Callable[[Ticket], None]] = None,
+                    history: Optional[ConversationContext] = None) -> bool:
+        """
+        Like `stream_shared`, but the chunks are pushed to callbacks by the
+        thread producing them, so no caller thread is held while the answer
+        streams.
+
+        Args:
+            query: User's question
+            output_language: Output language selected by the user
+            deliver: Called with every chunk; must not block, and returns
+                False once nobody reads the answer any more
+            finish: Called once at the end with the error, or None
+            vector: Query embedding, if the caller already computed it
+            priority: Response type whose queue priority the computation gets
+            on_prepared: Called with the prepared answer if this request
+                starts the computation
+            on_queued: Called with the LLM admission ticket if this request
+                starts the computation and has to wait for a slot
+            history: Conversation before the question
+
+        Returns:
+            bool: Whether this request joined another one
+        """
+        key, start = self._shared_flight(query, output_language, vector, priority,
+                                         on_prepared, on_queued, history)
+        return self.inflight.push(key, start, deliver, finish)
+
+    def _shared_flight(self, query: str, output_language: str, vector: Optional[List[float]],
+                       priority: str, on_prepared: Optional[Callable[[PreparedAnswer], None]],
+                       on_queued: Optional[Callable[[Ticket], None]],
+                       history: Optional[ConversationContext]
+                       ) -> Tuple[str, Callable[[], Tuple[Iterator[str], bool]]]:
+        """Coalescing key and computation of a shared answer."""
+        def start() -> Tuple[Iterator[str], bool]:
+            prepared = self.prepare(query, output_language, vector, priority, history)
+            if on_prepared is not None:
+                on_prepared(prepared)
+            return self.stream_generate(prepared, priority, on_queued), prepared.cached is None
+
+        key = self.response_cache.make_key(self.search_query(query, history), output_language)
+        rendered = history.render(self.config.memory_history_tokens) if history else ""
+        if rendered:
+            # Answers shaped by one session's history are only coalesced
+            # with the same question asked over the same history
+            key += ":" + hashlib.sha256(rendered.encode("utf-8")).hexdigest()
+        return key, start
+
+    def summarize_history(self, summary: str, messages: List[Message]) -> str:
+        """
+        Fold messages into a conversation summary.
+
+        Runs in the lowest admission class, so under load summaries wait or
+        are shed rather than delaying answers.
+
+        Args:
+            summary: Current summary; empty at first
+            messages: Messages evicted from the recent turns, oldest first
+
+        Returns:
+            str: Updated summary
+
+        Raises:
+            AdmissionRejected: The request was shed from the LLM queue
+            LLMUnavailableError: No model could answer
+        """
+        prompt = SUMMARY_PROMPT.format(
+            summary=summary or "None",
+            conversation=format_transcript(messages),
+            max_words=self.config.memory_summary_tokens * 3 // 4
+        )
+        with self.llm_admission.acquire("summary"), get_tracer().span("summarize", messages=len(messages)):
+            return self.llm.invoke(prompt).content
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        """
+        Get the metrics of every engine component.
+
+        Returns:
+            Dict[str, Dict[str, object]]: Metrics by component
+        """
+        stats = {
+            'semantic_cache': self.semantic_cache.stats(),
+            'response_cache': self.response_cache.stats(),
+            'embedding_cache': self.embeddings.stats(),
+            'llm': self.llm.stats(),
+            'singleflight': self.inflight.stats(),
+            'llm_admission': self.llm_admission.stats(),
+            'embedding_admission': self.embedding_admission.stats(),
+        }
+        if isinstance(self.embeddings.embeddings, MicroBatchingEmbeddings):
+            stats['embedding_batcher'] = self.embeddings.embeddings.stats()
+        return stats
+
+    def answer(self, query: str, output_language: str,
+               history: Optional[ConversationContext] = None) -> str:
+        """
+        Answer a question with retrieval and generation.
+
+        Args:
+            query: User's question
+            output_language: Output language selected by the user
+            history: Conversation before the question
+
+        Returns:
+            str: Generated answer
+        """
+        return self.generate(self.prepare(query, output_language, history=history))
+
+    def stream_answer(self, query: str, output_language: str,
+                      history: Optional[ConversationContext] = None) -> Iterator[str]:
+        """
+        Answer a question, yielding the generated text as it arrives.
+
+        Args:
+            query: User's question
+            output_language: Output language selected by the user
+            history: Conversation before the question
+
+        Yields:
+            str: Text chunks in generation order
+        """
+        yield from self.stream_generate(self.prepare(query, output_language, history=history))
+
+
+_engine: Optional[RAGEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_rag_engine(config: RAGConfig) -> RAGEngine:
+    """
+    Get the process-wide RAG engine, building it on first use.
+
+    The engine is rebuilt only when the requested configuration differs from
+    the one the current engine was built with.
+
+    Args:
+        config: Desired engine configuration
+
+    Returns:
+        RAGEngine: Shared engine instance
+    """
+    global _engine
+    engine = _engine
+    if engine is not None and engine.config == config:
+        return engine
+
+    with _engine_lock:
+        if _engine is None or _engine.config != config:
+            _engine = RAGEngine(config)
+        return _engine
@@ -0,0 +1,503 @@
+"""
+Incremental document ingestion.
+Loads PDFs and text files, splits them into chunks, and embeds and upserts
+only the chunks whose content changed since the last run. Chunks of changed
+or deleted files are deleted from Pinecone. Progress is kept
+in a SQLite manifest, so an interrupted run resumes where it stopped.
+
+Usage:
+    python -m rag.ingest docs/ --index pdfinfo --faiss-dir .cache/faiss
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from .metadata import METADATA_SCHEMA, tag_chunks
+
+DEFAULT_MANIFEST_PATH = os.path.join('.cache', 'ingest', 'manifest.sqlite3')
+
+# Namespace and id of the marker vector recording the index version
+META_NAMESPACE = "__meta__"
+INDEX_VERSION_ID = "index_version"
+
+# Same model settings as the RAG engine
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+ENCODE_BATCH_SIZE = 32
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.md')
+
+
+class Progress:
+    """Prints progress and throughput for one ingestion stage."""
+
+    def __init__(self, label: str, total: int, interval: float = 2.0):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.interval = interval
+        self._start = time.perf_counter()
+        self._last_report = 0.0
+
+    def advance(self, count: int) -> None:
+        """Record finished items, reporting at most once per interval."""
+        self.done += count
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval or self.done >= self.total:
+            self._last_report = now
+            self.report()
+
+    def report(self) -> None:
+        """Print the current progress line."""
+        elapsed = time.perf_counter() - self._start
+        rate = self.done / elapsed if elapsed else 0.0
+        print(f"{self.label}: {self.done}/{self.total} chunks ({rate:.1f} chunks/s)", flush=True)
+
+
+class Manifest:
+    """
+    SQLite record of every chunk that has been ingested.
+
+    Each chunk is keyed by the hash of its content and remembers its vector
+    and whether it has reached Pinecone, which is what makes runs
+    incremental and resumable. Removed chunks are kept as tombstones until
+    they are deleted from Pinecone.
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                vector BLOB,
+                upserted INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute('CREATE TABLE IF NOT EXISTS tombstones (id TEXT PRIMARY KEY)')
+        self._conn.commit()
+
+    def sync(self, chunks: Sequence[Document], sources: Iterable[str]) -> List[str]:
+        """
+        Register the current chunks of the given sources.
+
+        Sources ingested by earlier runs whose files are gone from disk
+        count as emptied, so their chunks are returned as stale too.
+
+        Args:
+            chunks: Current chunks, each with `id` and `source` metadata
+            sources: Sources that were loaded in this run
+
+        Returns:
+            List[str]: Ids of previously ingested chunks that no longer exist
+        """
+        current = {chunk.metadata['id'] for chunk in chunks}
+        rows = [
+            (chunk.metadata['id'], chunk.metadata['source'], chunk.page_content,
+             json.dumps(chunk.metadata, ensure_ascii=False))
+            for chunk in chunks
+        ]
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO chunks (id, source, text, metadata) VALUES (?, ?, ?, ?)', rows
+        )
+        # A chunk that came back must not be deleted from Pinecone
+        self._conn.executemany('DELETE FROM tombstones WHERE id = ?', [(row[0],) for row in rows])
+        # Chunks whose metadata changed (e.g. re-tagged) keep their vector
+        # but are upserted again
+        self._conn.executemany(
+            'UPDATE chunks SET metadata = ?, upserted = 0 WHERE id = ? AND metadata != ?',
+            [(metadata, chunk_id, metadata) for chunk_id, _, _, metadata in rows]
+        )
+        self._conn.commit()
+
+        sources = set(sources)
+        known = [source for (source,) in self._conn.execute('SELECT DISTINCT source FROM chunks')]
+        sources.update(source for source in known if not os.path.exists(source))
+
+        stale = []
+        for source in sorted(sources):
+            for (chunk_id,) in self._conn.execute('SELECT id FROM chunks WHERE source = ?', (source,)):
+                if chunk_id not in current:
+                    stale.append(chunk_id)
+        return stale
+
+    def untagged(self) -> int:
+        """Number of chunks ingested before chunks were tagged for filtering."""
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM chunks WHERE json_extract(metadata, '$.disaster_types') IS NULL"
+        ).fetchone()[0]
+
+    def remove(self, ids: Sequence[str]) -> None:
+        """Forget chunks, keeping tombstones until they are deleted from Pinecone."""
+        self._conn.executemany('DELETE FROM chunks WHERE id = ?', [(i,) for i in ids])
+        self._conn.executemany('INSERT OR IGNORE INTO tombstones (id) VALUES (?)', [(i,) for i in ids])
+        self._conn.commit()
+
+    def pending_delete(self) -> List[str]:
+        """Ids of removed chunks that may still be in Pinecone."""
+        return [chunk_id for (chunk_id,) in self._conn.execute('SELECT id FROM tombstones ORDER BY id')]
+
+    def mark_deleted(self, ids: Sequence[str]) -> None:
+        """Record that chunks were deleted from Pinecone."""
+        self._conn.executemany('DELETE FROM tombstones WHERE id = ?', [(i,) for i in ids])
+        self._conn.commit()
+
+    def pending_embedding(self) -> List[Tuple[str, str]]:
+        """(id, text) of chunks that have no vector yet."""
+        return self._conn.execute('SELECT id, text FROM chunks WHERE vector IS NULL').fetchall()
+
+    def store_vectors(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """Save encoded vectors."""
+        self._conn.executemany(
+            'UPDATE chunks SET vector = ?, upserted = 0 WHERE id = ?',
+            [(vector.astype(np.float32).tobytes(), chunk_id) for chunk_id, vector in zip(ids, vectors)]
+        )
+        self._conn.commit()
+
+    def pending_upsert(self) -> List[Tuple[str, str, str, bytes]]:
+        """(id, text, metadata, vector) of embedded chunks not yet in Pinecone."""
+        return self._conn.execute(
+            'SELECT id, text, metadata, vector FROM chunks WHERE vector IS NOT NULL AND upserted = 0'
+        ).fetchall()
+
+    def mark_upserted(self, ids: Sequence[str]) -> None:
+        """Record that chunks reached Pinecone."""
+        self._conn.executemany('UPDATE chunks SET upserted = 1 WHERE id = ?', [(i,) for i in ids])
+        self._conn.commit()
+
+    def iter_vectors(self) -> Iterator[Tuple[str, List[float], dict]]:
+        """Yield (id, vector, metadata with text) for every embedded chunk."""
+        rows = self._conn.execute(
+            'SELECT id, text, metadata, vector FROM chunks WHERE vector IS NOT NULL ORDER BY id'
+        )
+        for chunk_id, text, metadata, vector in rows:
+            yield chunk_id, np.frombuffer(vector, dtype=np.float32).tolist(), _pinecone_metadata(text, metadata)
+
+
+def _pinecone_metadata(text: str, metadata: str) -> Dict:
+    """Metadata stored alongside a vector: the chunk text plus loader metadata."""
+    fields = json.loads(metadata)
+    fields.pop('id', None)
+    fields['text'] = text
+    # Pinecone metadata values must be strings, numbers, booleans or string lists
+    return {key: value for key, value in fields.items()
+            if isinstance(value, (str, int, float, bool)) or
+            (isinstance(value, list) and all(isinstance(v, str) for v in value))}
+
+
+def load_documents(paths: Sequence[str]) -> List[Document]:
+    """
+    Load every supported file under the given paths.
+
+    Args:
+        paths: Files or directories
+
+    Returns:
+        List[Document]: One document per PDF page or text file
+    """
+    from langchain_community.document_loaders import PyPDFLoader, TextLoader
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        else:
+            files.append(path)
+
+    documents = []
+    for file_path in files:
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in SUPPORTED_EXTENSIONS:
+            continue
+        loader = PyPDFLoader(file_path) if extension == '.pdf' else TextLoader(file_path, encoding='utf-8')
+        for document in loader.load():
+            document.metadata['source'] = os.path.normpath(file_path)
+            documents.append(document)
+    return documents
+
+
+def split_documents(documents: Sequence[Document], chunk_size: int = 1000,
+                    chunk_overlap: int = 200) -> List[Document]:
+    """
+    Split documents into chunks with content-hash ids and retrieval metadata.
+
+    Identical chunks share one id, so duplicates are embedded once. Each
+    chunk is tagged with its disaster types, region and language (see
+    `rag.metadata`).
+
+    Args:
+        documents: Loaded documents
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Characters shared between neighbouring chunks
+
+    Returns:
+        List[Document]: Unique chunks with `id` and the retrieval fields in their metadata
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks: Dict[str, Document] = {}
+    for chunk in splitter.split_documents(documents):
+        chunk_id = hashlib.sha256(chunk.page_content.encode('utf-8')).hexdigest()[:32]
+        chunk.metadata['id'] = chunk_id
+        chunks.setdefault(chunk_id, chunk)
+    tag_chunks(list(chunks.values()))
+    return list(chunks.values())
+
+
+_worker_model = None
+
+
+def _init_worker(model_name: str) -> None:
+    """Load the embedding model once per worker process."""
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # Worker processes share the CPU; one thread each avoids oversubscription
+    torch.set_num_threads(1)
+    _worker_model = SentenceTransformer(model_name, device='cpu')
+
+
+def _encode_batch(ids: List[str], texts: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Encode one batch in a worker process."""
+    vectors = _worker_model.encode(
+        texts, batch_size=ENCODE_BATCH_SIZE, normalize_embeddings=True,
+        convert_to_numpy=True, show_progress_bar=False
+    )
+    return ids, vectors.astype(np.float32)
+
+
+def embed_pending(manifest: Manifest, workers: int, batch_size: int,
+                  model_name: str = EMBEDDING_MODEL) -> int:
+    """
+    Embed every chunk in the manifest that has no vector yet.
+
+    Batches are encoded across a process pool and saved as they finish, so a
+    crash loses at most the batches that were in flight.
+
+    Args:
+        manifest: Ingestion manifest
+        workers: Number of encoder processes
+        batch_size: Chunks per batch sent to a worker
+        model_name: Sentence-transformers model name
+
+    Returns:
+        int: Number of chunks embedded
+    """
+    pending = manifest.pending_embedding()
+    if not pending:
+        return 0
+
+    progress = Progress("Embedding", len(pending))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_name,)) as pool:
+        futures = []
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            futures.append(pool.submit(
+                _encode_batch, [row[0] for row in batch], [row[1] for row in batch]
+            ))
+        for future in as_completed(futures):
+            ids, vectors = future.result()
+            manifest.store_vectors(ids, vectors)
+            progress.advance(len(ids))
+    return len(pending)
+
+
+def upsert_pending(manifest: Manifest, index, batch_size: int, namespace: str = "") -> int:
+    """
+    Upsert embedded chunks that have not reached Pinecone yet.
+
+    Args:
+        manifest: Ingestion manifest
+        index: Pinecone Index handle
+        batch_size: Vectors per upsert request
+        namespace: Pinecone namespace
+
+    Returns:
+        int: Number of vectors upserted
+    """
+    pending = manifest.pending_upsert()
+    if not pending:
+        return 0
+
+    progress = Progress("Upserting", len(pending))
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        index.upsert(
+            vectors=[
+                (chunk_id, np.frombuffer(vector, dtype=np.float32).tolist(),
+                 _pinecone_metadata(text, metadata))
+                for chunk_id, text, metadata, vector in batch
+            ],
+            namespace=namespace
+        )
+        manifest.mark_upserted([row[0] for row in batch])
+        progress.advance(len(batch))
+    return len(pending)
+
+
+def delete_pending(manifest: Manifest, index, batch_size: int, namespace: str = "") -> int:
+    """
+    Delete removed chunks from Pinecone.
+
+    Tombstones are only dropped once their batch is deleted, so chunks
+    removed while Pinecone was skipped or unreachable are deleted next run.
+
+    Args:
+        manifest: Ingestion manifest
+        index: Pinecone Index handle
+        batch_size: Ids per delete request
+        namespace: Pinecone namespace
+
+    Returns:
+        int: Number of vectors deleted
+    """
+    pending = manifest.pending_delete()
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        index.delete(ids=batch, namespace=namespace)
+        manifest.mark_deleted(batch)
+    return len(pending)
+
+
+def write_index_version(index, dimension: int, tagged: bool = False) -> str:
+    """
+    Record a new index version in Pinecone so caches built on the previous
+    contents are flushed.
+
+    Args:
+        index: Pinecone Index handle
+        dimension: Vector dimension of the index
+        tagged: Whether every chunk carries the retrieval tags; recorded as
+            the metadata schema, which enables filtered retrieval
+
+    Returns:
+        str: The new version
+    """
+    version = uuid.uuid4().hex[:16]
+    marker = [0.0] * dimension
+    marker[0] = 1.0
+    metadata = {'version': version}
+    if tagged:
+        metadata['metadata_schema'] = METADATA_SCHEMA
+    index.upsert(vectors=[(INDEX_VERSION_ID, marker, metadata)], namespace=META_NAMESPACE)
+    return version
+
+
+def ingest(paths: Sequence[str], manifest_path: str = DEFAULT_MANIFEST_PATH, index=None,
+           faiss_dir: Optional[str] = None, workers: int = 2, encode_batch_size: int = 256,
+           upsert_batch_size: int = 100, namespace: str = "") -> Dict[str, int]:
+    """
+    Run an incremental ingestion.
+
+    Args:
+        paths: Files or directories to ingest
+        manifest_path: SQLite manifest path
+        index: Pinecone Index handle, or None to skip Pinecone
+        faiss_dir: Directory for the local FAISS index, or None to skip it
+        workers: Number of encoder processes
+        encode_batch_size: Chunks per encoder task
+        upsert_batch_size: Vectors per Pinecone upsert
+        namespace: Pinecone namespace
+
+    Returns:
+        Dict[str, int]: Counts of chunks seen, embedded, upserted and deleted
+        from Pinecone
+    """
+    manifest = Manifest(manifest_path)
+
+    documents = load_documents(paths)
+    chunks = split_documents(documents)
+    sources = {document.metadata['source'] for document in documents}
+    stale = manifest.sync(chunks, sources)
+    print(f"Loaded {len(documents)} pages from {len(sources)} files into {len(chunks)} chunks", flush=True)
+
+    embedded = embed_pending(manifest, workers, encode_batch_size)
+
+    manifest.remove(stale)
+    upserted = deleted = 0
+    if index is not None:
+        upserted = upsert_pending(manifest, index, upsert_batch_size, namespace)
+        deleted = delete_pending(manifest, index, upsert_batch_size, namespace)
+
+    if faiss_dir:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        from .local_index import build_local_index
+
+        embeddings = HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True, 'batch_size': ENCODE_BATCH_SIZE}
+        )
+        build_local_index(manifest.iter_vectors(), embeddings, faiss_dir)
+
+    if index is not None and (upserted or deleted):
+        dimension = index.describe_index_stats().dimension
+        version = write_index_version(index, dimension, tagged=manifest.untagged() == 0)
+        print(f"Index version is now {version}", flush=True)
+
+    return {
+        'chunks': len(chunks),
+        'embedded': embedded,
+        'upserted': upserted,
+        'deleted': deleted
+    }
+
+
+def main():
+    """Command-line entry point for ingestion."""
+    parser = argparse.ArgumentParser(description="Incrementally ingest documents into the RAG index.")
+    parser.add_argument("paths", nargs="+", help="PDF/text files or directories")
+    parser.add_argument("--index", help="Pinecone index name (requires PINECONE_API_KEY)")
+    parser.add_argument("--namespace", default="", help="Pinecone namespace")
+    parser.add_argument("--faiss-dir", help="Also build a local FAISS index in this directory")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH, help="Manifest path")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Encoder processes")
+    parser.add_argument("--encode-batch-size", type=int, default=256, help="Chunks per encoder task")
+    parser.add_argument("--upsert-batch-size", type=int, default=100, help="Vectors per upsert")
+    args = parser.parse_args()
+
+    if not args.index and not args.faiss_dir:
+        parser.error("Give --index and/or --faiss-dir")
+
+    index = None
+    if args.index:
+        api_key = os.environ.get("PINECONE_API_KEY")
+        if not api_key:
+            parser.error("Set PINECONE_API_KEY in the environment")
+        from pinecone import Pinecone
+        index = Pinecone(api_key=api_key).Index(args.index)
+
+    start = time.perf_counter()
+    counts = ingest(
+        args.paths, args.manifest, index, args.faiss_dir, args.workers,
+        args.encode_batch_size, args.upsert_batch_size, args.namespace
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"Done in {elapsed:.1f}s: {counts['chunks']} chunks, {counts['embedded']} embedded, "
+        f"{counts['upserted']} upserted, {counts['deleted']} deleted"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
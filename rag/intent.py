@@ -0,0 +1,166 @@
+"""
+Embedding-based intent routing.
+Classifies a message as emergency, greeting, information or out-of-domain
+chatter by comparing its MiniLM query vector, which retrieval needs anyway,
+against per-intent and per-language centroids with one matrix product.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+INTENTS = ("emergency", "greeting", "information", "out_of_domain")
+
+# Intent used when the router is not confident
+DEFAULT_INTENT = "information"
+
+# Example messages per intent and language; each group becomes one centroid
+INTENT_EXAMPLES: Dict[str, Dict[str, Sequence[str]]] = {
+    "emergency": {
+        "English": [
+            "Help, the water is rising and we are trapped",
+            "My house is on fire, what do I do",
+            "The building collapsed and people are under the rubble",
+            "Someone is badly injured and bleeding",
+            "We are stuck on the roof, please send rescue",
+        ],
+        "Urdu": [
+            "مدد کریں، پانی بڑھ رہا ہے اور ہم پھنس گئے ہیں",
+            "میرے گھر میں آگ لگ گئی ہے",
+            "عمارت گر گئی ہے اور لوگ ملبے کے نیچے ہیں",
+            "کوئی شدید زخمی ہے اور خون بہہ رہا ہے",
+        ],
+        "Sindhi": [
+            "مدد ڪريو، پاڻي وڌي رهيو آهي ۽ اسين ڦاسي پيا آهيون",
+            "منهنجي گهر ۾ باهه لڳي وئي آهي",
+            "عمارت ڪري پئي آهي ۽ ماڻهو ملبي هيٺ آهن",
+        ],
+        "Roman Urdu": [
+            "madad karo pani barh raha hai",
+            "ghar mein aag lag gayi hai",
+            "bachao hum phans gaye hain",
+        ],
+    },
+    "greeting": {
+        "English": ["hi", "hello there", "good morning", "how are you", "thank you so much", "bye, see you"],
+        "Urdu": ["السلام علیکم", "آپ کیسے ہیں", "شکریہ", "خدا حافظ"],
+        "Sindhi": ["السلام عليڪم", "توهان ڪيئن آهيو", "مهرباني", "خدا حافظ"],
+        "Roman Urdu": ["salam", "assalam o alaikum", "kya haal hai", "shukriya", "allah hafiz"],
+    },
+    "information": {
+        "English": [
+            "What should I do to prepare for a flood?",
+            "How do I make an emergency kit?",
+            "What is the role of NDMA in disaster management?",
+            "Safety measures during an earthquake",
+            "How to purify water after a disaster",
+            "What are the stages of disaster risk assessment?",
+        ],
+        "Urdu": [
+            "سیلاب کی تیاری کے لیے کیا کرنا چاہیے؟",
+            "زلزلے کے دوران حفاظتی اقدامات کیا ہیں؟",
+            "آفات کے انتظام میں این ڈی ایم اے کا کیا کردار ہے؟",
+        ],
+        "Sindhi": [
+            "ٻوڏ جي تياري لاءِ ڇا ڪرڻ گهرجي؟",
+            "زلزلي دوران حفاظتي اپاءَ ڪهڙا آهن؟",
+            "آفتن جي انتظام ۾ پي ڊي ايم اي جو ڪردار ڇا آهي؟",
+        ],
+        "Roman Urdu": [
+            "selab ki tayari kaise karein",
+            "zalzale mein kya karna chahiye",
+        ],
+    },
+    "out_of_domain": {
+        "English": [
+            "Tell me a joke",
+            "Who won the cricket match yesterday?",
+            "Write me a poem about love",
+            "What is the best phone to buy?",
+            "Recommend a good movie",
+            "Solve my math homework",
+        ],
+        "Urdu": ["مجھے ایک لطیفہ سناؤ", "کل کرکٹ میچ کون جیتا؟", "کوئی اچھی فلم بتائیں"],
+        "Sindhi": ["مون کي هڪ چرچو ٻڌايو", "ڪالهه ڪرڪيٽ ميچ ڪير کٽيو؟"],
+        "Roman Urdu": ["koi joke sunao", "kal match kon jeeta", "koi achi movie batao"],
+    },
+}
+
+
+@dataclass(frozen=True)
+class IntentResult:
+    """Outcome of routing one message."""
+    intent: str
+    language: str
+    score: float
+    # Best score of the information intent, for the margin check
+    information_score: float
+
+
+class IntentRouter:
+    """
+    Nearest-centroid intent classifier over normalized query vectors.
+
+    Each (intent, language) group of examples is embedded once and averaged
+    into a unit centroid. The centroids form one matrix, so classifying a
+    message is a single matrix-vector product. Greeting and out-of-domain
+    routes skip the LLM, so they must beat the information intent by a
+    margin; anything uncertain is treated as an information request.
+    """
+
+    def __init__(self, embeddings: Embeddings,
+                 examples: Dict[str, Dict[str, Sequence[str]]] = INTENT_EXAMPLES,
+                 min_score: float = 0.45, margin: float = 0.05):
+        """
+        Embed the examples and build the centroid matrix.
+
+        Args:
+            embeddings: Embeddings used for queries (vectors must be normalized)
+            examples: Example messages by intent and language
+            min_score: Lowest cosine similarity accepted for a route
+            margin: How far greeting or out-of-domain must beat information
+        """
+        self.min_score = min_score
+        self.margin = margin
+
+        groups = [(intent, language, list(texts))
+                  for intent, by_language in examples.items()
+                  for language, texts in by_language.items() if texts]
+        texts = [text for _, _, group in groups for text in group]
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+        centroids: List[np.ndarray] = []
+        start = 0
+        for _, _, group in groups:
+            centroid = vectors[start:start + len(group)].mean(axis=0)
+            centroids.append(centroid / max(float(np.linalg.norm(centroid)), 1e-12))
+            start += len(group)
+
+        self.centroids = np.vstack(centroids)
+        self.intents = np.array([intent for intent, _, _ in groups])
+        self.languages = [language for _, language, _ in groups]
+        self._information = self.intents == "information"
+
+    def classify(self, vector: Sequence[float]) -> IntentResult:
+        """
+        Route a query vector.
+
+        Args:
+            vector: Normalized query embedding
+
+        Returns:
+            IntentResult: Chosen intent, the language of the closest
+            centroid and the similarity scores
+        """
+        scores = self.centroids @ np.asarray(vector, dtype=np.float32)
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        information_score = float(scores[self._information].max()) if self._information.any() else -1.0
+        intent = str(self.intents[best])
+
+        if score < self.min_score:
+            intent = DEFAULT_INTENT
+        elif intent in ("greeting", "out_of_domain") and score - information_score < self.margin:
+            intent = DEFAULT_INTENT
+        return IntentResult(intent, self.languages[best], score, information_score)
@@ -0,0 +1,182 @@
+"""
+Intent routing evaluation.
+A labelled set of messages, disjoint from the router's examples, in every
+language the router has centroids for, and per-language accuracy of the
+router on it. Routing skips retrieval for greetings and out-of-domain
+chatter, so it should only be enabled once every language reaches the
+target accuracy with the deployed embedding model.
+
+Usage:
+    python -m rag.intent_eval
+    python -m rag.intent_eval --backend onnx
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+
+from .intent import INTENT_EXAMPLES, IntentRouter
+
+# Accuracy every language must reach before routing is enabled
+ACCURACY_TARGET = 0.9
+
+# Routes that answer without retrieval
+SHORT_CIRCUIT_INTENTS = ("greeting", "out_of_domain")
+
+# Held-out messages by intent and language, in the layout of INTENT_EXAMPLES
+EVAL_MESSAGES: Dict[str, Dict[str, Sequence[str]]] = {
+    "emergency": {
+        "English": [
+            "Please help, my father collapsed and is not breathing",
+            "Our village is flooding and the children cannot swim",
+            "Gas leak and flames in the kitchen, what now",
+            "The ground is shaking and the wall fell on my leg",
+            "Water has entered the house and we cannot get out",
+        ],
+        "Urdu": [
+            "پانی گھر میں داخل ہو گیا ہے، ہم باہر نہیں نکل سکتے",
+            "میرے والد بے ہوش ہو گئے ہیں، جلدی مدد چاہیے",
+            "باورچی خانے میں گیس سے آگ بھڑک اٹھی ہے",
+            "زلزلے سے دیوار گر گئی اور ایک بچہ نیچے دب گیا",
+        ],
+        "Sindhi": [
+            "پاڻي گهر ۾ گهڙي آيو آهي، اسين ٻاهر نٿا نڪري سگهون",
+            "منهنجو پيءُ بيهوش ٿي ويو آهي، جلدي مدد ڪريو",
+            "زلزلي سان ڀت ڪري پئي ۽ ٻار هيٺ دٻجي ويو",
+        ],
+        "Roman Urdu": [
+            "pani ghar mein aa gaya hai hum nikal nahi sakte",
+            "abbu behosh ho gaye hain jaldi madad karo",
+            "zalzala aya aur deewar gir gayi",
+        ],
+    },
+    "greeting": {
+        "English": ["hey, good evening", "thanks a lot for your help", "nice to meet you",
+                    "goodbye and take care"],
+        "Urdu": ["صبح بخیر", "بہت بہت شکریہ", "آپ سے مل کر خوشی ہوئی"],
+        "Sindhi": ["صبح جو سلام", "توهان جي وڏي مهرباني", "الله حافظ"],
+        "Roman Urdu": ["hello bhai", "bohat shukriya", "khuda hafiz"],
+    },
+    "information": {
+        "English": [
+            "How can I protect my livestock during floods?",
+            "Where should I go during an earthquake if I am indoors?",
+            "What documents should I keep in a waterproof bag?",
+            "How does the early warning system for cyclones work?",
+            "What first aid should I give for a minor burn?",
+        ],
+        "Urdu": [
+            "سیلاب کے دوران مویشیوں کو کیسے محفوظ رکھیں؟",
+            "ہنگامی بیگ میں کون سی چیزیں رکھنی چاہئیں؟",
+            "ہیٹ ویو میں لو لگنے سے کیسے بچیں؟",
+        ],
+        "Sindhi": [
+            "ٻوڏ دوران مال کي ڪيئن بچائجي؟",
+            "هنگامي ٿيلهي ۾ ڪهڙيون شيون رکڻ گهرجن؟",
+            "گرمي جي لهر ۾ ڪهڙي احتياط ڪجي؟",
+        ],
+        "Roman Urdu": [
+            "flood mein maweshi ko kaise bachayen",
+            "emergency bag mein kya rakhna chahiye",
+            "garmi ki lehar se kaise bachein",
+        ],
+    },
+    "out_of_domain": {
+        "English": [
+            "What's the weather like in Paris today?",
+            "Translate good night into French",
+            "Who is the richest person in the world?",
+            "Give me a recipe for biryani",
+        ],
+        "Urdu": ["بریانی کی ترکیب بتائیں", "دنیا کا امیر ترین آدمی کون ہے؟", "کوئی اچھا گانا سنائیں"],
+        "Sindhi": ["بريانيءَ جي ترڪيب ٻڌايو", "دنيا جو امير ترين ماڻهو ڪير آهي؟"],
+        "Roman Urdu": ["biryani ki recipe batao", "koi acha gana sunao", "duniya ka sab se ameer aadmi kon hai"],
+    },
+}
+
+
+def evaluate(router: IntentRouter, embeddings: Embeddings,
+             messages: Dict[str, Dict[str, Sequence[str]]] = EVAL_MESSAGES) -> Dict[str, Dict[str, object]]:
+    """
+    Route every labelled message and score the router per language.
+
+    Args:
+        router: Router under test
+        embeddings: Embeddings the router's centroids were built with
+        messages: Labelled messages by intent and language
+
+    Returns:
+        Dict[str, Dict[str, object]]: By language and for "all": `accuracy`,
+        `count`, `wrongly_skipped` (messages needing retrieval that were
+        routed to a canned reply) and `confusion` (counts by expected, then
+        routed intent)
+    """
+    labelled = [(intent, language, text)
+                for intent, by_language in messages.items()
+                for language, texts in by_language.items() for text in texts]
+    vectors = embeddings.embed_documents([text for _, _, text in labelled])
+
+    report: Dict[str, Dict[str, object]] = {}
+    for (expected, language, _), vector in zip(labelled, vectors):
+        routed = router.classify(vector).intent
+        for key in (language, "all"):
+            scores = report.setdefault(key, {'accuracy': 0.0, 'count': 0, 'correct': 0,
+                                             'wrongly_skipped': 0, 'confusion': {}})
+            scores['count'] += 1
+            scores['correct'] += routed == expected
+            scores['wrongly_skipped'] += (routed in SHORT_CIRCUIT_INTENTS
+                                          and expected not in SHORT_CIRCUIT_INTENTS)
+            confusion = scores['confusion'].setdefault(expected, {})
+            confusion[routed] = confusion.get(routed, 0) + 1
+    for scores in report.values():
+        scores['accuracy'] = round(scores.pop('correct') / scores['count'], 3)
+    return report
+
+
+def passes(report: Dict[str, Dict[str, object]], target: float = ACCURACY_TARGET) -> bool:
+    """Whether every language reaches the target and no message needing retrieval is skipped."""
+    return all(scores['accuracy'] >= target and scores['wrongly_skipped'] == 0
+               for scores in report.values())
+
+
+def _load_embeddings(backend: str, model_dir: Optional[str]) -> Embeddings:
+    if backend == "onnx":
+        from .onnx_embeddings import DEFAULT_ONNX_DIR, ONNXEmbeddings
+        return ONNXEmbeddings(model_dir or DEFAULT_ONNX_DIR)
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name='all-MiniLM-L6-v2',
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True, 'batch_size': 32}
+    )
+
+
+def main():
+    """Command-line entry point for the routing evaluation."""
+    parser = argparse.ArgumentParser(description="Evaluate embedding-based intent routing per language.")
+    parser.add_argument('--backend', choices=("torch", "onnx"), default="torch")
+    parser.add_argument('--model-dir', help="ONNX model directory")
+    parser.add_argument('--min-score', type=float, default=0.45)
+    parser.add_argument('--margin', type=float, default=0.05)
+    parser.add_argument('--json', action='store_true', help="Print the full report as JSON")
+    args = parser.parse_args()
+
+    embeddings = _load_embeddings(args.backend, args.model_dir)
+    router = IntentRouter(embeddings, INTENT_EXAMPLES, min_score=args.min_score, margin=args.margin)
+    report = evaluate(router, embeddings)
+
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        for language, scores in report.items():
+            print(f"{language:>12}: accuracy {scores['accuracy']:.3f} over {scores['count']} messages, "
+                  f"{scores['wrongly_skipped']} wrongly skipped retrieval")
+    ok = passes(report)
+    print(f"Routing {'can' if ok else 'should not'} be enabled (target {ACCURACY_TARGET:.0%} per language)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
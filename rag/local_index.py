@@ -0,0 +1,217 @@
+"""
+Local FAISS mirror of the Pinecone index.
+Copies the vectors and chunk texts out of Pinecone (or builds them from
+documents) into a FAISS index on disk, which the engine loads and queries
+directly or when Pinecone is unavailable. faiss and langchain_community are
+imported on first use, so Pinecone-only deployments do not need them.
+
+Usage:
+    python -m rag.local_index --index pdfinfo --out .cache/faiss
+"""
+import argparse
+import os
+import pickle
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from .ingest import META_NAMESPACE
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+DEFAULT_LOCAL_INDEX_DIR = os.path.join('.cache', 'faiss')
+
+
+def _distance_strategy():
+    """Embeddings are normalized, so inner product equals cosine similarity."""
+    from langchain_community.vectorstores.utils import DistanceStrategy
+    return DistanceStrategy.MAX_INNER_PRODUCT
+
+
+def build_local_index(vectors: Iterable[Tuple[str, List[float], dict]], embeddings: Embeddings,
+                      directory: str = DEFAULT_LOCAL_INDEX_DIR, text_key: str = "text") -> "FAISS":
+    """
+    Build and save a FAISS index from precomputed vectors.
+
+    Args:
+        vectors: (id, vector, metadata) triples; metadata holds the chunk text
+        embeddings: Embeddings used to encode queries against the index
+        directory: Output directory
+        text_key: Metadata field holding the chunk text
+
+    Returns:
+        FAISS: The in-memory vector store that was saved
+    """
+    ids, text_embeddings, metadatas = [], [], []
+    for vector_id, values, metadata in vectors:
+        metadata = dict(metadata or {})
+        text = metadata.pop(text_key, "")
+        ids.append(vector_id)
+        text_embeddings.append((text, list(values)))
+        metadatas.append(metadata)
+
+    from langchain_community.vectorstores import FAISS
+    vectorstore = FAISS.from_embeddings(
+        text_embeddings,
+        embeddings,
+        metadatas=metadatas,
+        ids=ids,
+        distance_strategy=_distance_strategy()
+    )
+    os.makedirs(directory, exist_ok=True)
+    vectorstore.save_local(directory)
+    return vectorstore
+
+
+def build_local_index_from_documents(documents: List[Document], embeddings: Embeddings,
+                                     directory: str = DEFAULT_LOCAL_INDEX_DIR) -> "FAISS":
+    """
+    Embed documents and save them as a FAISS index.
+
+    Args:
+        documents: Chunks to index
+        embeddings: Embeddings used for both chunks and queries
+        directory: Output directory
+
+    Returns:
+        FAISS: The in-memory vector store that was saved
+    """
+    from langchain_community.vectorstores import FAISS
+    vectorstore = FAISS.from_documents(documents, embeddings, distance_strategy=_distance_strategy())
+    os.makedirs(directory, exist_ok=True)
+    vectorstore.save_local(directory)
+    return vectorstore
+
+
+def iter_pinecone_vectors(index, batch_size: int = 100) -> Iterable[Tuple[str, List[float], dict]]:
+    """
+    Read every vector from a Pinecone index, across all namespaces.
+
+    Args:
+        index: Pinecone Index handle
+        batch_size: Number of ids fetched per request
+
+    Yields:
+        Tuple[str, List[float], dict]: (id, vector, metadata) with the
+        source namespace recorded in the metadata
+    """
+    stats = index.describe_index_stats()
+    for namespace in (stats.namespaces or {"": None}):
+        if namespace == META_NAMESPACE:
+            continue
+        for ids in index.list(namespace=namespace, limit=batch_size):
+            fetched = index.fetch(ids=list(ids), namespace=namespace)
+            for vector_id, vector in fetched.vectors.items():
+                metadata = dict(vector.metadata or {})
+                metadata['namespace'] = namespace
+                yield vector_id, vector.values, metadata
+
+
+def sync_from_pinecone(index, embeddings: Embeddings, directory: str = DEFAULT_LOCAL_INDEX_DIR,
+                       batch_size: int = 100) -> int:
+    """
+    Mirror a Pinecone index into a local FAISS index.
+
+    Args:
+        index: Pinecone Index handle
+        embeddings: Embeddings used to encode queries against the mirror
+        directory: Output directory
+        batch_size: Number of ids fetched per request
+
+    Returns:
+        int: Number of vectors mirrored
+    """
+    vectorstore = build_local_index(iter_pinecone_vectors(index, batch_size), embeddings, directory)
+    return vectorstore.index.ntotal
+
+
+def load_local_index(embeddings: Embeddings,
+                     directory: str = DEFAULT_LOCAL_INDEX_DIR) -> Optional["FAISS"]:
+    """
+    Load a saved FAISS index.
+
+    The index is read with IO_FLAG_MMAP, plus IO_FLAG_MMAP_IFC where the
+    installed faiss has it. Only with the latter does a flat index keep its
+    vectors in the page cache; older releases copy them into process memory.
+    The chunk texts are always unpickled into memory.
+
+    Args:
+        embeddings: Embeddings used to encode queries
+        directory: Directory written by `build_local_index` or `sync_from_pinecone`
+
+    Returns:
+        Optional[FAISS]: Vector store, or None if no index has been built
+    """
+    index_path = os.path.join(directory, "index.faiss")
+    docstore_path = os.path.join(directory, "index.pkl")
+    if not (os.path.exists(index_path) and os.path.exists(docstore_path)):
+        return None
+
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    # Flat indexes are only mapped, not copied, with IO_FLAG_MMAP_IFC
+    io_flags = faiss.IO_FLAG_MMAP | getattr(faiss, 'IO_FLAG_MMAP_IFC', 0)
+    index = faiss.read_index(index_path, io_flags)
+
+    # The docstore is written by FAISS.save_local in this same tool
+    with open(docstore_path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+        distance_strategy=_distance_strategy()
+    )
+
+
+def load_local_documents(directory: str = DEFAULT_LOCAL_INDEX_DIR) -> List[Document]:
+    """
+    Load the chunk texts of a saved local index without its vectors.
+
+    Args:
+        directory: Directory written by `build_local_index` or `sync_from_pinecone`
+
+    Returns:
+        List[Document]: All chunks, or an empty list if no index has been built
+    """
+    docstore_path = os.path.join(directory, "index.pkl")
+    if not os.path.exists(docstore_path):
+        return []
+    with open(docstore_path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return [docstore.search(doc_id) for doc_id in index_to_docstore_id.values()]
+
+
+def main():
+    """Command-line entry point for mirroring Pinecone locally."""
+    parser = argparse.ArgumentParser(description="Mirror the Pinecone index into a local FAISS index.")
+    parser.add_argument("--index", default="pdfinfo", help="Pinecone index name")
+    parser.add_argument("--out", default=DEFAULT_LOCAL_INDEX_DIR, help="Output directory")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Embedding model for queries")
+    parser.add_argument("--batch-size", type=int, default=100, help="Ids fetched per request")
+    args = parser.parse_args()
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from pinecone import Pinecone
+
+    api_key = os.environ.get("PINECONE_API_KEY")
+    if not api_key:
+        parser.error("Set PINECONE_API_KEY in the environment")
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=args.model,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True, 'batch_size': 32}
+    )
+    count = sync_from_pinecone(Pinecone(api_key=api_key).Index(args.index), embeddings,
+                               args.out, args.batch_size)
+    print(f"Mirrored {count} vectors from '{args.index}' to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Bounded conversation memory.
+Keeps the last few turns of a chat verbatim and folds older turns into a
+running summary, so follow-up questions have context while the prompt
+stays the same size however long the session gets. The summary is updated
+in the background, between turns, never on the critical path of an answer.
+"""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .context import CHARS_PER_TOKEN, estimate_tokens
+from .emergency import category_counts
+from .normalize import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# (role, content)
+Message = Tuple[str, str]
+
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+# Evicted messages kept while summarization keeps failing
+MAX_PENDING_MESSAGES = 40
+
+# Smallest piece of a message worth putting in the prompt, in tokens
+MIN_MESSAGE_TOKENS = 16
+
+# Pronouns and demonstratives that point back at the previous question
+# (English, Urdu, Sindhi, Roman Urdu)
+ANAPHORS = frozenset((
+    "it", "its", "this", "that", "these", "those", "they", "them", "their", "there", "same", "such",
+    "یہ", "وہ", "اس", "اسے", "ان", "انہیں", "هی", "اهو", "اهی", "انهن",
+    "ye", "yeh", "woh", "iska", "iski", "uska", "uski", "inka", "unka",
+))
+
+# Openings of elliptical follow-ups ("what about for children?")
+FOLLOW_UP_OPENERS = ("what about", "how about", "what if", "and", "اور", "۽")
+
+# Hazards without an emergency category; naming one gives a question its own topic
+HAZARD_TERMS = frozenset((
+    "heatwave", "heat", "cyclone", "storm", "drought", "landslide", "tsunami", "avalanche",
+    "glacier", "monsoon", "rain", "snow", "cold", "hurricane", "tornado",
+    "گرمی", "طوفان", "خشک سالی", "لینڈ سلائیڈ", "بارش",
+))
+
+
+def clip_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text to an estimated token count at a word boundary."""
+    text = " ".join(text.split())
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    clipped = text[:max(0, max_tokens * CHARS_PER_TOKEN - 2)]
+    return (clipped.rsplit(" ", 1)[0] or clipped) + " …"
+
+
+def is_follow_up(query: str, max_words: int = 8) -> bool:
+    """
+    Whether a question only makes sense together with the one before it.
+
+    A follow-up is short, refers back with a pronoun, demonstrative or an
+    opener like "what about", and names no disaster or hazard of its own.
+    "How do I prepare for an earthquake?" is a new question even after a
+    flood question; "is it safe to drink?" is not.
+
+    Args:
+        query: User's question
+        max_words: Longest question treated as a follow-up
+
+    Returns:
+        bool: True for anaphoric follow-ups
+    """
+    text = normalize_query(query)
+    words = text.split()
+    if not words or len(words) > max_words:
+        return False
+    if category_counts(text) or HAZARD_TERMS.intersection(words):
+        return False
+    return (bool(ANAPHORS.intersection(words))
+            or any(text == opener or text.startswith(opener + " ") for opener in FOLLOW_UP_OPENERS))
+
+
+def format_transcript(messages: Sequence[Message]) -> str:
+    """Render messages as `Role: text` lines."""
+    return "\n".join(f"{ROLE_LABELS.get(role, role.title())}: {' '.join(content.split())}"
+                     for role, content in messages)
+
+
+@dataclass(frozen=True)
+class ConversationContext:
+    """What a turn knows about the conversation before it."""
+    summary: str = ""
+    messages: Tuple[Message, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.messages)
+
+    def last_user_message(self) -> Optional[str]:
+        for role, content in reversed(self.messages):
+            if role == "user":
+                return content
+        return None
+
+    def retrieval_query(self, query: str, max_words: int = 8) -> str:
+        """
+        Text to retrieve with for a question asked in this conversation.
+
+        Follow-ups ("what about for children?", "is it safe?") carry no topic
+        of their own, so they are searched together with the previous
+        question. Every other question is returned unchanged, so it keeps its
+        cache and coalescing keys and its precomputed embedding.
+
+        Args:
+            query: User's question
+            max_words: Longest question treated as a follow-up
+
+        Returns:
+            str: The question, prefixed with the previous one for follow-ups
+        """
+        previous = self.last_user_message()
+        if previous is None or not is_follow_up(query, max_words):
+            return query
+        return f"{previous} {query}"
+
+    def render(self, token_budget: int) -> str:
+        """
+        Render the summary and the most recent messages within a token budget.
+
+        Args:
+            token_budget: Maximum estimated tokens of the rendered history
+
+        Returns:
+            str: History for the prompt; empty for a new conversation
+        """
+        lines: List[str] = []
+        used = 0
+        if self.summary:
+            lines.append(f"Summary of the earlier conversation: {clip_tokens(self.summary, token_budget // 2)}")
+            used = estimate_tokens(lines[0])
+
+        # Newest messages first, so the oldest are the ones cut; no single
+        # long answer may crowd out the question before it
+        per_message = max(MIN_MESSAGE_TOKENS, token_budget // 4)
+        recent: List[str] = []
+        for message in reversed(self.messages):
+            remaining = token_budget - used
+            if remaining < MIN_MESSAGE_TOKENS:
+                break
+            line = clip_tokens(format_transcript([message]), min(remaining, per_message))
+            recent.append(line)
+            used += estimate_tokens(line)
+        return "\n".join(lines + recent[::-1])
+
+
+class ConversationMemory:
+    """
+    Memory of one chat session.
+
+    `update` catches up with the session's message list. Messages beyond the
+    last `recent_turns` turns are evicted and folded into the summary by a
+    background call to the summarizer; until that finishes they are still
+    part of the context verbatim, so nothing is lost in between. The summary
+    is clipped to `summary_token_cap` tokens.
+    """
+
+    def __init__(self, recent_turns: int = 3, summary_token_cap: int = 300):
+        """
+        Args:
+            recent_turns: User/assistant exchanges kept verbatim
+            summary_token_cap: Maximum estimated tokens of the summary
+        """
+        self.recent_messages = recent_turns * 2
+        self.summary_token_cap = summary_token_cap
+        self.summary = ""
+        self._recent: List[Message] = []
+        # Evicted from the recent turns but not summarized yet
+        self._pending: List[Message] = []
+        self._seen = 0
+        self._first: Optional[Message] = None
+        self._summarizing: Optional[Future] = None
+        # Bumped when the conversation is replaced, so late summaries are dropped
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def update(self, messages: Sequence[Dict[str, str]],
+               summarize: Callable[[str, Sequence[Message]], str]) -> None:
+        """
+        Catch up with a session's messages and summarize evicted turns in the background.
+
+        Args:
+            messages: The session's messages (dicts with `role` and `content`)
+            summarize: Folds messages into a previous summary and returns the new one
+        """
+        with self._lock:
+            first = _as_message(messages[0]) if messages else None
+            if len(messages) < self._seen or (self._seen and first != self._first):
+                # A new or different conversation was loaded
+                self._reset()
+            self._first = first
+            self._recent.extend(_as_message(message) for message in messages[self._seen:])
+            self._seen = len(messages)
+
+            overflow = len(self._recent) - self.recent_messages
+            if overflow > 0:
+                self._pending.extend(self._recent[:overflow])
+                del self._recent[:overflow]
+            if self._summarizing is None and len(self._pending) > MAX_PENDING_MESSAGES:
+                del self._pending[:-MAX_PENDING_MESSAGES]
+            self._schedule(summarize)
+
+    def context(self) -> ConversationContext:
+        """Snapshot of the summary and the unsummarized messages."""
+        with self._lock:
+            return ConversationContext(self.summary, tuple(self._pending + self._recent))
+
+    def _reset(self) -> None:
+        self.summary = ""
+        self._recent = []
+        self._pending = []
+        self._seen = 0
+        self._summarizing = None
+        self._generation += 1
+
+    def _schedule(self, summarize: Callable[[str, Sequence[Message]], str]) -> None:
+        """Start folding the pending messages into the summary, one batch at a time."""
+        if not self._pending or self._summarizing is not None:
+            return
+        batch = list(self._pending)
+        self._summarizing = _get_executor().submit(
+            self._fold, summarize, self.summary, batch, self._generation
+        )
+
+    def _fold(self, summarize: Callable[[str, Sequence[Message]], str],
+              summary: str, batch: List[Message], generation: int) -> None:
+        try:
+            folded = clip_tokens(summarize(summary, batch), self.summary_token_cap)
+        except Exception as e:
+            # The batch stays pending and is retried on the next update
+            logger.warning("Summarizing the conversation failed: %s", e)
+            folded = None
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._summarizing = None
+            if folded is not None:
+                self.summary = folded
+                del self._pending[:len(batch)]
+                self._schedule(summarize)
+
+
+def _as_message(message: Dict[str, str]) -> Message:
+    return message.get("role", ""), message.get("content", "")
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the process-wide summarization pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memory")
+    return _executor
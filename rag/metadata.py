@@ -0,0 +1,165 @@
+"""
+Chunk metadata for filtered retrieval.
+At ingestion every chunk is tagged with the disaster types it covers, the
+region it is about and its language. At query time the disaster type
+detected in the question narrows the vector search to chunks about that
+disaster plus general guidance, which shrinks the candidate set and keeps
+unrelated disasters out of the context.
+"""
+import re
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from .emergency import PHRASE_WEIGHT, category_counts
+from .normalize import fold_text, normalize_query
+from .playbooks import DISASTER_TYPES
+
+# Tag of chunks that are about no particular disaster; always searched
+GENERAL = "general"
+
+# Region of chunks that name no province or city
+NATIONAL = "national"
+
+# Version of the chunk tags. Ingestion records it next to the index version
+# once every chunk carries them; the engine only filters tagged indexes.
+METADATA_SCHEMA = 1
+
+# Score needed before a chunk is tagged with a disaster type; naming the
+# disaster ("earthquake") is enough, a hint word ("water") is not
+MIN_DISASTER_MENTIONS = PHRASE_WEIGHT
+
+REGION_KEYWORDS: Dict[str, Sequence[str]] = {
+    "Sindh": ("sindh", "karachi", "hyderabad", "sukkur", "larkana", "thatta", "badin",
+              "سندھ", "سنڌ", "کراچی", "ڪراچي", "حیدرآباد", "سکھر"),
+    "Punjab": ("punjab", "lahore", "multan", "faisalabad", "rawalpindi", "gujranwala",
+               "پنجاب", "لاہور", "ملتان"),
+    "Khyber Pakhtunkhwa": ("khyber pakhtunkhwa", "kpk", "peshawar", "swat", "chitral", "nowshera",
+                           "خیبر پختونخوا", "پشاور", "سوات"),
+    "Balochistan": ("balochistan", "quetta", "gwadar", "بلوچستان", "کوئٹہ"),
+    "Gilgit-Baltistan": ("gilgit", "baltistan", "skardu", "hunza", "گلگت"),
+    "Azad Kashmir": ("azad kashmir", "ajk", "muzaffarabad", "آزاد کشمیر", "مظفرآباد"),
+    "Islamabad": ("islamabad", "اسلام آباد"),
+}
+
+# Letters used in Sindhi but not in Urdu
+_SINDHI_LETTERS = frozenset("ٺٽٿڀڃڄڇڊڌڍڏڙڦڪڳڱڻ")
+_ARABIC_SCRIPT = re.compile(r"[؀-ۿ]")
+_LATIN = re.compile(r"[A-Za-z]")
+
+_region_of: Dict[str, str] = {
+    normalize_query(keyword): region
+    for region, keywords in REGION_KEYWORDS.items() for keyword in keywords
+}
+_region_pattern = re.compile(
+    r"(?<!\w)(?:" + "|".join(re.escape(keyword).replace(r"\ ", r"\s+")
+                             for keyword in sorted(_region_of, key=len, reverse=True)) + r")(?!\w)"
+)
+
+
+def detect_language(text: str) -> str:
+    """
+    Guess whether a text is English, Urdu or Sindhi from its script.
+
+    Args:
+        text: Any text
+
+    Returns:
+        str: "English", "Urdu" or "Sindhi"
+    """
+    arabic = len(_ARABIC_SCRIPT.findall(text))
+    if arabic <= len(_LATIN.findall(text)):
+        return "English"
+    sindhi = sum(char in _SINDHI_LETTERS for char in text)
+    return "Sindhi" if sindhi >= max(1, arabic // 100) else "Urdu"
+
+
+def detect_region(text: str) -> str:
+    """
+    Find the province or territory a text is mostly about.
+
+    Args:
+        text: Any text
+
+    Returns:
+        str: Most mentioned region, or "national" if none is named
+    """
+    counts: Dict[str, int] = {}
+    for found in _region_pattern.finditer(fold_text(text)):
+        region = _region_of[" ".join(found.group(0).split())]
+        counts[region] = counts.get(region, 0) + 1
+    return max(counts, key=counts.get) if counts else NATIONAL
+
+
+def detect_disaster_types(text: str) -> List[str]:
+    """
+    Find the disasters a chunk covers.
+
+    A type is kept when it scores at least `MIN_DISASTER_MENTIONS`, which a
+    phrase or disaster name reaches alone and a hint word does not, and at
+    least half as much as the top type. Passing mentions ("drink water") do
+    not tag a chunk.
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        List[str]: Disaster types, or ["general"] if none is mentioned
+    """
+    counts = {category: count for category, count in category_counts(text).items()
+              if category in DISASTER_TYPES and count >= MIN_DISASTER_MENTIONS}
+    if not counts:
+        return [GENERAL]
+    top = max(counts.values())
+    return [category for category in DISASTER_TYPES if counts.get(category, 0) * 2 >= top]
+
+
+def chunk_metadata(text: str) -> Dict[str, object]:
+    """
+    Metadata fields used for filtered retrieval.
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        Dict[str, object]: `disaster_types`, `region` and `language`
+    """
+    return {
+        'disaster_types': detect_disaster_types(text),
+        'region': detect_region(text),
+        'language': detect_language(text),
+    }
+
+
+def tag_chunks(chunks: Sequence[Document]) -> None:
+    """Add the retrieval metadata to chunks in place."""
+    for chunk in chunks:
+        chunk.metadata.update(chunk_metadata(chunk.page_content))
+
+
+def is_tagged(metadata: Dict[str, object]) -> bool:
+    """Whether a chunk's metadata carries the disaster tags."""
+    return isinstance(metadata.get('disaster_types'), (list, tuple))
+
+
+def disaster_filter(disaster_type: Optional[str]) -> Optional[Dict[str, object]]:
+    """
+    Pinecone metadata filter for a question about a disaster type.
+
+    Args:
+        disaster_type: Type detected in the question, or None
+
+    Returns:
+        Optional[Dict[str, object]]: Filter on `disaster_types`, or None to search everything
+    """
+    if disaster_type is None:
+        return None
+    return {'disaster_types': {'$in': [disaster_type, GENERAL]}}
+
+
+def matches_disaster(metadata: Dict[str, object], disaster_type: str) -> bool:
+    """Local equivalent of `disaster_filter` for one chunk's metadata."""
+    types = metadata.get('disaster_types')
+    if not isinstance(types, (list, tuple)):
+        return False
+    return disaster_type in types or GENERAL in types
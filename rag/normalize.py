@@ -0,0 +1,70 @@
+"""
+Query text normalization.
+Produces a canonical form of a user's question so trivially different
+spellings (case, spacing, punctuation, Arabic-script variants) share cache
+entries.
+"""
+import re
+import unicodedata
+
+# Arabic harakat, Quranic marks and superscript alef
+_ARABIC_DIACRITICS = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED]')
+_TATWEEL = '\u0640'
+_WHITESPACE = re.compile(r'\s+')
+
+# Letters typed interchangeably on Arabic and Urdu/Sindhi keyboards
+_ARABIC_SCRIPT_VARIANTS = str.maketrans({
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ي': 'ی',
+    'ى': 'ی',
+    'ك': 'ک',
+    'ۀ': 'ہ',
+    'ة': 'ہ',
+    # Arabic-Indic and Extended Arabic-Indic digits
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+})
+
+
+def fold_text(text: str) -> str:
+    """
+    Case-fold text and normalize Arabic-script variants.
+
+    The cheap part of `normalize_query`: every step runs in C, so it is
+    suitable for per-message matching.
+
+    Args:
+        text: Raw text
+
+    Returns:
+        str: Folded text with punctuation and spacing untouched
+    """
+    if text.isascii():
+        return text.lower()
+    text = _ARABIC_DIACRITICS.sub('', text.casefold()).replace(_TATWEEL, '')
+    return text.translate(_ARABIC_SCRIPT_VARIANTS)
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a query for use as a cache key.
+
+    Applies Unicode NFKC, case folding, Arabic-script normalization for Urdu
+    and Sindhi (diacritics, tatweel, letter and digit variants), strips
+    punctuation and symbols, and collapses whitespace.
+
+    Args:
+        text: Raw query text
+
+    Returns:
+        str: Normalized query
+    """
+    text = fold_text(unicodedata.normalize('NFKC', text))
+    text = ''.join(
+        ' ' if unicodedata.category(char)[0] in 'PS' else char
+        for char in text
+    )
+    return _WHITESPACE.sub(' ', text).strip()
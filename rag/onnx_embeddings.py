@@ -0,0 +1,281 @@
+"""
+ONNX Runtime backend for the MiniLM embedder.
+Runs an exported (optionally int8-quantized) all-MiniLM-L6-v2 with ONNX
+Runtime and the `tokenizers` library, so the app does not need to load
+PyTorch to encode queries.
+
+Usage:
+    python -m rag.onnx_embeddings export --out .cache/onnx/all-MiniLM-L6-v2 --quantize
+    python -m rag.onnx_embeddings check --model-dir .cache/onnx/all-MiniLM-L6-v2
+    python -m rag.onnx_embeddings bench --model-dir .cache/onnx/all-MiniLM-L6-v2
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_ONNX_DIR = os.path.join('.cache', 'onnx', 'all-MiniLM-L6-v2')
+MODEL_FILE = 'model.onnx'
+QUANTIZED_MODEL_FILE = 'model.int8.onnx'
+TOKENIZER_FILE = 'tokenizer.json'
+
+# sentence-transformers truncates all-MiniLM-L6-v2 inputs at 256 tokens
+MAX_SEQ_LENGTH = 256
+
+PARITY_THRESHOLD = 0.99
+
+SAMPLE_TEXTS = [
+    "What should I do in a flood?",
+    "How do I prepare an emergency kit for an earthquake?",
+    "I am trapped in a building that collapsed, help",
+    "What is the role of NDMA and PDMA in disaster relief?",
+    "Call 1122 for rescue services in Punjab",
+    "سیلاب کی صورت میں کیا کرنا چاہیے؟",
+    "زلزلي دوران ڇا ڪجي؟",
+    "Fire safety measures for schools and hospitals",
+    "How to purify drinking water after a disaster",
+    "Risk assessment for heatwaves in Sindh",
+]
+
+
+class ONNXEmbeddings(Embeddings):
+    """
+    Sentence embeddings computed with ONNX Runtime.
+
+    Produces the same mean-pooled, L2-normalized vectors as
+    `HuggingFaceEmbeddings(encode_kwargs={'normalize_embeddings': True})`.
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, quantized: bool = True,
+                 batch_size: int = 32, num_threads: int = 0):
+        """
+        Load an exported model.
+
+        Args:
+            model_dir: Directory written by `export_onnx`
+            quantized: Use the int8 model if it was exported
+            batch_size: Texts encoded per forward pass
+            num_threads: ONNX Runtime intra-op threads (0 lets it decide)
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_file = os.path.join(model_dir, QUANTIZED_MODEL_FILE)
+        if not quantized or not os.path.exists(model_file):
+            model_file = os.path.join(model_dir, MODEL_FILE)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_file, options, providers=['CPUExecutionProvider'])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+        self.model_file = model_file
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts."""
+        vectors = [self._encode(texts[start:start + self.batch_size])
+                   for start in range(0, len(texts), self.batch_size)]
+        return np.vstack(vectors).tolist() if vectors else []
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query."""
+        return self._encode([text])[0].tolist()
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Run one batch through the model with mean pooling and normalization."""
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self._input_names:
+            inputs['token_type_ids'] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def export_onnx(model_name: str = 'sentence-transformers/all-MiniLM-L6-v2',
+                out_dir: str = DEFAULT_ONNX_DIR, quantize: bool = True) -> str:
+    """
+    Export the transformer to ONNX and optionally quantize it to int8.
+
+    Args:
+        model_name: Hugging Face model id
+        out_dir: Output directory
+        quantize: Also write a dynamically int8-quantized model
+
+    Returns:
+        str: Output directory
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, TOKENIZER_FILE))
+
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["export sample"], return_tensors='pt')
+    input_names = ['input_ids', 'attention_mask', 'token_type_ids']
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample['input_ids'], sample['attention_mask'], sample['token_type_ids']),
+            os.path.join(out_dir, MODEL_FILE),
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(
+            os.path.join(out_dir, MODEL_FILE),
+            os.path.join(out_dir, QUANTIZED_MODEL_FILE),
+            weight_type=QuantType.QInt8
+        )
+    return out_dir
+
+
+def _torch_embeddings(model_name: str = 'all-MiniLM-L6-v2') -> Embeddings:
+    """The PyTorch embedder with the engine's settings."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True, 'batch_size': 32}
+    )
+
+
+def parity_check(model_dir: str = DEFAULT_ONNX_DIR, quantized: bool = True,
+                 texts: Sequence[str] = SAMPLE_TEXTS) -> float:
+    """
+    Compare ONNX vectors against the PyTorch embedder.
+
+    Args:
+        model_dir: Directory written by `export_onnx`
+        quantized: Check the int8 model instead of the float model
+        texts: Texts to compare on
+
+    Returns:
+        float: Lowest cosine similarity between the two backends
+    """
+    reference = np.asarray(_torch_embeddings().embed_documents(list(texts)), dtype=np.float32)
+    candidate = np.asarray(ONNXEmbeddings(model_dir, quantized).embed_documents(list(texts)),
+                           dtype=np.float32)
+    return float((reference * candidate).sum(axis=1).min())
+
+
+def benchmark(backend: str, model_dir: str = DEFAULT_ONNX_DIR, quantized: bool = True,
+              rounds: int = 50) -> dict:
+    """
+    Measure one backend in the current process.
+
+    Args:
+        backend: 'torch' or 'onnx'
+        model_dir: Directory written by `export_onnx`
+        quantized: Use the int8 ONNX model
+        rounds: Single-query encodes to time
+
+    Returns:
+        dict: Load time, query latency percentiles, batch throughput and peak RSS
+    """
+    start = time.perf_counter()
+    embeddings = _torch_embeddings() if backend == 'torch' else ONNXEmbeddings(model_dir, quantized)
+    load_seconds = time.perf_counter() - start
+
+    embeddings.embed_query("warm up")
+    latencies = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        embeddings.embed_query(SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    batch = SAMPLE_TEXTS * 26
+    start = time.perf_counter()
+    embeddings.embed_documents(batch)
+    throughput = len(batch) / (time.perf_counter() - start)
+
+    return {
+        'backend': backend if backend == 'torch' else ('onnx-int8' if quantized else 'onnx'),
+        'load_seconds': round(load_seconds, 3),
+        'query_p50_ms': round(statistics.median(latencies), 2),
+        'query_p95_ms': round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+        'throughput_per_s': round(throughput, 1),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def main():
+    """Command-line entry point for export, parity check and benchmark."""
+    parser = argparse.ArgumentParser(description="ONNX backend for all-MiniLM-L6-v2.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="Export (and quantize) the model")
+    export_parser.add_argument('--out', default=DEFAULT_ONNX_DIR)
+    export_parser.add_argument('--quantize', action='store_true')
+
+    for name in ('check', 'bench', '_bench_one'):
+        sub = subparsers.add_parser(name)
+        sub.add_argument('--model-dir', default=DEFAULT_ONNX_DIR)
+        sub.add_argument('--float', action='store_true', help="Use the float model, not int8")
+        sub.add_argument('--backend', default='onnx')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        print(f"Exported to {export_onnx(out_dir=args.out, quantize=args.quantize)}")
+        return 0
+
+    if args.command == 'check':
+        score = parity_check(args.model_dir, quantized=not args.float)
+        status = "OK" if score >= PARITY_THRESHOLD else "FAILED"
+        print(f"Parity {status}: minimum cosine similarity {score:.4f} (threshold {PARITY_THRESHOLD})")
+        return 0 if score >= PARITY_THRESHOLD else 1
+
+    if args.command == '_bench_one':
+        print(json.dumps(benchmark(args.backend, args.model_dir, quantized=not args.float)))
+        return 0
+
+    # Each backend runs in a fresh process so peak RSS is not shared. The
+    # script is run by path so the rag package (and PyTorch) is not imported.
+    results = []
+    variants = [('torch', []), ('onnx', ['--float']), ('onnx', [])]
+    for backend, extra in variants:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '_bench_one',
+             '--backend', backend, '--model-dir', args.model_dir, *extra],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    columns = ['backend', 'load_seconds', 'query_p50_ms', 'query_p95_ms', 'throughput_per_s', 'peak_rss_mb']
+    print("  ".join(f"{column:>16}" for column in columns))
+    for result in results:
+        print("  ".join(f"{result[column]:>16}" for column in columns))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
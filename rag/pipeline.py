@@ -0,0 +1,340 @@
+"""
+Asynchronous chat turn pipeline.
+Runs the independent stages of a turn concurrently on a background event
+loop: the user-message write overlaps embedding, intent classification and
+retrieval, generation starts as soon as the context is ready, and the
+assistant-message write happens after the answer has been rendered.
+Embedding and generation wait in the engine's priority queues, so a turn
+exposes its queue position while it waits.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional
+
+from .admission import DEFAULT_PRIORITY, Ticket
+from .intent import IntentResult
+from .memory import ConversationContext
+
+if TYPE_CHECKING:
+    from .engine import RAGEngine
+
+logger = logging.getLogger(__name__)
+
+# Response types answered without the RAG engine; every other type gets one
+DIRECT_RESPONSE_TYPES = ("greeting", "out_of_domain")
+
+# Marks the end of a generated answer on the chunk queue
+_DONE = object()
+
+# How often a waiting reader is told the queue status
+QUEUE_POLL_SECONDS = 0.5
+
+# Threads for Firestore writes and the embedding of ordinary turns
+STAGE_WORKERS = 32
+
+# Threads reserved for classification and the stages of emergency turns, so
+# they never queue behind ordinary turns before reaching the admission queues
+PRIORITY_WORKERS = 4
+
+
+class ChatTurn:
+    """
+    Handle on one chat turn running in the pipeline.
+
+    The Streamlit script thread reads the response type and the answer
+    stream from here while the remaining stages finish in the background.
+    Stage timings are in milliseconds since the turn started.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.classified: Future = Future()
+        self.user_persisted: Future = Future()
+        self.chunks: "queue.Queue[object]" = queue.Queue()
+        self.cancelled = threading.Event()
+        # Whether the answer was shared with an identical in-flight question
+        self.coalesced = False
+        # Admission ticket of the queue the turn is waiting in, if any
+        self.ticket: Optional[Ticket] = None
+
+    def mark(self, stage: str) -> None:
+        """Record that a stage finished now."""
+        self.timings[stage] = round((time.perf_counter() - self.started) * 1000, 1)
+
+    def response_type(self, on_wait: Optional[Callable[[Optional[Dict[str, float]]], None]] = None) -> str:
+        """
+        Block until the query has been classified.
+
+        Args:
+            on_wait: Called with `queue_status()` every `QUEUE_POLL_SECONDS`
+                while waiting
+
+        Returns:
+            str: Response type
+        """
+        while on_wait is not None:
+            try:
+                return self.classified.result(timeout=QUEUE_POLL_SECONDS)
+            except FutureTimeoutError:
+                on_wait(self.queue_status())
+        return self.classified.result()
+
+    def queue_status(self) -> Optional[Dict[str, float]]:
+        """
+        Where the turn is in an admission queue.
+
+        Returns:
+            Optional[Dict[str, float]]: 1-based position and estimated wait in
+            seconds, or None when the turn is not waiting
+        """
+        ticket = self.ticket
+        if ticket is None or not ticket.waiting:
+            return None
+        return {'position': ticket.position(), 'eta_seconds': ticket.eta_seconds()}
+
+    def stream(self, on_wait: Optional[Callable[[Optional[Dict[str, float]]], None]] = None
+               ) -> Iterator[str]:
+        """
+        Yield the answer as it is generated.
+
+        Ends at once, without chunks, for `DIRECT_RESPONSE_TYPES` and raises
+        if classification failed. Closing the generator early stops
+        generation and the answer is not cached.
+
+        Args:
+            on_wait: Called with `queue_status()` every `QUEUE_POLL_SECONDS`
+                until the first chunk arrives
+
+        Yields:
+            str: Text chunks in generation order
+        """
+        try:
+            first = True
+            while True:
+                if first and on_wait is not None:
+                    try:
+                        chunk = self.chunks.get(timeout=QUEUE_POLL_SECONDS)
+                    except queue.Empty:
+                        on_wait(self.queue_status())
+                        continue
+                else:
+                    chunk = self.chunks.get()
+                if chunk is _DONE:
+                    break
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                if first:
+                    self.mark('first_token')
+                    first = False
+                yield chunk
+        finally:
+            self.cancelled.set()
+
+    def summary(self) -> Dict[str, float]:
+        """Timings of the stages finished so far plus the total."""
+        return dict(self.timings, total=round((time.perf_counter() - self.started) * 1000, 1),
+                    coalesced=self.coalesced)
+
+
+class TurnPipeline:
+    """
+    Event loop on a daemon thread that runs chat turns.
+
+    Blocking stages (Firestore, embeddings) run on a thread pool; the loop
+    only sequences them, so one pipeline serves every session in the
+    process. Classification and emergency turns have a small pool of their
+    own. Retrieval and generation run on the singleflight producer thread,
+    which pushes the answer onto the turn, so a streaming answer holds no
+    pool thread.
+    """
+
+    def __init__(self, workers: int = STAGE_WORKERS, priority_workers: int = PRIORITY_WORKERS):
+        """
+        Start the event loop thread.
+
+        Args:
+            workers: Threads for ordinary stages
+            priority_workers: Threads for classification and emergency turns
+        """
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="turn-stage")
+        self._priority_executor = ThreadPoolExecutor(max_workers=priority_workers,
+                                                     thread_name_prefix="turn-priority")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="turn-pipeline", daemon=True)
+        self._thread.start()
+
+    def start_turn(self, engine: "RAGEngine", query: str, output_language: str,
+                   classify: Callable[[str, Optional[IntentResult]], str],
+                   persist_user: Optional[Callable[[], object]] = None,
+                   priority: str = DEFAULT_PRIORITY,
+                   history: Optional[ConversationContext] = None) -> ChatTurn:
+        """
+        Start a chat turn.
+
+        Args:
+            engine: RAG engine that answers the query
+            query: User's message
+            output_language: Output language selected by the user
+            classify: Maps the query and its embedding-based intent (None if
+                unavailable) to a response type
+            persist_user: Writes the user message; runs alongside the other stages
+            priority: Provisional response type used to queue the embedding,
+                before the query is classified
+            history: Conversation before the query, for follow-up questions
+
+        Returns:
+            ChatTurn: Handle to read the response type and answer from
+        """
+        turn = ChatTurn(query)
+        asyncio.run_coroutine_threadsafe(
+            self._run_turn(contextvars.copy_context(), turn, engine, output_language, classify,
+                           persist_user, priority, history), self._loop
+        )
+        return turn
+
+    def persist_response(self, turn: ChatTurn, persist: Callable[[], object]) -> Future:
+        """
+        Write the assistant message without blocking the caller.
+
+        The write waits for the user message to be stored first, so both land
+        in the same chat session and in order.
+
+        Args:
+            turn: Turn the response belongs to
+            persist: Writes the assistant message
+
+        Returns:
+            Future: Resolves when the write is done
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._persist_response(contextvars.copy_context(), turn, persist), self._loop
+        )
+
+    async def _run_turn(self, context: contextvars.Context, turn: ChatTurn, engine: "RAGEngine",
+                        output_language: str, classify: Callable[[str, Optional[IntentResult]], str],
+                        persist_user: Optional[Callable[[], object]], priority: str,
+                        history: Optional[ConversationContext]) -> None:
+        """Run the user write alongside embedding, classification, retrieval and generation."""
+        _adopt(context)
+        persisting = asyncio.ensure_future(self._stage(turn, 'persist_user', persist_user or (lambda: None)))
+        persisting.add_done_callback(lambda task: _resolve(turn.user_persisted, task))
+
+        def on_queued(ticket: Ticket) -> None:
+            turn.ticket = ticket
+
+        # The query vector feeds both the intent router and retrieval
+        urgent = self._priority_executor if priority == "emergency" else None
+        try:
+            vector = await self._stage(turn, 'embed', engine.embed_query, turn.query, priority, on_queued,
+                                       executor=urgent)
+        except Exception as e:
+            logger.warning("Embedding the query failed: %s", e)
+            vector = None
+
+        try:
+            route = engine.route_intent(vector) if vector is not None else None
+            response_type = await self._stage(turn, 'classify', classify, turn.query, route,
+                                              executor=self._priority_executor)
+        except Exception as e:
+            turn.classified.set_exception(e)
+            turn.chunks.put(e)
+            turn.chunks.put(_DONE)
+            return
+        turn.classified.set_result(response_type)
+        if response_type in DIRECT_RESPONSE_TYPES:
+            # A reader that streams anyway gets an empty answer, not a hang
+            turn.chunks.put(_DONE)
+            return
+
+        def deliver(chunk: str) -> bool:
+            if turn.cancelled.is_set():
+                return False
+            turn.chunks.put(chunk)
+            return True
+
+        def finish(error: Optional[BaseException]) -> None:
+            if error is not None:
+                turn.chunks.put(error)
+            else:
+                turn.mark('generate')
+            turn.chunks.put(_DONE)
+
+        # Identical questions in flight from other sessions share one answer
+        try:
+            joined = engine.push_shared(
+                turn.query, output_language, deliver, finish, vector, priority=response_type,
+                on_prepared=lambda _: turn.mark('retrieve'), on_queued=on_queued, history=history
+            )
+        except Exception as e:
+            # The reader must not wait for chunks that will never come
+            finish(e)
+            return
+        turn.coalesced = joined
+        if joined:
+            logger.info("Joined an in-flight answer; coalescing stats: %s", engine.inflight.stats())
+
+    async def _stage(self, turn: ChatTurn, name: str, fn: Callable, *args,
+                     executor: Optional[ThreadPoolExecutor] = None) -> object:
+        """Run a blocking stage on a pool thread, in the current context, and time it."""
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor or self._executor, call)
+        finally:
+            turn.mark(name)
+
+    async def _persist_response(self, context: contextvars.Context, turn: ChatTurn,
+                                persist: Callable[[], object]) -> None:
+        """Write the assistant message after the user message."""
+        _adopt(context)
+        try:
+            await asyncio.wrap_future(turn.user_persisted)
+        except Exception:
+            pass
+        try:
+            await self._stage(turn, 'persist_assistant', persist)
+        except Exception as e:
+            logger.warning("Saving the assistant message failed: %s", e)
+        logger.info("Turn timings (ms): %s", turn.summary())
+
+
+def _adopt(context: contextvars.Context) -> None:
+    """Copy the caller's context variables (trace IDs and the like) into the running task."""
+    for var, value in context.items():
+        var.set(value)
+
+
+def _resolve(future: Future, task: "asyncio.Future") -> None:
+    """Copy the outcome of a finished task onto a thread-safe future."""
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+_pipeline: Optional[TurnPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_turn_pipeline() -> TurnPipeline:
+    """
+    Get the process-wide turn pipeline, starting it on first use.
+
+    Returns:
+        TurnPipeline: Shared pipeline instance
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = TurnPipeline()
+    return _pipeline
@@ -0,0 +1,190 @@
+"""
+Precomputed emergency playbooks.
+Short per-disaster, per-language action lists generated offline from the
+corpus and stored in a small JSON file, so an emergency turn can show
+actionable steps before the Gemini call for specific guidance returns.
+
+The file lives in data/, which is tracked, so a deploy ships the playbooks
+committed with the code. Regenerate and commit them after re-ingesting.
+
+Usage:
+    python -m rag.playbooks build --out data/playbooks.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from .emergency import match_emergency
+from .prompts import SUPPORTED_LANGUAGES, get_language_prompt
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLAYBOOK_PATH = os.path.join('data', 'playbooks.json')
+
+PLAYBOOK_FORMAT_VERSION = 1
+
+DISASTER_TYPES = ("flood", "earthquake", "fire", "medical")
+
+# Retrieval query used to gather corpus context for each playbook
+PLAYBOOK_QUERIES = {
+    "flood": "What should people do immediately during a flood to stay safe?",
+    "earthquake": "What should people do immediately during and right after an earthquake?",
+    "fire": "What should people do immediately when there is a fire in a building?",
+    "medical": "What first aid should be given immediately to an injured or bleeding person?",
+}
+
+PLAYBOOK_PROMPT_TEMPLATE = """You are a disaster management assistant writing an emergency card for people in danger. {language_instruction}
+
+Using only the context below, write at most 6 numbered, one-line actions for someone caught in a {disaster_type} emergency right now. Put life-saving actions first. Do not include phone numbers, headings or any text besides the numbered list.
+
+Context: {context}
+
+Actions:"""
+
+
+def detect_disaster_type(query: str) -> Optional[str]:
+    """
+    Pick the playbook for an emergency message.
+
+    Args:
+        query: User's emergency message
+
+    Returns:
+        Optional[str]: Disaster type, or None if no specific disaster is mentioned
+    """
+    category = match_emergency(query).category
+    return category if category in DISASTER_TYPES else None
+
+
+class Playbooks:
+    """Playbooks loaded from a file, looked up by disaster type and language."""
+
+    def __init__(self, playbooks: Dict[Tuple[str, str], str], metadata: Optional[Dict] = None):
+        self._playbooks = playbooks
+        self.metadata = metadata or {}
+
+    def __len__(self) -> int:
+        return len(self._playbooks)
+
+    def get(self, disaster_type: Optional[str], output_language: str) -> Optional[str]:
+        """
+        Get the playbook for a disaster type, falling back to English.
+
+        Args:
+            disaster_type: Disaster type from `detect_disaster_type`
+            output_language: Output language selected by the user
+
+        Returns:
+            Optional[str]: Playbook text, or None if there is none
+        """
+        if disaster_type is None:
+            return None
+        return (self._playbooks.get((disaster_type, output_language))
+                or self._playbooks.get((disaster_type, "English")))
+
+
+@lru_cache(maxsize=None)
+def load_playbooks(path: str = DEFAULT_PLAYBOOK_PATH) -> Playbooks:
+    """
+    Load the playbook file once per process.
+
+    Args:
+        path: File written by `build_playbooks`
+
+    Returns:
+        Playbooks: Loaded playbooks, empty if the file does not exist
+    """
+    if not os.path.exists(path):
+        logger.warning("No playbook file at %s; emergency turns show no action list. "
+                       "Run `python -m rag.playbooks build` and commit the file", path)
+        return Playbooks({})
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != PLAYBOOK_FORMAT_VERSION:
+        logger.warning("Playbook file %s has format version %s, expected %s; ignoring it",
+                       path, data.get('version'), PLAYBOOK_FORMAT_VERSION)
+        return Playbooks({})
+    playbooks = {
+        (disaster_type, language): text
+        for disaster_type, by_language in data['playbooks'].items()
+        for language, text in by_language.items()
+    }
+    return Playbooks(playbooks, {key: value for key, value in data.items() if key != 'playbooks'})
+
+
+def build_playbooks(engine, path: str = DEFAULT_PLAYBOOK_PATH) -> Dict[str, Dict[str, str]]:
+    """
+    Generate every playbook from the corpus and write the playbook file.
+
+    Args:
+        engine: RAGEngine used for retrieval and generation
+        path: Output file
+
+    Returns:
+        Dict[str, Dict[str, str]]: Playbook text by disaster type and language
+    """
+    playbooks: Dict[str, Dict[str, str]] = {}
+    for disaster_type in DISASTER_TYPES:
+        query = PLAYBOOK_QUERIES[disaster_type]
+        vector = engine.embed_query(query)
+        docs = engine.pack(engine.retrieve(query, vector, disaster_type), vector)
+        context = "\n\n".join(doc.page_content for doc in docs)
+        playbooks[disaster_type] = {}
+        for language in SUPPORTED_LANGUAGES:
+            prompt = PLAYBOOK_PROMPT_TEMPLATE.format(
+                language_instruction=get_language_prompt(language),
+                disaster_type=disaster_type,
+                context=context
+            )
+            playbooks[disaster_type][language] = engine.llm.invoke(prompt).content.strip()
+            print(f"Generated {disaster_type} playbook in {language}")
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    data = {
+        'version': PLAYBOOK_FORMAT_VERSION,
+        'index_version': engine.response_cache.index_version,
+        'generated_at': int(time.time()),
+        'playbooks': playbooks
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    load_playbooks.cache_clear()
+    return playbooks
+
+
+def main():
+    """Command-line entry point for generating playbooks."""
+    parser = argparse.ArgumentParser(description="Generate emergency playbooks from the corpus.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help="Generate the playbook file")
+    build_parser.add_argument('--out', default=DEFAULT_PLAYBOOK_PATH)
+    build_parser.add_argument('--index', default='pdfinfo', help="Pinecone index name")
+    build_parser.add_argument('--retrieval-mode', default='auto', help="pinecone, local or auto")
+    args = parser.parse_args()
+
+    google_api_key = os.environ.get("GOOGLE_API_KEY")
+    if not google_api_key:
+        parser.error("Set GOOGLE_API_KEY in the environment")
+
+    from .engine import RAGConfig, RAGEngine
+
+    engine = RAGEngine(RAGConfig(
+        index_name=args.index,
+        retrieval_mode=args.retrieval_mode,
+        pinecone_api_key=os.environ.get("PINECONE_API_KEY", ""),
+        google_api_key=google_api_key
+    ))
+    build_playbooks(engine, args.out)
+    print(f"Wrote playbooks to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Prompt templates for the RAG engine.
+Every output language gets its own template, compiled once at import time and
+selected per request, so a single engine can serve all sessions.
+"""
+from typing import Dict, Literal
+
+from langchain_core.prompts import PromptTemplate
+
+# Bump whenever the wording below changes so cached answers are not reused
+PROMPT_VERSION = "2"
+
+SUPPORTED_LANGUAGES = ("English", "Urdu", "Sindhi")
+
+LANGUAGE_INSTRUCTIONS = {
+    "English": "Respond in English using clear and professional language.",
+    "Urdu": """اردو میں جواب دیں۔ براہ کرم واضح اور سادہ اردو استعمال کریں۔ جواب تفصیلی اور سمجھنے کے قابل ہونا چاہیے۔""",
+    "Sindhi": """سنڌي ۾ جواب ڏيو. مهرباني ڪري صاف ۽ سادي سنڌي استعمال ڪريو، اردو لفظن کان پاسو ڪريو. جواب تفصيلي ۽ سمجهه ۾ اچڻ جوڳو هجڻ گهرجي.""",
+}
+
+# Shown above context excerpts when no model can answer
+DEGRADED_NOTICES = {
+    "English": "⚠️ The assistant cannot write a full answer right now. These excerpts from the disaster management guidance match your question:",
+    "Urdu": "⚠️ اس وقت اسسٹنٹ مکمل جواب نہیں لکھ سکتا۔ آپ کے سوال سے متعلق آفات کے انتظام کی رہنمائی کے یہ اقتباسات ہیں:",
+    "Sindhi": "⚠️ هن وقت مددگار مڪمل جواب نٿو لکي سگهي. توهان جي سوال سان لاڳاپيل آفتن جي انتظام جي رهنمائي جا هي اقتباس آهن:",
+}
+
+RAG_PROMPT_TEMPLATE = """You are a knowledgeable disaster management assistant focused on providing timely, actionable help. {language_instruction}
+
+Use the following guidelines to answer questions:
+
+1. If the context contains relevant information:
+   - Start with the most urgent and actionable information first
+   - Provide clear, step-by-step instructions when applicable
+   - Use concise language and bullet points for critical information
+   - Prioritize life-saving actions over general information
+   - Include specific details and procedures from the source
+
+2. If the context does NOT contain sufficient information:
+   - Start with general safety advice relevant to the situation
+   - Be honest about not having specific details
+   - Provide actionable steps based on common disaster management principles
+   - Suggest contacting local emergency services when appropriate
+   - Never make up specific numbers or procedures
+
+3. For all responses:
+   - Keep information organized and easy to scan quickly
+   - Use clear headings and short paragraphs
+   - Emphasize the most critical information
+   - Be reassuring but realistic
+   - Focus on immediate needs first, then recovery information
+   - Read the question in light of the conversation so far, but answer only the question
+
+Conversation so far: {{history}}
+
+Context: {{context}}
+
+Question: {{question}}
+
+Response (remember to be concise, action-oriented, and helpful):"""
+
+SUMMARY_PROMPT = PromptTemplate(
+    template="""Update the running summary of a conversation between a user and a disaster management assistant.
+
+Keep the user's situation, location, the disasters and people involved, and the advice already given. Drop greetings and repetition. Use at most {max_words} words, in English.
+
+Current summary: {summary}
+
+New messages:
+{conversation}
+
+Updated summary:""",
+    input_variables=["summary", "conversation", "max_words"],
+)
+
+
+def get_language_prompt(output_lang: Literal["English", "Sindhi", "Urdu"]) -> str:
+    """Get the language-specific prompt instruction."""
+    return LANGUAGE_INSTRUCTIONS.get(output_lang, LANGUAGE_INSTRUCTIONS["English"])
+
+
+def get_degraded_notice(output_lang: str) -> str:
+    """Get the degraded-mode notice for an output language."""
+    return DEGRADED_NOTICES.get(output_lang, DEGRADED_NOTICES["English"])
+
+
+def _compile_prompts() -> Dict[str, PromptTemplate]:
+    """Build one prompt template per supported output language."""
+    return {
+        language: PromptTemplate(
+            template=RAG_PROMPT_TEMPLATE.format(
+                language_instruction=get_language_prompt(language)
+            ),
+            input_variables=["history", "context", "question"],
+        )
+        for language in SUPPORTED_LANGUAGES
+    }
+
+
+RAG_PROMPTS = _compile_prompts()
+
+
+def get_rag_prompt(output_lang: str) -> PromptTemplate:
+    """
+    Get the precompiled RAG prompt for an output language.
+
+    Args:
+        output_lang: Output language selected by the user
+
+    Returns:
+        PromptTemplate: Template with `history`, `context` and `question` variables
+    """
+    return RAG_PROMPTS.get(output_lang, RAG_PROMPTS["English"])
@@ -0,0 +1,458 @@
+"""
+Resilient LLM calls.
+Wraps the primary and a smaller fallback chat model with hedged requests,
+per-model circuit breakers and an overall deadline, so a slow or failing
+Gemini endpoint costs a user seconds instead of minutes of retries.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a streamed attempt on the result queue
+_DONE = object()
+
+
+class LLMUnavailableError(RuntimeError):
+    """No model produced an answer: every circuit is open, or all attempts failed or timed out."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `failure_threshold` failures in a row the circuit opens and calls
+    are refused for `reset_seconds`. Then one probe call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        """
+        Create a closed circuit.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: How long the circuit stays open before a probe
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be made now; reserves the probe when half-open."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the circuit if needed."""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened_count += 1
+                    logger.warning("Circuit opened after %d consecutive failures", self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def record_abandoned(self) -> None:
+        """Release the probe of a call whose outcome will never be known."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _maybe_half_open(self) -> None:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of latencies with a percentile estimate."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20, initial_seconds: float = 3.0):
+        """
+        Args:
+            window: Latest samples kept
+            min_samples: Samples needed before percentiles are trusted
+            initial_seconds: Estimate used until then
+        """
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.min_samples = min_samples
+        self.initial_seconds = initial_seconds
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float = 0.95) -> float:
+        """Latency below which a fraction `q` of recent calls finished."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return self.initial_seconds
+            ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class _Attempt:
+    """One call to one model; settled exactly once."""
+
+    def __init__(self, name: str, model: Any, breaker: CircuitBreaker,
+                 latency: Optional[LatencyTracker] = None):
+        self.name = name
+        self.model = model
+        self.breaker = breaker
+        self.latency = latency
+        self.started = time.perf_counter()
+        self.cancelled = threading.Event()
+        self.running = True
+        self._responded = False
+        self._settled = False
+        self._lock = threading.Lock()
+
+    def responded(self) -> None:
+        """Record the latency to the answer, or first chunk, once; losers and late answers count too."""
+        with self._lock:
+            if self._responded:
+                return
+            self._responded = True
+        if self.latency is not None:
+            self.latency.record(time.perf_counter() - self.started)
+
+    @property
+    def settled(self) -> bool:
+        with self._lock:
+            return self._settled
+
+    def settle(self, outcome: str) -> bool:
+        """Record 'success', 'failure' or 'abandoned' on the breaker, once."""
+        with self._lock:
+            if self._settled:
+                return False
+            self._settled = True
+        if outcome == "success":
+            self.breaker.record_success()
+        elif outcome == "failure":
+            self.breaker.record_failure()
+        else:
+            self.cancelled.set()
+            self.breaker.record_abandoned()
+        return True
+
+
+class ResilientLLM:
+    """
+    Chat model front-end with hedging, fallback and circuit breaking.
+
+    A call goes to the primary model. If it has not answered (or, when
+    streaming, produced its first token) within the recent p95 latency, a
+    hedged request goes to the fallback model and whichever responds first
+    wins. A failed attempt immediately hands over to the next model. Models
+    whose circuit is open are skipped, and when no model can answer within
+    `timeout_seconds` an `LLMUnavailableError` lets the caller degrade.
+
+    `invoke` and `stream` accept and return the same types as the wrapped
+    LangChain chat models.
+
+    Attempts that lose a race, or miss the deadline, keep their thread until
+    the model returns. The pool has two threads per concurrent call plus
+    `max_abandoned` for such attempts, and no hedge is sent while that many
+    are still running, so abandoned attempts cannot starve new calls.
+    """
+
+    def __init__(self, primary: Any, fallback: Optional[Any] = None, timeout_seconds: float = 20.0,
+                 hedge_min_delay: float = 0.5, hedge_max_delay: float = 8.0,
+                 failure_threshold: int = 5, reset_seconds: float = 30.0,
+                 concurrency: int = 8, max_abandoned: Optional[int] = None,
+                 fatal_errors: Tuple[type, ...] = ()):
+        """
+        Args:
+            primary: Main chat model
+            fallback: Smaller, faster chat model; the primary is re-hedged when None
+            timeout_seconds: Deadline for an answer, or for the first token when streaming
+            hedge_min_delay: Lower bound of the hedge delay
+            hedge_max_delay: Upper bound of the hedge delay
+            failure_threshold: Consecutive failures that open a model's circuit
+            reset_seconds: How long an open circuit refuses calls
+            concurrency: Most calls made at once, as admitted by the caller
+            max_abandoned: Abandoned attempts still running above which hedging
+                pauses; `concurrency` when None
+            fatal_errors: Exception types raised to the caller as they are,
+                without falling back or counting against a circuit
+        """
+        self.timeout_seconds = timeout_seconds
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.breakers = {
+            "primary": CircuitBreaker(failure_threshold, reset_seconds),
+            "fallback": CircuitBreaker(failure_threshold, reset_seconds),
+        }
+        self._plan: List[Tuple[str, Any]] = [("primary", primary)]
+        self._plan.append(("fallback", fallback) if fallback is not None else ("primary", primary))
+        self.invoke_latency = LatencyTracker()
+        self.first_token_latency = LatencyTracker()
+        self.fatal_errors = fatal_errors
+        self.max_abandoned = concurrency if max_abandoned is None else max_abandoned
+        self._executor = ThreadPoolExecutor(max_workers=2 * concurrency + self.max_abandoned,
+                                            thread_name_prefix="llm")
+        self._stats_lock = threading.Lock()
+        self._stats = {'calls': 0, 'hedged': 0, 'hedges_skipped': 0, 'fallback_answers': 0,
+                       'failed_attempts': 0, 'unavailable': 0}
+        # Attempts settled while their model call was still running
+        self._abandoned = 0
+
+    def invoke(self, prompt: Any) -> Any:
+        """
+        Generate a complete answer.
+
+        Args:
+            prompt: Prompt for the chat model
+
+        Returns:
+            Any: The winning model's message
+
+        Raises:
+            LLMUnavailableError: No model answered in time
+        """
+        results: "queue.Queue[Tuple[_Attempt, Any, Optional[BaseException]]]" = queue.Queue()
+
+        def run(attempt: _Attempt) -> None:
+            try:
+                message = attempt.model.invoke(prompt)
+            except Exception as e:
+                results.put((attempt, None, e))
+                return
+            attempt.responded()
+            results.put((attempt, message, None))
+
+        race = self._race(run, results, self.invoke_latency, complete=True)
+        try:
+            return next(race)[1]
+        finally:
+            race.close()
+
+    def stream(self, prompt: Any) -> Iterator[Any]:
+        """
+        Generate an answer as a stream of chunks.
+
+        Hedging only applies until the first chunk arrives; after that the
+        winning model's stream is followed to the end, and a mid-stream
+        error is raised to the caller. Closing the iterator cancels every
+        attempt.
+
+        Args:
+            prompt: Prompt for the chat model
+
+        Yields:
+            Any: Message chunks of the winning model
+
+        Raises:
+            LLMUnavailableError: No model started answering in time
+        """
+        results: "queue.Queue[Tuple[_Attempt, Any, Optional[BaseException]]]" = queue.Queue()
+
+        def run(attempt: _Attempt) -> None:
+            chunks = None
+            try:
+                chunks = attempt.model.stream(prompt)
+                for chunk in chunks:
+                    attempt.responded()
+                    if attempt.cancelled.is_set():
+                        return
+                    results.put((attempt, chunk, None))
+                attempt.responded()
+                results.put((attempt, _DONE, None))
+            except Exception as e:
+                results.put((attempt, None, e))
+            finally:
+                if chunks is not None and hasattr(chunks, 'close'):
+                    chunks.close()
+
+        race = self._race(run, results, self.first_token_latency, complete=False)
+        winner = None
+        try:
+            winner, chunk = next(race)
+            if chunk is not _DONE:
+                yield chunk
+                while True:
+                    attempt, chunk, error = results.get(timeout=self.timeout_seconds)
+                    if attempt is not winner:
+                        continue
+                    if error is not None:
+                        self._settle(winner, "failure")
+                        raise error
+                    if chunk is _DONE:
+                        break
+                    yield chunk
+            self._settle(winner, "success")
+        except queue.Empty:
+            self._settle(winner, "failure")
+            raise LLMUnavailableError("Stream stalled")
+        finally:
+            race.close()
+            if winner is not None:
+                # Stops the winning stream if the caller closed us early
+                self._settle(winner, "abandoned")
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get resilience metrics.
+
+        Returns:
+            Dict[str, object]: Call and hedge counts, circuit states and
+            current hedge delays
+        """
+        with self._stats_lock:
+            stats: Dict[str, object] = dict(self._stats)
+        for name, breaker in self.breakers.items():
+            stats[f'{name}_circuit'] = breaker.state
+            stats[f'{name}_circuit_opened'] = breaker.opened_count
+        stats['abandoned_running'] = self._abandoned
+        stats['invoke_hedge_delay_s'] = round(self._hedge_delay(self.invoke_latency), 3)
+        stats['stream_hedge_delay_s'] = round(self._hedge_delay(self.first_token_latency), 3)
+        return stats
+
+    def _hedge_delay(self, latency: LatencyTracker) -> float:
+        return min(max(latency.percentile(0.95), self.hedge_min_delay), self.hedge_max_delay)
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _submit(self, run, attempt: _Attempt) -> None:
+        def task() -> None:
+            try:
+                run(attempt)
+            finally:
+                with self._stats_lock:
+                    attempt.running = False
+                    if attempt.settled:
+                        self._abandoned -= 1
+
+        self._executor.submit(task)
+
+    def _settle(self, attempt: _Attempt, outcome: str) -> None:
+        """Settle an attempt, counting it as abandoned if its model call is still running."""
+        with self._stats_lock:
+            if attempt.settle(outcome) and attempt.running:
+                self._abandoned += 1
+
+    def _race(self, run, results: "queue.Queue", latency: LatencyTracker,
+              complete: bool) -> Iterator[Tuple[_Attempt, Any]]:
+        """
+        Launch attempts until one delivers a first result, and yield it once.
+
+        Every other attempt is abandoned. When `complete` is False the first
+        result is only the start of a stream, so the winner is left for the
+        caller to settle once the stream ends.
+        """
+        self._count('calls')
+        plan = list(self._plan)
+        attempts: List[_Attempt] = []
+        winner: Optional[_Attempt] = None
+
+        def launch() -> bool:
+            while plan:
+                name, model = plan.pop(0)
+                breaker = self.breakers[name]
+                if breaker.allow():
+                    attempt = _Attempt(name, model, breaker, latency if name == "primary" else None)
+                    attempts.append(attempt)
+                    self._submit(run, attempt)
+                    return True
+            return False
+
+        try:
+            if not launch():
+                self._count('unavailable')
+                raise LLMUnavailableError("All model circuits are open")
+
+            started = time.perf_counter()
+            deadline = started + self.timeout_seconds
+            hedge_at = started + self._hedge_delay(latency)
+            pending = 1
+            last_error: Optional[BaseException] = None
+            while True:
+                now = time.perf_counter()
+                wake = min(hedge_at, deadline) if plan else deadline
+                try:
+                    attempt, result, error = results.get(timeout=max(wake - now, 0))
+                except queue.Empty:
+                    if time.perf_counter() >= deadline:
+                        for attempt in attempts:
+                            self._settle(attempt, "failure")
+                        self._count('unavailable')
+                        raise LLMUnavailableError(f"No response within {self.timeout_seconds:.0f}s")
+                    if self._abandoned >= self.max_abandoned:
+                        # Abandoned attempts hold threads; hedging now could starve new calls
+                        self._count('hedges_skipped')
+                    elif launch():
+                        pending += 1
+                        self._count('hedged')
+                    hedge_at = float('inf')
+                    continue
+
+                if error is not None and isinstance(error, self.fatal_errors):
+                    self._settle(attempt, "abandoned")
+                    raise error
+                if error is not None:
+                    self._settle(attempt, "failure")
+                    self._count('failed_attempts')
+                    logger.warning("LLM attempt on %s model failed: %s", attempt.name, error)
+                    last_error = error
+                    pending -= 1
+                    if launch():
+                        pending += 1
+                    elif pending == 0:
+                        self._count('unavailable')
+                        raise LLMUnavailableError(str(last_error)) from last_error
+                    continue
+
+                winner = attempt
+                if attempt.name != "primary":
+                    self._count('fallback_answers')
+                if complete or result is _DONE:
+                    self._settle(attempt, "success")
+                break
+
+            for attempt in attempts:
+                if attempt is not winner:
+                    self._settle(attempt, "abandoned")
+            yield winner, result
+        finally:
+            for attempt in attempts:
+                if attempt is not winner:
+                    self._settle(attempt, "abandoned")
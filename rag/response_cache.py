@@ -0,0 +1,178 @@
+"""
+Durable exact-match response cache.
+Stores generated answers in a local SQLite file keyed by the normalized query,
+output language and prompt version, so repeated questions are answered
+without retrieval or generation, even across process restarts.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from .normalize import normalize_query
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'responses.sqlite3')
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of RAG answers.
+
+    Every row records the index version it was generated against. Opening
+    the cache with a different index version deletes all older rows, so
+    re-ingesting the corpus flushes stale answers automatically. An unknown
+    (empty) version never deletes anything.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, index_version: str = "",
+                 prompt_version: str = ""):
+        """
+        Open (or create) the cache file.
+
+        Args:
+            path: SQLite database path
+            index_version: Version of the vector index answers are based on
+            prompt_version: Version of the prompt templates
+        """
+        self.path = path
+        self.prompt_version = prompt_version
+        self.index_version = ""
+
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                index_version TEXT NOT NULL,
+                language TEXT NOT NULL,
+                query TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        self.set_index_version(index_version)
+
+    def set_index_version(self, index_version: str) -> int:
+        """
+        Switch to a new index version, deleting answers from other versions.
+
+        An empty version means the index could not be asked for its
+        version. It deletes nothing: a cache that has no version yet keeps
+        serving the answers of the most recently stored version.
+
+        Args:
+            index_version: Current version of the vector index
+
+        Returns:
+            int: Number of stale rows deleted
+        """
+        with self._lock:
+            if not index_version:
+                if not self.index_version:
+                    row = self._conn.execute(
+                        'SELECT index_version FROM responses ORDER BY created_at DESC LIMIT 1'
+                    ).fetchone()
+                    if row is not None:
+                        self.index_version = row[0]
+                return 0
+            if index_version == self.index_version:
+                return 0
+            self.index_version = index_version
+            cursor = self._conn.execute(
+                'DELETE FROM responses WHERE index_version != ?', (index_version,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def make_key(self, query: str, output_language: str) -> str:
+        """
+        Build the cache key for a query.
+
+        Args:
+            query: Raw user query
+            output_language: Output language of the answer
+
+        Returns:
+            str: Hex digest identifying the query
+        """
+        raw = '\x1f'.join((self.prompt_version, output_language, normalize_query(query)))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, query: str, output_language: str) -> Optional[str]:
+        """
+        Look up a cached answer.
+
+        Args:
+            query: Raw user query
+            output_language: Output language of the answer
+
+        Returns:
+            Optional[str]: Cached answer, or None on a miss
+        """
+        key = self.make_key(query, output_language)
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT response FROM responses WHERE key = ? AND index_version = ?',
+                (key, self.index_version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, query: str, output_language: str, response: str) -> None:
+        """
+        Store an answer.
+
+        Args:
+            query: Raw user query
+            output_language: Output language of the answer
+            response: Generated answer text
+        """
+        key = self.make_key(query, output_language)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, index_version, language, query, response, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, self.index_version, output_language, normalize_query(query),
+                 response, time.time())
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Delete all cached answers."""
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict[str, float]: Hits, misses, hit rate and stored row count
+        """
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': entries
+            }
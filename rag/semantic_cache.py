@@ -0,0 +1,217 @@
+"""
+Semantic answer cache.
+Maps query embeddings to previously generated answers so paraphrases of a
+question that was already answered skip the LLM entirely.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class _LanguageTable:
+    """
+    Vector table of cached answers for one output language.
+
+    Vectors live in a single preallocated float32 matrix so a lookup is one
+    matrix-vector product. Entry ids are kept in an OrderedDict in LRU order.
+    """
+
+    def __init__(self, dim: int, capacity: int):
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.answers: List[Optional[str]] = [None] * capacity
+        self.created: List[float] = [0.0] * capacity
+        self.last_used: List[float] = [0.0] * capacity
+        self.lru: "OrderedDict[int, None]" = OrderedDict()
+        self.free: List[int] = list(range(capacity - 1, -1, -1))
+
+    def grow(self) -> None:
+        """Double the table capacity."""
+        capacity, dim = self.matrix.shape
+        self.matrix = np.vstack([self.matrix, np.zeros((capacity, dim), dtype=np.float32)])
+        self.active = np.concatenate([self.active, np.zeros(capacity, dtype=bool)])
+        self.answers.extend([None] * capacity)
+        self.created.extend([0.0] * capacity)
+        self.last_used.extend([0.0] * capacity)
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+
+class SemanticCache:
+    """
+    In-memory cache of answers keyed by query embedding and output language.
+
+    A lookup returns the cached answer whose query vector has the highest
+    cosine similarity with the new query, provided it clears the threshold
+    and has not expired. Entries are evicted least-recently-used first when
+    the entry count or memory cap is exceeded.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl_seconds: float = 6 * 3600,
+                 max_entries: int = 4096, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize an empty cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a hit
+            ttl_seconds: Age after which an entry is no longer served
+            max_entries: Maximum number of entries across all languages
+            max_bytes: Approximate memory cap for vectors and answers
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._tables: Dict[str, _LanguageTable] = {}
+        self._entries = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, vector, output_language: str) -> Optional[str]:
+        """
+        Find a cached answer for a semantically similar query.
+
+        Args:
+            vector: Query embedding
+            output_language: Output language of the answer
+
+        Returns:
+            Optional[str]: Cached answer, or None on a miss
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            table = self._tables.get(output_language)
+            if table is None or not table.lru:
+                self.misses += 1
+                return None
+
+            scores = table.matrix @ query
+            scores[~table.active] = -np.inf
+            row = int(np.argmax(scores))
+
+            if scores[row] < self.threshold:
+                self.misses += 1
+                return None
+
+            if time.time() - table.created[row] > self.ttl_seconds:
+                self._remove(table, row)
+                self.misses += 1
+                return None
+
+            table.lru.move_to_end(row)
+            table.last_used[row] = time.time()
+            self.hits += 1
+            return table.answers[row]
+
+    def store(self, vector, output_language: str, answer: str) -> None:
+        """
+        Cache an answer for a query embedding.
+
+        Args:
+            vector: Query embedding
+            output_language: Output language of the answer
+            answer: Generated answer text
+        """
+        query = self._normalize(vector)
+        size = self._entry_size(query, answer)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            table = self._tables.get(output_language)
+            if table is None:
+                table = _LanguageTable(query.shape[0], capacity=64)
+                self._tables[output_language] = table
+
+            self._purge_expired()
+            while self._entries and (self._entries >= self.max_entries
+                                     or self._bytes + size > self.max_bytes):
+                self._evict_lru()
+
+            if not table.free:
+                table.grow()
+            row = table.free.pop()
+            table.matrix[row] = query
+            table.active[row] = True
+            table.answers[row] = answer
+            table.created[row] = table.last_used[row] = time.time()
+            table.lru[row] = None
+
+            self._entries += 1
+            self._bytes += size
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._tables.clear()
+            self._entries = 0
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict[str, float]: Hits, misses, hit rate, evictions, size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': self._entries,
+                'bytes': self._bytes
+            }
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        """Convert a vector to a unit-length float32 array."""
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    @staticmethod
+    def _entry_size(vector: np.ndarray, answer: str) -> int:
+        """Approximate memory used by one entry."""
+        return vector.nbytes + len(answer.encode('utf-8'))
+
+    def _remove(self, table: _LanguageTable, row: int) -> None:
+        """Remove one entry. Caller must hold the lock."""
+        self._bytes -= self._entry_size(table.matrix[row], table.answers[row])
+        self._entries -= 1
+        table.active[row] = False
+        table.answers[row] = None
+        del table.lru[row]
+        table.free.append(row)
+
+    def _purge_expired(self) -> None:
+        """Remove entries past their TTL. Caller must hold the lock."""
+        cutoff = time.time() - self.ttl_seconds
+        for table in self._tables.values():
+            expired = [row for row in table.lru if table.created[row] < cutoff]
+            for row in expired:
+                self._remove(table, row)
+
+    def _evict_lru(self) -> None:
+        """Evict the least recently used entry across all languages. Caller must hold the lock."""
+        # Each table keeps its own LRU order; evict the globally oldest head
+        oldest_table, oldest_row = None, None
+        for table in self._tables.values():
+            if not table.lru:
+                continue
+            row = next(iter(table.lru))
+            if oldest_table is None or table.last_used[row] < oldest_table.last_used[oldest_row]:
+                oldest_table, oldest_row = table, row
+        if oldest_table is None:
+            return
+        self._remove(oldest_table, oldest_row)
+        self.evictions += 1
@@ -0,0 +1,194 @@
+"""
+Request coalescing for identical in-flight questions.
+When many sessions ask the same question at once, one computation runs
+and every caller receives its streamed output, so a burst of identical
+questions costs one retrieval and one Gemini call.
+"""
+import contextvars
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# (deliver, finish) of a push subscriber; deliver returns False once its reader is gone
+Sink = Tuple[Callable[[str], bool], Callable[[Optional[BaseException]], None]]
+
+
+class _Flight:
+    """One in-flight computation and the chunks it has produced so far."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.cancelled = False
+        self.subscribers = 0
+        self.followers = 0
+        self.expensive = False
+        self.sinks: List[Sink] = []
+        self.condition = threading.Condition()
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent streaming computations by key.
+
+    The first caller for a key starts the computation on a producer thread;
+    callers arriving while it runs attach to it. Every subscriber replays
+    the chunks produced so far and then follows new ones, either pulling
+    them at its own pace (`stream`) or having them pushed by the producer
+    thread (`push`), which needs no thread of its own per subscriber.
+    If every subscriber goes away the computation is closed. A finished
+    flight is forgotten, so later callers start fresh (and usually hit the
+    answer caches).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._stats = {'flights': 0, 'coalesced': 0, 'llm_calls_saved': 0}
+
+    def stream(self, key: str,
+               factory: Callable[[], Tuple[Iterator[str], bool]]) -> Tuple[Iterator[str], bool]:
+        """
+        Stream the result for a key, sharing an in-flight computation.
+
+        Args:
+            key: Identity of the computation
+            factory: Starts the computation; returns its chunk iterator and
+                whether it is expensive (calls the LLM) rather than cached
+
+        Returns:
+            Tuple[Iterator[str], bool]: Chunk iterator, and whether this
+            call joined a computation started by another caller
+        """
+        flight, joined = self._join(key, factory)
+        return self._subscribe(flight), joined
+
+    def push(self, key: str, factory: Callable[[], Tuple[Iterator[str], bool]],
+             deliver: Callable[[str], bool], finish: Callable[[Optional[BaseException]], None]) -> bool:
+        """
+        Have the result for a key pushed to callbacks, sharing an in-flight computation.
+
+        The callbacks run on the producer thread, `deliver` while it holds
+        the flight's lock, so they must not block.
+
+        Args:
+            key: Identity of the computation
+            factory: Starts the computation; returns its chunk iterator and
+                whether it is expensive (calls the LLM) rather than cached
+            deliver: Called with every chunk; returning False unsubscribes
+            finish: Called once at the end with the computation's error, or None
+
+        Returns:
+            bool: Whether this call joined a computation started by another caller
+        """
+        return self._join(key, factory, (deliver, finish))[1]
+
+    def _join(self, key: str, factory: Callable[[], Tuple[Iterator[str], bool]],
+              sink: Optional[Sink] = None) -> Tuple[_Flight, bool]:
+        """Attach to the flight for a key, starting it if there is none."""
+        with self._lock:
+            flight = self._flights.get(key)
+            joined = flight is not None
+            if joined:
+                flight.followers += 1
+                self._stats['coalesced'] += 1
+            else:
+                flight = _Flight(key)
+                self._flights[key] = flight
+                self._stats['flights'] += 1
+            with flight.condition:
+                flight.subscribers += 1
+                if sink is not None:
+                    # A flight still registered has not finished, so the sink
+                    # will see the rest of the chunks and the end
+                    for chunk in flight.chunks:
+                        sink[0](chunk)
+                    flight.sinks.append(sink)
+
+        if not joined:
+            # The producer keeps the caller's context (trace IDs and the like)
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(self._produce, flight, factory),
+                             name="singleflight", daemon=True).start()
+        return flight, joined
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing metrics.
+
+        Returns:
+            Dict[str, int]: Computations started, requests that joined one,
+            LLM calls saved and flights currently running
+        """
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._flights))
+
+    def _produce(self, flight: _Flight, factory: Callable[[], Tuple[Iterator[str], bool]]) -> None:
+        """Run the computation and publish its chunks."""
+        chunks = None
+        try:
+            chunks, flight.expensive = factory()
+            for chunk in chunks:
+                with flight.condition:
+                    if flight.cancelled:
+                        break
+                    flight.chunks.append(chunk)
+                    gone = [sink for sink in flight.sinks if not sink[0](chunk)]
+                    for sink in gone:
+                        flight.sinks.remove(sink)
+                    flight.condition.notify_all()
+                for _ in gone:
+                    self._unsubscribe(flight)
+        except Exception as e:
+            flight.error = e
+        finally:
+            if chunks is not None and hasattr(chunks, 'close'):
+                chunks.close()
+            self._finish(flight)
+
+    def _finish(self, flight: _Flight) -> None:
+        """Forget a flight and wake its subscribers."""
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            if flight.expensive and not flight.cancelled and flight.error is None:
+                self._stats['llm_calls_saved'] += flight.followers
+        with flight.condition:
+            flight.done = True
+            sinks, flight.sinks = flight.sinks, []
+            flight.condition.notify_all()
+        for _, finish in sinks:
+            finish(flight.error)
+
+    def _subscribe(self, flight: _Flight) -> Iterator[str]:
+        """Replay and follow a flight's chunks."""
+        position = 0
+        try:
+            while True:
+                with flight.condition:
+                    while position >= len(flight.chunks) and not flight.done:
+                        flight.condition.wait()
+                    pending = flight.chunks[position:]
+                    finished = flight.done
+                for chunk in pending:
+                    yield chunk
+                position += len(pending)
+                if finished and position >= len(flight.chunks):
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            self._unsubscribe(flight)
+
+    def _unsubscribe(self, flight: _Flight) -> None:
+        """Drop a subscriber; cancel the flight when none are left."""
+        with self._lock:
+            with flight.condition:
+                flight.subscribers -= 1
+                if flight.subscribers > 0 or flight.done:
+                    return
+                flight.cancelled = True
+            # Later callers must not attach to a computation being torn down
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
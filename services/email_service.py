@@ -9,6 +9,7 @@ from datetime import datetime
 import streamlit as st
 import os
 import json
+from .tracing import traced
 
 class EmailService:
     """Email service for sending chat history to authorities."""
@@ -253,6 +254,7 @@ class EmailService:
         
         return html
 
+    @traced("email_send")
     def send_email(self, recipient_email, chat_history, user_email, emergency_type, user_name="", phone_number="", location=""):
         """Send an email with the chat history and user details."""
         try:
@@ -0,0 +1,365 @@
+"""
+Latency tracing for chat turns.
+Records timed spans (rerun, auth, RAG stages, Firestore calls, email, PDF)
+tagged with the Streamlit session and turn IDs, and exports them as JSON
+lines and as Prometheus latency histograms, served from a small metrics
+endpoint.
+
+Usage:
+    with get_tracer().span("vector_search", k=12):
+        ...
+
+    @traced("firestore.save_message")
+    def save_message(...):
+        ...
+"""
+import contextvars
+import functools
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_PREFIX = "rag_chatbot"
+
+_trace_ids: contextvars.ContextVar = contextvars.ContextVar("trace_ids", default=(None, None))
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed operation."""
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    session_id: Optional[str]
+    turn_id: Optional[str]
+    # Wall-clock start, seconds since the epoch
+    start: float
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+    attributes: Dict[str, object] = field(default_factory=dict)
+
+
+class _Histogram:
+    """Cumulative latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool) -> None:
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+        self.errors += error
+
+
+def bind_trace(session_id: Optional[str], turn_id: Optional[str]) -> None:
+    """
+    Tag the spans recorded from now on in this context.
+
+    Args:
+        session_id: Streamlit session ID
+        turn_id: ID of the current script run / chat turn
+    """
+    _trace_ids.set((session_id, turn_id))
+
+
+def new_turn_id() -> str:
+    """Generate a short random turn ID."""
+    return uuid.uuid4().hex[:12]
+
+
+class Tracer:
+    """
+    In-process span recorder.
+
+    Keeps the most recent spans for JSON lines export and percentile
+    summaries, and a latency histogram per span name for the Prometheus
+    exposition. Finished spans are also appended to a JSON lines file when
+    one is configured.
+    """
+
+    def __init__(self, jsonl_path: str = "", max_spans: int = 10_000,
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Args:
+            jsonl_path: File finished spans are appended to; disabled when empty
+            max_spans: Recent spans kept in memory
+            buckets: Histogram bucket upper bounds in seconds
+        """
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        self._histograms: Dict[str, _Histogram] = {}
+        self._sink: Optional[TextIO] = None
+        self._listeners: List[Callable[[Span], None]] = []
+        self.jsonl_path = ""
+        self.set_jsonl_path(jsonl_path)
+
+    def set_jsonl_path(self, path: str) -> None:
+        """Start (or stop, with an empty path) appending spans to a file."""
+        with self._lock:
+            if path == self.jsonl_path:
+                return
+            if self._sink is not None:
+                self._sink.close()
+            self._sink = open(path, 'a', encoding='utf-8') if path else None
+            self.jsonl_path = path
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Dict[str, object]]:
+        """
+        Time a block of code.
+
+        Args:
+            name: Stage name; one histogram per name
+            **attributes: Extra fields stored on the span
+
+        Yields:
+            Dict[str, object]: The span's attributes, to add fields while it runs
+        """
+        session_id, turn_id = _trace_ids.get()
+        span = Span(name, uuid.uuid4().hex[:16], _current_span.get(), session_id, turn_id,
+                    time.time(), attributes=attributes)
+        token = _current_span.set(span.span_id)
+        started = time.perf_counter()
+        try:
+            yield span.attributes
+        except Exception as e:
+            # Streamlit's rerun/stop signals are BaseExceptions, not errors
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Generators may finish in a different context than they started
+                pass
+            self.record(span)
+
+    def add_listener(self, listener: Callable[[Span], None]) -> None:
+        """Call a function with every finished span, on the thread that finished it."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Span], None]) -> None:
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def record(self, span: Span) -> None:
+        """Store a finished span and notify the listeners."""
+        with self._lock:
+            self._spans.append(span)
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = _Histogram(self.buckets)
+            histogram.observe(span.duration_ms / 1000, span.error is not None)
+            if self._sink is not None:
+                self._sink.write(json.dumps(asdict(span), default=str, ensure_ascii=False) + "\n")
+                self._sink.flush()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(span)
+
+    def clear(self) -> None:
+        """Forget the recorded spans and histograms."""
+        with self._lock:
+            self._spans.clear()
+            self._histograms.clear()
+
+    def recent(self, limit: Optional[int] = None) -> List[Span]:
+        """Most recent spans, oldest first."""
+        with self._lock:
+            spans = list(self._spans)
+        return spans[-limit:] if limit else spans
+
+    def export_jsonl(self, spans: Optional[Iterable[Span]] = None) -> str:
+        """
+        Render spans as JSON lines.
+
+        Args:
+            spans: Spans to render; the recent spans when None
+
+        Returns:
+            str: One JSON object per line
+        """
+        spans = self.recent() if spans is None else spans
+        return "".join(json.dumps(asdict(span), default=str, ensure_ascii=False) + "\n" for span in spans)
+
+    def percentiles(self, quantiles: Sequence[float] = (0.5, 0.95, 0.99)) -> Dict[str, Dict[str, float]]:
+        """
+        Latency percentiles per span name over the recent spans.
+
+        Args:
+            quantiles: Quantiles to compute, between 0 and 1
+
+        Returns:
+            Dict[str, Dict[str, float]]: Milliseconds by quantile ("p50", ...)
+            and the sample count, by span name
+        """
+        durations: Dict[str, List[float]] = {}
+        for span in self.recent():
+            durations.setdefault(span.name, []).append(span.duration_ms)
+        summary = {}
+        for name, values in sorted(durations.items()):
+            values.sort()
+            summary[name] = {f"p{round(q * 100)}": values[min(len(values) - 1, int(q * len(values)))]
+                             for q in quantiles}
+            summary[name]['count'] = len(values)
+        return summary
+
+    def prometheus(self) -> str:
+        """
+        Render the latency histograms in the Prometheus text exposition format.
+
+        Returns:
+            str: `*_span_duration_seconds` histograms and `*_span_errors_total`
+            counters, labelled by stage
+        """
+        with self._lock:
+            histograms = {name: (list(h.counts), h.total, h.count, h.errors)
+                          for name, h in sorted(self._histograms.items())}
+
+        duration = f"{METRIC_PREFIX}_span_duration_seconds"
+        errors = f"{METRIC_PREFIX}_span_errors_total"
+        lines = [f"# HELP {duration} Latency of traced stages.", f"# TYPE {duration} histogram"]
+        for name, (counts, total, count, _) in histograms.items():
+            label = _escape_label(name)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{duration}_bucket{{stage="{label}",le="{bound:g}"}} {bucket_count}')
+            lines.append(f'{duration}_bucket{{stage="{label}",le="+Inf"}} {count}')
+            lines.append(f'{duration}_sum{{stage="{label}"}} {total:.6f}')
+            lines.append(f'{duration}_count{{stage="{label}"}} {count}')
+        lines += [f"# HELP {errors} Traced stages that raised.", f"# TYPE {errors} counter"]
+        for name, (_, _, _, error_count) in histograms.items():
+            lines.append(f'{errors}{{stage="{_escape_label(name)}"}} {error_count}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator that records a span for every call of a function.
+
+    Args:
+        name: Span name
+
+    Returns:
+        Callable: Decorator
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_tracer: Optional[Tracer] = None
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_tracing_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    Get the process-wide tracer, creating it on first use.
+
+    Returns:
+        Tracer: Shared tracer instance
+    """
+    global _tracer
+    if _tracer is None:
+        with _tracing_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve the tracer's metrics over HTTP, once per process.
+
+    GET /metrics returns the Prometheus exposition and GET /traces the
+    recent spans as JSON lines (`?limit=N` for the last N). Spans carry
+    session IDs, so the server only listens on loopback unless another
+    interface is given.
+
+    Args:
+        port: Port to listen on
+        host: Interface to listen on
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    global _metrics_server
+    with _tracing_lock:
+        if _metrics_server is not None:
+            return _metrics_server
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                tracer = get_tracer()
+                if path == "/metrics":
+                    body, content_type = tracer.prometheus(), "text/plain; version=0.0.4"
+                elif path == "/traces":
+                    params = dict(part.split("=", 1) for part in query.split("&") if "=" in part)
+                    limit = int(params['limit']) if params.get('limit', '').isdigit() else None
+                    body, content_type = tracer.export_jsonl(tracer.recent(limit)), "application/x-ndjson"
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        _metrics_server = server
+        return server
+
+
+def configure_tracing(jsonl_path: str = "", metrics_port: int = 0, metrics_host: str = "127.0.0.1") -> Tracer:
+    """
+    Apply the tracing settings; safe to call on every rerun.
+
+    Args:
+        jsonl_path: File finished spans are appended to; disabled when empty
+        metrics_port: Port of the metrics endpoint; disabled when 0
+        metrics_host: Interface the metrics endpoint listens on
+
+    Returns:
+        Tracer: Shared tracer instance
+    """
+    tracer = get_tracer()
+    tracer.set_jsonl_path(jsonl_path)
+    if metrics_port:
+        start_metrics_server(metrics_port, metrics_host)
+    return tracer
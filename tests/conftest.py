@@ -0,0 +1,24 @@
+"""
+Shared fixtures.
+"""
+import pytest
+
+from tests.fake_llm import FakeLLMServer, FakeServerChatModel
+
+
+@pytest.fixture
+def fake_llm_server():
+    """A running fake LLM server, stopped after the test."""
+    server = FakeLLMServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def primary_model(fake_llm_server):
+    return FakeServerChatModel(fake_llm_server.url, "primary")
+
+
+@pytest.fixture
+def fallback_model(fake_llm_server):
+    return FakeServerChatModel(fake_llm_server.url, "fallback")
@@ -0,0 +1,159 @@
+"""
+Fake LLM server for exercising the resilience layer.
+A local HTTP server that answers like a chat model with injectable latency,
+time to first token and error rate per model name, plus a client with the
+`invoke`/`stream` surface of the LangChain chat models.
+"""
+import http.client
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+
+@dataclass
+class ModelBehaviour:
+    """How the fake server answers for one model name."""
+    latency_seconds: float = 0.05
+    token_delay_seconds: float = 0.005
+    error_rate: float = 0.0
+    tokens: int = 20
+    requests: int = 0
+
+
+@dataclass
+class FakeMessage:
+    """Stand-in for a LangChain AIMessage or AIMessageChunk."""
+    content: str
+    model: str = ""
+
+
+class FakeLLMServer:
+    """
+    Threaded HTTP server imitating a chat completion endpoint.
+
+    POST /generate with {"model", "prompt", "stream"}. A non-streaming call
+    sleeps for the model's latency and returns {"content"}; a streaming call
+    sleeps for the latency, then sends one token per line with a delay in
+    between. Injected errors return HTTP 503.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 default: Optional[ModelBehaviour] = None):
+        """
+        Bind the server; port 0 picks a free port.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on
+            default: Behaviour copied for models seen for the first time
+        """
+        self.default = default or ModelBehaviour()
+        self.behaviours: Dict[str, ModelBehaviour] = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+                behaviour = server.behaviour(body.get('model', 'default'))
+                with server._lock:
+                    behaviour.requests += 1
+                time.sleep(behaviour.latency_seconds)
+
+                if random.random() < behaviour.error_rate:
+                    payload = b'{"error": "injected failure"}'
+                    self.send_response(503)
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                words = [f"token{i} " for i in range(behaviour.tokens)]
+                if not body.get('stream'):
+                    time.sleep(behaviour.token_delay_seconds * len(words))
+                    payload = json.dumps({'content': "".join(words), 'model': body.get('model')}).encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    for word in words:
+                        line = (word + "\n").encode()
+                        self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+                        self.wfile.flush()
+                        time.sleep(behaviour.token_delay_seconds)
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-llm", daemon=True)
+
+    def behaviour(self, model: str) -> ModelBehaviour:
+        """Get (creating if needed) the behaviour for a model name."""
+        with self._lock:
+            if model not in self.behaviours:
+                self.behaviours[model] = replace(self.default, requests=0)
+            return self.behaviours[model]
+
+    def start(self) -> "FakeLLMServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeServerChatModel:
+    """Client for `FakeLLMServer` with the chat model `invoke`/`stream` surface."""
+
+    def __init__(self, base_url: str, model: str, timeout: float = 60.0):
+        parsed = urlparse(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.model = model
+        self.timeout = timeout
+
+    def _request(self, prompt: str, stream: bool) -> http.client.HTTPResponse:
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        body = json.dumps({'model': self.model, 'prompt': str(prompt), 'stream': stream})
+        connection.request('POST', '/generate', body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        if response.status != 200:
+            response.read()
+            connection.close()
+            raise RuntimeError(f"{self.model}: HTTP {response.status}")
+        return response
+
+    def invoke(self, prompt: str) -> FakeMessage:
+        response = self._request(prompt, stream=False)
+        data = json.loads(response.read())
+        return FakeMessage(data['content'], self.model)
+
+    def stream(self, prompt: str) -> Iterator[FakeMessage]:
+        response = self._request(prompt, stream=True)
+        try:
+            for line in response:
+                yield FakeMessage(line.decode('utf-8').rstrip("\n"), self.model)
+        finally:
+            response.close()
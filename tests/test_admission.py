@@ -0,0 +1,68 @@
+"""
+Shedding in the admission queues.
+"""
+import threading
+import time
+
+import pytest
+
+from rag.admission import AdmissionController, AdmissionRejected
+
+
+def queue_behind(controller, response_type, outcomes):
+    """Wait for a slot in a thread, recording whether the request was admitted or shed."""
+    def wait():
+        try:
+            with controller.acquire(response_type):
+                outcomes.append((response_type, "admitted"))
+        except AdmissionRejected:
+            outcomes.append((response_type, "shed"))
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def busy():
+    """A controller whose only slot is held until the test releases it."""
+    controller = AdmissionController("llm", 1, max_queue=4, shed_after_seconds=0.1)
+    ticket = controller.acquire("information")
+    yield controller, ticket
+    ticket.release()
+
+
+def test_information_is_not_shed_below_the_queue_limit(busy):
+    controller, ticket = busy
+    outcomes = []
+    thread = queue_behind(controller, "information", outcomes)
+
+    time.sleep(0.4)
+    ticket.release()
+    thread.join(1)
+
+    assert outcomes == [("information", "admitted")]
+
+
+def test_summaries_are_shed_after_waiting(busy):
+    controller, _ = busy
+    outcomes = []
+    thread = queue_behind(controller, "summary", outcomes)
+
+    thread.join(1)
+
+    assert outcomes == [("summary", "shed")]
+
+
+def test_lowest_user_class_is_shed_over_the_queue_limit(busy):
+    controller, ticket = busy
+    outcomes = []
+    threads = [queue_behind(controller, response_type, outcomes)
+               for response_type in ("emergency", "information", "greeting")]
+
+    time.sleep(0.4)
+    ticket.release()
+    for thread in threads:
+        thread.join(1)
+
+    assert sorted(outcomes) == [("emergency", "admitted"), ("greeting", "shed"), ("information", "admitted")]
@@ -0,0 +1,54 @@
+"""
+Cross-session batching of query embeddings.
+"""
+import threading
+
+import pytest
+
+from rag.backends import HashEmbeddings
+from rag.batcher import MicroBatchingEmbeddings
+
+
+class CountingEmbeddings(HashEmbeddings):
+    """Hash embeddings that record the size of every encode."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        return super().embed_documents(texts)
+
+
+def test_concurrent_queries_share_one_encode():
+    inner = CountingEmbeddings()
+    batcher = MicroBatchingEmbeddings(inner, max_batch_size=8, max_wait_ms=200)
+    start = threading.Barrier(4)
+    vectors = {}
+
+    def ask(text):
+        start.wait()
+        vectors[text] = batcher.embed_query(text)
+
+    texts = ["flood", "fire", "flood", "earthquake"]
+    threads = [threading.Thread(target=ask, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(3)
+
+    assert inner.batches == [3]
+    assert vectors["fire"] == HashEmbeddings().embed_query("fire")
+    assert batcher.stats()['queries'] == 4
+
+
+def test_encode_error_reaches_every_caller():
+    class Failing(HashEmbeddings):
+        def embed_documents(self, texts):
+            raise RuntimeError("model crashed")
+
+    batcher = MicroBatchingEmbeddings(Failing(), max_wait_ms=1)
+
+    with pytest.raises(RuntimeError, match="model crashed"):
+        batcher.embed_query("flood")
@@ -0,0 +1,23 @@
+"""
+Document encoding in the embedding cache.
+"""
+from contextlib import contextmanager
+
+from rag.backends import HashEmbeddings
+from rag.embedding_cache import CachedEmbeddings
+
+
+def test_admission_is_only_taken_for_misses():
+    embeddings = CachedEmbeddings(HashEmbeddings(), "hash")
+    admitted = []
+
+    @contextmanager
+    def admit():
+        admitted.append(True)
+        yield
+
+    first = embeddings.embed_documents(["flood", "fire"], admit=admit)
+    second = embeddings.embed_documents(["flood", "fire"], admit=admit)
+
+    assert first == second
+    assert admitted == [True]
@@ -0,0 +1,34 @@
+"""
+Emergency phrase matching.
+"""
+import pytest
+
+from rag.emergency import is_emergency, match_emergency
+
+
+@pytest.mark.parametrize("message, category", [
+    ("Help me, the water is rising and we are trapped", "flood"),
+    ("There is a fire in our building", "fire"),
+    ("Someone is badly injured and bleeding", "medical"),
+    ("سیلاب آ گیا ہے، مدد کریں", "flood"),
+    ("زلزلو آيو، مدد", "earthquake"),
+    ("We are trapped, please help", "general"),
+])
+def test_emergencies_are_matched_with_their_category(message, category):
+    match = match_emergency(message)
+
+    assert match.is_emergency
+    assert match.category == category
+
+
+@pytest.mark.parametrize("message", [
+    "How can I protect my family during a heatwave?",
+    "I have unsaved changes in my map",
+    "Thanks for the information about heatwaves",
+])
+def test_ordinary_questions_are_not_emergencies(message):
+    assert not is_emergency(message)
+
+
+def test_hint_words_alone_pick_no_category():
+    assert match_emergency("help, there is water everywhere").category == "general"
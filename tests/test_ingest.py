@@ -0,0 +1,47 @@
+"""
+Change tracking in the ingest manifest.
+"""
+import pytest
+from langchain_core.documents import Document
+
+from rag.ingest import Manifest
+
+
+def chunk(text, source):
+    return Document(page_content=text, metadata={"id": text, "source": source})
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return Manifest(str(tmp_path / "manifest.sqlite3"))
+
+
+def test_changed_chunks_are_tombstoned(manifest, tmp_path):
+    source = str(tmp_path / "floods.txt")
+    open(source, "w").close()
+    manifest.sync([chunk("a", source), chunk("b", source)], {source})
+
+    stale = manifest.sync([chunk("a", source)], {source})
+    manifest.remove(stale)
+
+    assert manifest.pending_delete() == ["b"]
+
+
+def test_chunks_of_deleted_files_are_tombstoned(manifest, tmp_path):
+    kept, deleted = str(tmp_path / "floods.txt"), str(tmp_path / "fires.txt")
+    open(kept, "w").close()
+    manifest.sync([chunk("a", kept), chunk("b", deleted)], {kept, deleted})
+
+    stale = manifest.sync([chunk("a", kept)], {kept})
+    manifest.remove(stale)
+
+    assert manifest.pending_delete() == ["b"]
+
+
+def test_sources_outside_this_run_are_kept(manifest, tmp_path):
+    first, second = str(tmp_path / "floods.txt"), str(tmp_path / "fires.txt")
+    open(first, "w").close()
+    open(second, "w").close()
+    manifest.sync([chunk("a", first), chunk("b", second)], {first, second})
+
+    assert manifest.sync([chunk("a", first)], {first}) == []
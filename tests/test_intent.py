@@ -0,0 +1,90 @@
+"""
+Intent router decisions and the routing evaluation, with a keyword
+embedding standing in for MiniLM.
+"""
+import numpy as np
+import pytest
+
+from rag.intent import INTENT_EXAMPLES, IntentRouter
+from rag.intent_eval import EVAL_MESSAGES, evaluate, passes
+
+EXAMPLES = {
+    "emergency": {"English": ["help now", "help me"]},
+    "greeting": {"English": ["hello"], "Urdu": ["hello ji"]},
+    "information": {"English": ["flood preparation"]},
+    "out_of_domain": {"English": ["tell a joke"]},
+}
+
+
+class KeywordEmbeddings:
+    """Embeds a text as the normalized count of a few keywords."""
+
+    KEYWORDS = ("help", "hello", "flood", "joke")
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        vector = np.array([float(keyword in text) for keyword in self.KEYWORDS] + [0.0])
+        if not vector.any():
+            vector[-1] = 1.0
+        return list(vector / np.linalg.norm(vector))
+
+
+@pytest.fixture
+def embeddings():
+    return KeywordEmbeddings()
+
+
+@pytest.fixture
+def router(embeddings):
+    return IntentRouter(embeddings, EXAMPLES, min_score=0.45, margin=0.05)
+
+
+def test_routes_to_the_nearest_centroid(router, embeddings):
+    result = router.classify(embeddings.embed_query("help, quickly"))
+
+    assert result.intent == "emergency"
+    assert result.language == "English"
+    assert result.score == pytest.approx(1.0)
+
+
+def test_low_similarity_falls_back_to_information(router, embeddings):
+    assert router.classify(embeddings.embed_query("something unrelated")).intent == "information"
+
+
+def test_greeting_must_beat_information_by_the_margin(router, embeddings):
+    assert router.classify(embeddings.embed_query("hello, flood?")).intent == "information"
+
+
+def test_evaluation_scores_each_language(router, embeddings):
+    messages = {
+        "information": {"English": ["flood warnings", "a joke, please"]},
+        "greeting": {"Urdu": ["hello"]},
+    }
+
+    report = evaluate(router, embeddings, messages)
+
+    assert report["English"]["accuracy"] == 0.5
+    assert report["English"]["confusion"] == {"information": {"information": 1, "out_of_domain": 1}}
+    assert report["Urdu"]["accuracy"] == 1.0
+    assert report["all"]["count"] == 3
+
+
+def test_a_skipped_retrieval_fails_the_evaluation(router, embeddings):
+    report = evaluate(router, embeddings, {"information": {"English": ["tell a joke"]}})
+
+    assert report["English"]["wrongly_skipped"] == 1
+    assert not passes(report)
+
+
+def test_eval_set_covers_every_route_and_is_held_out():
+    routes = {(intent, language) for intent, by_language in INTENT_EXAMPLES.items() for language in by_language}
+    evaluated = {(intent, language) for intent, by_language in EVAL_MESSAGES.items()
+                 for language, texts in by_language.items() if texts}
+    examples = {text for by_language in INTENT_EXAMPLES.values() for texts in by_language.values()
+                for text in texts}
+
+    assert routes <= evaluated
+    assert not examples & {text for by_language in EVAL_MESSAGES.values()
+                           for texts in by_language.values() for text in texts}
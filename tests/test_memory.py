@@ -0,0 +1,65 @@
+"""
+Conversation memory and follow-up questions.
+"""
+import threading
+import time
+
+from rag.context import estimate_tokens
+from rag.memory import ConversationContext, ConversationMemory, is_follow_up
+
+
+def messages(count):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"}
+            for i in range(count)]
+
+
+def test_follow_ups_are_retrieved_with_the_previous_question():
+    context = ConversationContext(messages=(("user", "How do I prepare for a flood?"),
+                                            ("assistant", "Pack a kit.")))
+
+    assert is_follow_up("what about for children?")
+    assert not is_follow_up("How do I prepare for an earthquake?")
+    assert context.retrieval_query("what about for children?") \
+        == "How do I prepare for a flood? what about for children?"
+    assert context.retrieval_query("How do I prepare for an earthquake?") \
+        == "How do I prepare for an earthquake?"
+
+
+def test_evicted_turns_are_folded_into_the_summary():
+    memory = ConversationMemory(recent_turns=1)
+
+    def summarize(summary, batch):
+        return summary + " ".join(content for _, content in batch)
+
+    memory.update(messages(4), summarize)
+
+    deadline = time.monotonic() + 3
+    while not memory.context().summary and time.monotonic() < deadline:
+        time.sleep(0.01)
+    context = memory.context()
+    assert context.summary == "message 0 message 1"
+    assert context.messages == (("user", "message 2"), ("assistant", "message 3"))
+
+
+def test_failed_summary_keeps_the_messages():
+    memory = ConversationMemory(recent_turns=1)
+    tried = threading.Event()
+
+    def summarize(summary, batch):
+        tried.set()
+        raise RuntimeError("summarizer shed")
+
+    memory.update(messages(4), summarize)
+
+    assert tried.wait(3)
+    assert memory.context().messages == tuple(("user" if i % 2 == 0 else "assistant", f"message {i}")
+                                              for i in range(4))
+
+
+def test_render_stays_within_the_budget():
+    context = ConversationContext("earlier " * 400, tuple(("user", "word " * 400) for _ in range(6)))
+
+    rendered = context.render(600)
+
+    assert estimate_tokens(rendered) <= 600
+    assert rendered.startswith("Summary of the earlier conversation:")
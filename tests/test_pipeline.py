@@ -0,0 +1,128 @@
+"""
+Chat turns in the turn pipeline, with a fake engine.
+"""
+import threading
+
+import pytest
+
+from rag.pipeline import TurnPipeline
+
+
+class FakeEngine:
+    """Answers every question with fixed chunks from a producer thread."""
+
+    def __init__(self, chunks=("Move ", "to higher ground."), fail=None, gate=None):
+        self.chunks = chunks
+        self.fail = fail
+        # Held before every chunk after the first, to let a reader leave mid-answer
+        self.gate = gate
+        self.asked = 0
+        self.delivered = []
+        self.stopped = threading.Event()
+
+    def embed_query(self, query, priority=None, on_queued=None):
+        return [1.0, 0.0]
+
+    def route_intent(self, vector):
+        return None
+
+    def push_shared(self, query, output_language, deliver, finish, vector=None, priority=None,
+                    on_prepared=None, on_queued=None, history=None):
+        self.asked += 1
+        if self.fail is not None:
+            raise self.fail
+
+        def produce():
+            for number, chunk in enumerate(self.chunks):
+                if number and self.gate is not None:
+                    self.gate.wait(3)
+                if not deliver(chunk):
+                    self.stopped.set()
+                    break
+                self.delivered.append(chunk)
+            finish(None)
+
+        threading.Thread(target=produce).start()
+        return False
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return TurnPipeline(workers=4, priority_workers=2)
+
+
+def read(turn, timeout=3.0):
+    """Read a turn's whole answer, failing instead of hanging."""
+    outcome = {}
+
+    def consume():
+        try:
+            outcome['answer'] = "".join(turn.stream())
+        except Exception as e:
+            outcome['error'] = e
+
+    reader = threading.Thread(target=consume, daemon=True)
+    reader.start()
+    reader.join(timeout)
+    assert not reader.is_alive(), "the reader was stranded"
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['answer']
+
+
+def test_information_turn_streams_the_answer(pipeline):
+    turn = pipeline.start_turn(FakeEngine(), "flood safety", "English", lambda query, route: "information")
+
+    assert turn.response_type() == "information"
+    assert read(turn) == "Move to higher ground."
+    assert {'embed', 'classify', 'generate'} <= set(turn.timings)
+
+
+def test_unknown_response_type_is_answered_not_stranded(pipeline):
+    turn = pipeline.start_turn(FakeEngine(), "there is a problem", "English", lambda query, route: None)
+
+    assert turn.response_type() is None
+    assert read(turn) == "Move to higher ground."
+
+
+def test_greeting_ends_the_stream_without_the_engine(pipeline):
+    engine = FakeEngine()
+    turn = pipeline.start_turn(engine, "hello", "English", lambda query, route: "greeting")
+
+    assert turn.response_type() == "greeting"
+    assert read(turn) == ""
+    assert engine.asked == 0
+
+
+def test_classification_error_reaches_the_reader(pipeline):
+    def classify(query, route):
+        raise ValueError("classifier down")
+
+    turn = pipeline.start_turn(FakeEngine(), "flood safety", "English", classify)
+
+    with pytest.raises(ValueError):
+        turn.response_type()
+    with pytest.raises(ValueError):
+        read(turn)
+
+
+def test_failed_answer_start_reaches_the_reader(pipeline):
+    engine = FakeEngine(fail=RuntimeError("no flight"))
+    turn = pipeline.start_turn(engine, "flood safety", "English", lambda query, route: "information")
+
+    with pytest.raises(RuntimeError):
+        read(turn)
+
+
+def test_closing_the_stream_stops_delivery(pipeline):
+    gate = threading.Event()
+    engine = FakeEngine(chunks=("Move ", "to ", "higher ground."), gate=gate)
+    turn = pipeline.start_turn(engine, "flood safety", "English", lambda query, route: "information")
+
+    stream = turn.stream()
+    assert next(stream) == "Move "
+    stream.close()
+    gate.set()
+
+    assert engine.stopped.wait(3)
+    assert engine.delivered == ["Move "]
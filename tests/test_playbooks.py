@@ -0,0 +1,28 @@
+"""
+Loading the precomputed emergency playbooks.
+"""
+import json
+import logging
+
+from rag.playbooks import PLAYBOOK_FORMAT_VERSION, detect_disaster_type, load_playbooks
+
+
+def test_missing_file_warns(tmp_path, caplog):
+    with caplog.at_level(logging.WARNING, logger="rag.playbooks"):
+        playbooks = load_playbooks(str(tmp_path / "playbooks.json"))
+
+    assert len(playbooks) == 0
+    assert "No playbook file" in caplog.text
+
+
+def test_falls_back_to_english(tmp_path):
+    path = tmp_path / "playbooks.json"
+    path.write_text(json.dumps({
+        "version": PLAYBOOK_FORMAT_VERSION,
+        "playbooks": {"flood": {"English": "1. Move to higher ground."}}
+    }), encoding="utf-8")
+
+    playbooks = load_playbooks(str(path))
+
+    assert playbooks.get(detect_disaster_type("flood water is rising in my house"), "Urdu") \
+        == "1. Move to higher ground."
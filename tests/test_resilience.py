@@ -0,0 +1,146 @@
+"""
+Hedging, fallback, circuit breaker and degraded-mode scenarios of
+ResilientLLM against the fake LLM server.
+"""
+import time
+
+import pytest
+
+from rag.resilience import LatencyTracker, LLMUnavailableError, ResilientLLM
+
+
+@pytest.fixture
+def behaviours(fake_llm_server):
+    """Fast, healthy primary and fallback models; tests adjust them."""
+    primary = fake_llm_server.behaviour("primary")
+    fallback = fake_llm_server.behaviour("fallback")
+    primary.latency_seconds = fallback.latency_seconds = 0.02
+    return primary, fallback
+
+
+@pytest.fixture
+def make_llm(primary_model, fallback_model, behaviours):
+    def make(**kwargs) -> ResilientLLM:
+        options = dict(timeout_seconds=2.0, hedge_min_delay=0.2, hedge_max_delay=0.5,
+                       failure_threshold=3, reset_seconds=0.5)
+        options.update(kwargs)
+        return ResilientLLM(primary_model, fallback_model, **options)
+    return make
+
+
+def test_healthy_primary_answers_without_hedging(make_llm, behaviours):
+    _, fallback = behaviours
+
+    message = make_llm().invoke("flood safety")
+
+    assert message.model == "primary"
+    assert fallback.requests == 0
+
+
+def test_slow_primary_is_hedged_to_the_fallback(make_llm, behaviours):
+    primary, _ = behaviours
+    primary.latency_seconds = 1.5
+
+    started = time.perf_counter()
+    message = make_llm().invoke("flood safety")
+
+    assert message.model == "fallback"
+    assert time.perf_counter() - started < 1.0
+
+
+def test_primary_latency_is_recorded_when_the_hedge_wins(make_llm, behaviours):
+    primary, _ = behaviours
+    primary.latency_seconds = 0.6
+    llm = make_llm()
+    llm.invoke_latency = LatencyTracker(min_samples=1)
+
+    assert llm.invoke("flood safety").model == "fallback"
+    time.sleep(0.8)
+
+    assert llm.invoke_latency.percentile(0.95) >= 0.6
+
+
+def test_hedging_pauses_while_abandoned_attempts_hold_threads(make_llm, behaviours):
+    primary, _ = behaviours
+    primary.latency_seconds = 1.5
+    llm = make_llm(concurrency=2, max_abandoned=1)
+
+    assert llm.invoke("flood safety").model == "fallback"
+    assert llm.invoke("flood safety").model == "primary"
+
+    stats = llm.stats()
+    assert stats['hedged'] == 1
+    assert stats['hedges_skipped'] == 1
+
+
+def test_slow_first_token_is_hedged_when_streaming(make_llm, behaviours):
+    primary, _ = behaviours
+    primary.latency_seconds = 1.5
+
+    started = time.perf_counter()
+    chunks = list(make_llm().stream("flood safety"))
+
+    assert chunks and chunks[0].model == "fallback"
+    assert time.perf_counter() - started < 1.2
+
+
+def test_failing_primary_opens_its_circuit_and_falls_back(make_llm, behaviours):
+    primary, _ = behaviours
+    primary.error_rate = 1.0
+    llm = make_llm()
+
+    for _ in range(6):
+        assert llm.invoke("flood safety").model == "fallback"
+
+    assert primary.requests == 3
+    assert llm.breakers["primary"].state == "open"
+
+
+def test_full_outage_fails_fast(make_llm, behaviours):
+    primary, fallback = behaviours
+    primary.error_rate = fallback.error_rate = 1.0
+    llm = make_llm()
+    for _ in range(3):
+        with pytest.raises(LLMUnavailableError):
+            llm.invoke("flood safety")
+    before = primary.requests + fallback.requests
+
+    started = time.perf_counter()
+    with pytest.raises(LLMUnavailableError):
+        llm.invoke("flood safety")
+
+    assert time.perf_counter() - started < 0.05
+    assert primary.requests + fallback.requests == before
+
+
+def test_circuit_closes_after_a_successful_probe(make_llm, behaviours):
+    primary, fallback = behaviours
+    primary.error_rate = fallback.error_rate = 1.0
+    llm = make_llm()
+    for _ in range(3):
+        with pytest.raises(LLMUnavailableError):
+            llm.invoke("flood safety")
+
+    primary.error_rate = fallback.error_rate = 0.0
+    time.sleep(0.6)
+    llm.invoke("flood safety")
+
+    assert llm.breakers["primary"].state == "closed"
+
+
+def test_fatal_errors_are_raised_without_fallback(fallback_model, behaviours):
+    _, fallback = behaviours
+
+    class Missing(LookupError):
+        pass
+
+    class MissingModel:
+        def invoke(self, prompt):
+            raise Missing(prompt)
+
+    llm = ResilientLLM(MissingModel(), fallback_model, fatal_errors=(Missing,))
+
+    with pytest.raises(Missing):
+        llm.invoke("flood safety")
+    assert fallback.requests == 0
+    assert llm.breakers["primary"].state == "closed"
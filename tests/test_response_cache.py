@@ -0,0 +1,30 @@
+"""
+Index versions in the response cache.
+"""
+import pytest
+
+from rag.response_cache import ResponseCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    """A cache file holding one answer for index version v1."""
+    path = str(tmp_path / "responses.sqlite3")
+    cache = ResponseCache(path, index_version="v1")
+    cache.put("What is a flood?", "English", "Rising water.")
+    cache._conn.close()
+    return path
+
+
+def test_unknown_version_keeps_the_cache(path):
+    cache = ResponseCache(path, index_version="")
+
+    assert cache.set_index_version("") == 0
+    assert cache.get("What is a flood?", "English") == "Rising water."
+
+
+def test_new_version_flushes_the_cache(path):
+    cache = ResponseCache(path, index_version="v1")
+
+    assert cache.set_index_version("v2") == 1
+    assert cache.get("What is a flood?", "English") is None
@@ -0,0 +1,87 @@
+"""
+Coalescing identical in-flight computations.
+"""
+import threading
+
+from rag.singleflight import SingleFlight
+
+
+def gated(chunks, gate, started=None, closed=None):
+    """Factory whose computation yields the first chunk, then waits for the gate."""
+    def factory():
+        def produce():
+            try:
+                for number, chunk in enumerate(chunks):
+                    if number:
+                        gate.wait(3)
+                    yield chunk
+            finally:
+                if closed is not None:
+                    closed.set()
+
+        if started is not None:
+            started.append(True)
+        return produce(), True
+
+    return factory
+
+
+def test_joined_stream_replays_and_follows():
+    flight, gate, started = SingleFlight(), threading.Event(), []
+    first, joined_first = flight.stream("q", gated(["a", "b", "c"], gate, started))
+    assert next(first) == "a"
+
+    second, joined_second = flight.stream("q", gated(["x"], gate, started))
+    gate.set()
+
+    assert (joined_first, joined_second) == (False, True)
+    assert "".join(second) == "abc"
+    assert "".join(first) == "bc"
+    assert len(started) == 1
+    assert flight.stats()['llm_calls_saved'] == 1
+
+
+def test_push_delivers_every_chunk_then_finishes():
+    flight, gate = SingleFlight(), threading.Event()
+    gate.set()
+    chunks, finished = [], threading.Event()
+    errors = []
+
+    def finish(error):
+        errors.append(error)
+        finished.set()
+
+    joined = flight.push("q", gated(["a", "b"], gate), lambda chunk: chunks.append(chunk) or True, finish)
+
+    assert finished.wait(3)
+    assert not joined
+    assert chunks == ["a", "b"]
+    assert errors == [None]
+
+
+def test_push_gets_the_computation_error():
+    def factory():
+        raise RuntimeError("LLM down")
+
+    flight, finished, errors = SingleFlight(), threading.Event(), []
+
+    def finish(error):
+        errors.append(error)
+        finished.set()
+
+    flight.push("q", factory, lambda chunk: True, finish)
+
+    assert finished.wait(3)
+    assert isinstance(errors[0], RuntimeError)
+
+
+def test_last_subscriber_leaving_closes_the_computation():
+    flight, gate, closed = SingleFlight(), threading.Event(), threading.Event()
+    stream, _ = flight.stream("q", gated(["a", "b", "c"], gate, closed=closed))
+    assert next(stream) == "a"
+
+    stream.close()
+    gate.set()
+
+    assert closed.wait(3)
+    assert flight.stats()['in_flight'] == 0